@@ -2,22 +2,28 @@
 from dotenv import load_dotenv
 import os
 import json
+import multiprocessing
+import threading
+import importlib.metadata
+import importlib.util
 import time
 import uuid
 import re
 import requests
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, Optional
-from flask import Flask, request, jsonify, render_template
+from typing import Callable, Dict, Optional
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from werkzeug.utils import secure_filename
-from text_analyzer import analyze_medical_text, clean_ocr_text, build_summary
-from medical_nlp import MedicalNLP
+from text_analyzer import analyze_medical_text, clean_ocr_text, build_summary, common_fixes_table, ENTITY_CORRECTIONS
+from result_cache import ResultCache, make_store, ruleset_version, file_sha256
+from jobs import JobQueue, QueueFull, make_job_store
+from azure_ocr import get_azure_ocr_service
+from aws_clients import get_comprehend_medical_client
+from services import services
+from nlp_pool import NLPWorkerPool, NLPPoolBusy, NLPTimeout
 from recommendations import symptoms_recommendations
 from flask_cors import CORS
-import google.generativeai as genai
-import cohere
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
 try:
     from analysis_engine import EnhancedAnalysisEngine  # <== enhanced analysis
 except ImportError:
@@ -41,6 +47,20 @@ class Config:
     UPLOAD_FOLDER = Path('uploads')
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+    NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "32"))
+    NLP_N_PROCESS = int(os.getenv("NLP_N_PROCESS", "1"))
+    # MedicalNLP worker processes request threads hand texts to; 0 (default) analyses in the
+    # request thread. Each worker holds its own copy of the models, so keep it small.
+    NLP_POOL_WORKERS = int(os.getenv("NLP_POOL_WORKERS", "0"))
+    # Each open SSE stream holds a server thread (Waitress has 4 by default): streams are capped
+    # per process and end after REPORT_EVENTS_TIMEOUT, and the browser reconnects with Last-Event-ID
+    REPORT_EVENTS_TIMEOUT = float(os.getenv("REPORT_EVENTS_TIMEOUT", "60"))  # max SSE stream lifetime (s)
+    REPORT_EVENTS_MAX_STREAMS = int(os.getenv("REPORT_EVENTS_MAX_STREAMS", "2"))
+    # "sequential" tries OCR engines one after another; "race" runs them together, first good text wins
+    OCR_STRATEGY = os.getenv("OCR_STRATEGY", "sequential").lower()
+    OCR_RACE_MIN_CHARS = int(os.getenv("OCR_RACE_MIN_CHARS", "100"))
+    OCR_RACE_TIMEOUT = float(os.getenv("OCR_RACE_TIMEOUT", "120"))
 
     # Load keys securely from environment
     AZURE_ENDPOINT = os.getenv("AZURE_ENDPOINT")
@@ -48,8 +68,15 @@ class Config:
     AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
     AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
 
+    # off | background | blocking - load the services below before the first request instead of during it
+    SERVICE_WARMUP = os.getenv("SERVICE_WARMUP", "off").lower()
+
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    nlp_engine = MedicalNLP()
+    # Duplicate uploads (same file bytes) are answered from here; keys include the NLP rule set version
+    result_store = make_store()
+    result_cache = ResultCache(result_store, "analysis", ruleset_version())
+    # OCR text outlives rule changes: keyed by file hash, engine and engine version only
+    ocr_cache = ResultCache(result_store, "ocr")
     analysis_engine = EnhancedAnalysisEngine()  # Enhanced analysis engine
 
     @classmethod
@@ -59,45 +86,98 @@ class Config:
 
 Config.init_app(app)
 
+# === Lazily loaded services ===
+# spaCy/medspacy, the LLM SDKs, Azure and boto3 take seconds to import and
+# initialise; each is loaded on first use so routes that don't need them
+# (templates, health checks) are served by a cold worker straight away.
+def _load_nlp_engine():
+    from medical_nlp import MedicalNLP
+    return MedicalNLP()
+
+def _load_nlp_pool():
+    return NLPWorkerPool(workers=Config.NLP_POOL_WORKERS).warm_up()
+
+# With the pool, the models live in its workers only, not also in the web process
+if Config.NLP_POOL_WORKERS > 0:
+    services.register("nlp_pool", _load_nlp_pool)
+else:
+    services.register("nlp_engine", _load_nlp_engine)
+services.register("common_fixes", common_fixes_table)
+
+def nlp_engine():
+    return services.get("nlp_engine")
+
+def run_nlp_batch(texts):
+    """MedicalNLP analyses in input order; on the worker pool when enabled, keeping the GIL free for requests"""
+    if Config.NLP_POOL_WORKERS > 0:
+        return services.get("nlp_pool").analyze_many(texts, batch_size=Config.NLP_BATCH_SIZE)
+    return nlp_engine().process_texts(texts, batch_size=Config.NLP_BATCH_SIZE, n_process=Config.NLP_N_PROCESS)
+
+def run_nlp(text: str) -> Dict:
+    if Config.NLP_POOL_WORKERS > 0:
+        return services.get("nlp_pool").analyze(text)
+    return nlp_engine().process_text(text)
+
 # === Gemini Configuration ===
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini_model = None
-if GEMINI_API_KEY:
+
+def _load_gemini():
+    import google.generativeai as genai
     genai.configure(api_key=GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel("gemini-1.5-flash")  # Or gemini-1.5-pro if you need higher quality
+    return genai.GenerativeModel("gemini-1.5-flash")  # Or gemini-1.5-pro if you need higher quality
+
+if GEMINI_API_KEY:
+    services.register("gemini", _load_gemini)
 
 
 # === Cohere Configuration ===
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
-co = None
+
+def _load_cohere():
+    import cohere
+    return cohere.Client(COHERE_API_KEY)
+
 if COHERE_API_KEY:
-    co = cohere.Client(COHERE_API_KEY)
+    services.register("cohere", _load_cohere)
 
-# === Azure OCR client (Form Recognizer) ===
+# === Azure OCR service (Form Recognizer, asyncio client on a shared loop) ===
 azure_client = None
 if Config.AZURE_ENDPOINT and Config.AZURE_KEY:
     try:
-        azure_client = DocumentAnalysisClient(
-            endpoint=Config.AZURE_ENDPOINT,
-            credential=AzureKeyCredential(Config.AZURE_KEY)
-        )
+        azure_client = get_azure_ocr_service(Config.AZURE_ENDPOINT, Config.AZURE_KEY)
         print("[✅] Azure OCR client initialized successfully")
     except Exception as e:
         print(f"[⚠️] Failed to initialize Azure OCR client: {str(e)}")
         azure_client = None
+if azure_client:
+    services.register("azure_ocr", lambda: azure_client.warm_up() or azure_client)
+if Config.AWS_ACCESS_KEY and Config.AWS_SECRET_KEY:
+    services.register("comprehend_medical",
+                      lambda: get_comprehend_medical_client(Config.AWS_ACCESS_KEY, Config.AWS_SECRET_KEY))
 
 # === OCR.Space fallback configuration ===
 OCRSPACE_API_KEY = os.getenv("OCRSPACE_API_KEY")
 ocrspace_available = bool(OCRSPACE_API_KEY and OCRSPACE_API_KEY != "YOUR_OCRSPACE_API_KEY")
 
+def _package_version(dist: str) -> str:
+    try:
+        return importlib.metadata.version(dist)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+# Bump an engine's version here when its settings change, so cached text is re-extracted
+OCR_ENGINE_VERSIONS = {
+    "azure": f"prebuilt-read/{_package_version('azure-ai-formrecognizer')}",
+    "ocrspace": "parse-image/eng",
+    "pypdf2": f"{_package_version('PyPDF2')}+page-ocr",
+    # Race mode: text layer only, the remote racers cover scanned pages
+    "pypdf2-text": _package_version('PyPDF2'),
+}
+
 # === Check if PyPDF2 is available for PDF extraction ===
 def check_pypdf2_available():
-    """Check if PyPDF2 is installed and available"""
-    try:
-        import PyPDF2
-        return True
-    except ImportError:
-        return False
+    """Check if PyPDF2 is installed and available (without importing it)"""
+    return importlib.util.find_spec("PyPDF2") is not None
 
 pypdf2_available = check_pypdf2_available()
 
@@ -108,6 +188,12 @@ def allowed_file(filename: str) -> bool:
 def generate_unique_filename(filename: str) -> str:
     return f"{int(time.time())}_{uuid.uuid4().hex[:8]}_{secure_filename(filename)}"
 
+def save_report_results(report_id: str, result_data: Dict) -> str:
+    result_json_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{report_id}.results.json")
+    with open(result_json_path, "w", encoding="utf-8") as f:
+        json.dump(result_data, f, indent=2)
+    return result_json_path
+
 def validate_report_content(text: str) -> Optional[Dict]:
     if len(text.strip()) < 50:
         return {"status": "error", "message": "Report too short or unreadable"}
@@ -122,16 +208,7 @@ def extract_text_azure(file_path):
         raise ValueError("Azure OCR client not initialized. Please set AZURE_ENDPOINT and AZURE_KEY environment variables.")
     
     print(f"[🔍] Extracting text from: {file_path}")
-    with open(file_path, "rb") as f:
-        poller = azure_client.begin_analyze_document("prebuilt-read", document=f)
-    result = poller.result()
-
-    text = ""
-    for page in result.pages:
-        for line in page.lines:
-            text += line.content + "\n"
-    
-    extracted = text.strip()
+    extracted = azure_client.extract_text(file_path)
     print(f"[✅] Extracted {len(extracted)} characters from document")
     return extracted
 
@@ -148,12 +225,101 @@ def extract_text_ocrspace(file_path):
         print(f"[❌] OCR.Space extraction failed: {str(e)}")
         return ""
 
-def extract_text_with_fallback(file_path):
-    """Unified OCR extraction with fallback mechanism"""
-    # Try Azure OCR first (best for PDFs and documents)
+class IncompleteText(str):
+    """Extracted text missing pages that weren't or couldn't be OCR'd; returned to the caller but never cached"""
+
+def _pdf_page_ocr() -> Optional[Callable[[str], str]]:
+    """OCR engine for single scanned pages of an otherwise text-based PDF"""
+    if azure_client:
+        return extract_text_azure
+    if ocrspace_available:
+        return extract_text_ocrspace
+    return None
+
+def extract_text_pypdf2(file_path, page_ocr: bool = True):
+    """Extract embedded text from a PDF with PyPDF2, OCR'ing only the pages that have none ("" if no page has text).
+
+    Text with pages still missing - page OCR failed, was unavailable, or was
+    skipped (page_ocr=False, or every page is scanned) - comes back as
+    IncompleteText.
+    """
+    try:
+        from pdf_text import extract_pdf_text
+        print(f"[🔍] Attempting PDF text extraction with PyPDF2: {file_path}")
+        extracted, missing, failed = extract_pdf_text(file_path, ocr_page=_pdf_page_ocr() if page_ocr else None)
+        if extracted:
+            print(f"[✅] PyPDF2 extracted {len(extracted)} characters")
+            if missing:
+                print(f"[⚠️] Page(s) {missing} have little or no text (image-based, and page OCR skipped or failed)")
+                # Retried on the next upload of this file instead of served short from the cache
+                return IncompleteText(extracted)
+        else:
+            print("[⚠️] PyPDF2 extracted empty text - PDF appears to be image-based (scanned document)")
+            print("[💡] For scanned PDFs, Azure OCR is required. PyPDF2 only works with text-based PDFs.")
+        return extracted
+    except ImportError:
+        print("[⚠️] PyPDF2 not available. Install with: pip install PyPDF2")
+    except Exception as e:
+        print(f"[❌] PyPDF2 extraction failed: {str(e)}")
+        import traceback
+        print(f"[❌] PyPDF2 traceback: {traceback.format_exc()}")
+    return ""
+
+def _cached_ocr(engine, extract, file_path, file_hash):
+    """Run one OCR engine, reusing text it already produced for these exact file bytes"""
+    version = OCR_ENGINE_VERSIONS[engine]
+    text = Config.ocr_cache.get(file_hash, engine, version)
+    if text is not None:
+        print(f"[⚡] Reusing {engine} text for {Path(file_path).name} ({file_hash[:12]})")
+        return text
+    text = extract(file_path)
+    if text and text.strip() and not isinstance(text, IncompleteText):
+        Config.ocr_cache.set(text, file_hash, engine, version)
+    return text
+
+def _no_ocr_text_error(file_path) -> ValueError:
+    file_ext = Path(file_path).suffix.lower()
+    if file_ext == '.pdf':
+        return ValueError(
+            "PDF text extraction failed. Possible reasons:\n"
+            "1. PDF is image-based (scanned) - requires Azure OCR\n"
+            "2. PDF is encrypted or corrupted\n"
+            "3. No OCR service configured\n\n"
+            "Solutions:\n"
+            "- For scanned PDFs: Configure Azure OCR (AZURE_ENDPOINT and AZURE_KEY)\n"
+            "- For text-based PDFs: PyPDF2 is installed but couldn't extract text\n"
+            "- Check if PDF is password-protected or corrupted"
+        )
+    return ValueError(
+        "No OCR service available for image files. Please configure one of:\n"
+        "- Azure OCR: Set AZURE_ENDPOINT and AZURE_KEY environment variables\n"
+        "- OCR.Space: Set OCRSPACE_API_KEY environment variable"
+    )
+
+def extract_text_with_fallback(file_path, file_hash=None):
+    """Unified OCR extraction with fallback mechanism.
+
+    Text is cached per (file hash, engine, engine version), independently of
+    the NLP rules, so re-analysing old uploads never repeats OCR.
+    With OCR_STRATEGY=race the engines run concurrently instead (see extract_text_race).
+    """
+    file_hash = file_hash or file_sha256(file_path)
+    if Config.OCR_STRATEGY == "race":
+        return extract_text_race(file_path, file_hash)
+
+    # PDFs: embedded text first; only pages without a text layer go to OCR
+    partial = None
+    if Path(file_path).suffix.lower() == '.pdf':
+        extracted = _cached_ocr("pypdf2", extract_text_pypdf2, file_path, file_hash)
+        if extracted and not (isinstance(extracted, IncompleteText) and azure_client):
+            return extracted
+        # Pages are missing: OCR the whole document, keeping the partial text in case that fails
+        partial = extracted or None
+
+    # Azure OCR for scans and images (best for documents)
     if azure_client:
         try:
-            return extract_text_azure(file_path)
+            return _cached_ocr("azure", extract_text_azure, file_path, file_hash)
         except Exception as e:
             print(f"[⚠️] Azure OCR failed: {str(e)}")
             print("[🔄] Attempting fallback OCR method...")
@@ -163,65 +329,106 @@ def extract_text_with_fallback(file_path):
         file_ext = Path(file_path).suffix.lower()
         # OCR.Space works better with images than PDFs
         if file_ext in ['.png', '.jpg', '.jpeg', '.tiff']:
-            text = extract_text_ocrspace(file_path)
+            text = _cached_ocr("ocrspace", extract_text_ocrspace, file_path, file_hash)
             if text and text.strip():
                 return text
     
-    # If all else fails, try PyPDF2 for PDFs
-    if Path(file_path).suffix.lower() == '.pdf':
-        try:
-            import PyPDF2
-            print(f"[🔍] Attempting PDF text extraction with PyPDF2: {file_path}")
-            text = ""
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                total_pages = len(pdf_reader.pages)
-                print(f"[📄] PDF has {total_pages} page(s)")
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text and page_text.strip():
-                            text += page_text + "\n"
-                            print(f"[✅] Page {page_num}: Extracted {len(page_text)} characters")
-                        else:
-                            print(f"[⚠️] Page {page_num}: No text found (might be image-based)")
-                    except Exception as page_error:
-                        print(f"[⚠️] Page {page_num}: Extraction error - {str(page_error)}")
-                        continue
-            extracted = text.strip()
-            if extracted:
-                print(f"[✅] PyPDF2 extracted {len(extracted)} characters from {total_pages} page(s)")
-                return extracted
-            else:
-                print("[⚠️] PyPDF2 extracted empty text - PDF appears to be image-based (scanned document)")
-                print("[💡] For scanned PDFs, Azure OCR is required. PyPDF2 only works with text-based PDFs.")
-                # Don't raise error here - let it fall through to show all options
-        except ImportError:
-            print("[⚠️] PyPDF2 not available. Install with: pip install PyPDF2")
-        except Exception as e:
-            print(f"[❌] PyPDF2 extraction failed: {str(e)}")
-            import traceback
-            print(f"[❌] PyPDF2 traceback: {traceback.format_exc()}")
-    
+    if partial:
+        return partial
     # No OCR method available or all methods failed
+    raise _no_ocr_text_error(file_path)
+
+# Local PyPDF2 parsing and OCR.Space calls for race mode; Azure runs on its own event loop
+ocr_race_pool = ThreadPoolExecutor(max_workers=int(os.getenv("OCR_RACE_WORKERS", "4")), thread_name_prefix="ocr-race")
+
+def ocr_text_acceptable(text: Optional[str]) -> bool:
+    """Good enough to stop the race: long enough and reads like a medical report"""
+    return bool(text) and len(text.strip()) >= Config.OCR_RACE_MIN_CHARS and validate_report_content(text) is None
+
+def _race_engines(file_path) -> Dict[str, Callable[[], Future]]:
+    """Engines that apply to this file, cheapest first, each starting a cancellable future"""
     file_ext = Path(file_path).suffix.lower()
+    engines = {}
     if file_ext == '.pdf':
-        raise ValueError(
-            "PDF text extraction failed. Possible reasons:\n"
-            "1. PDF is image-based (scanned) - requires Azure OCR\n"
-            "2. PDF is encrypted or corrupted\n"
-            "3. No OCR service configured\n\n"
-            "Solutions:\n"
-            "- For scanned PDFs: Configure Azure OCR (AZURE_ENDPOINT and AZURE_KEY)\n"
-            "- For text-based PDFs: PyPDF2 is installed but couldn't extract text\n"
-            "- Check if PDF is password-protected or corrupted"
-        )
-    else:
-        raise ValueError(
-            "No OCR service available for image files. Please configure one of:\n"
-            "- Azure OCR: Set AZURE_ENDPOINT and AZURE_KEY environment variables\n"
-            "- OCR.Space: Set OCRSPACE_API_KEY environment variable"
-        )
+        # Text layer only: OCR'ing scanned pages here would duplicate the Azure racer's work
+        engines["pypdf2-text"] = lambda: ocr_race_pool.submit(extract_text_pypdf2, file_path, False)
+    if azure_client:
+        # Cancelling this future cancels the analyze task, so it stops polling Azure
+        engines["azure"] = lambda: azure_client.submit(file_path)
+    if ocrspace_available and file_ext in ['.png', '.jpg', '.jpeg', '.tiff']:
+        engines["ocrspace"] = lambda: ocr_race_pool.submit(extract_text_ocrspace, file_path)
+    return engines
+
+def extract_text_race(file_path, file_hash):
+    """Start every applicable engine at once and return the first acceptable text.
+
+    The local PyPDF2 text layer usually finishes first, so text-based PDFs
+    return at parse speed; scanned PDFs and images wait for the remote engines,
+    and so do PDFs with some scanned pages (their text layer never wins).
+    Losers are cancelled (an OCR.Space request already on the wire runs to
+    completion in the background); any engine that does finish still fills
+    the OCR cache. If nothing passes ocr_text_acceptable, the longest
+    non-empty text is returned, as the sequential chain would have.
+    """
+    engines = _race_engines(file_path)
+    cached = {}
+    for engine in engines:
+        text = Config.ocr_cache.get(file_hash, engine, OCR_ENGINE_VERSIONS[engine])
+        if text is not None:
+            cached[engine] = text
+            if ocr_text_acceptable(text):
+                print(f"[⚡] Reusing {engine} text for {Path(file_path).name} ({file_hash[:12]})")
+                return text
+
+    def remember(engine):
+        def done(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            text = future.result()
+            if text and text.strip() and not isinstance(text, IncompleteText):
+                Config.ocr_cache.set(text, file_hash, engine, OCR_ENGINE_VERSIONS[engine])
+        return done
+
+    started = time.time()
+    futures = {}
+    for engine, start in engines.items():
+        if engine in cached:
+            continue
+        future = start()
+        future.add_done_callback(remember(engine))
+        futures[future] = engine
+    print(f"[🏁] Racing OCR engines {list(futures.values())} on {Path(file_path).name}")
+
+    results = dict(cached)
+    pending = set(futures)
+    try:
+        while pending:
+            remaining = Config.OCR_RACE_TIMEOUT - (time.time() - started)
+            if remaining <= 0:
+                print(f"[⚠️] OCR race timed out waiting for {[futures[f] for f in pending]}")
+                break
+            finished, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                engine = futures[future]
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"[⚠️] {engine} OCR failed: {str(e)}")
+                    continue
+                if ocr_text_acceptable(text) and not isinstance(text, IncompleteText):
+                    print(f"[✅] {engine} won the OCR race in {time.time() - started:.2f}s ({len(text)} characters)")
+                    return text
+                if text and text.strip():
+                    results[engine] = text
+    finally:
+        for future in pending:
+            future.cancel()
+
+    if results:
+        engine, text = max(results.items(), key=lambda item: len(item[1].strip()))
+        print(f"[⚠️] No OCR result passed the quality bar; using {engine} ({len(text)} characters)")
+        return text
+    raise _no_ocr_text_error(file_path)
 
 # === Routes ===
 @app.route('/')
@@ -232,6 +439,192 @@ def home():
 def upload():
     return render_template('prescription-reader.html')
 
+class ReportError(Exception):
+    """Report pipeline failure carrying the JSON body and HTTP status to answer with"""
+
+    def __init__(self, body: Dict, status: int = 500):
+        super().__init__(body.get("message", ""))
+        self.body = body
+        self.status = status
+
+def process_report(report_id: str, saved_path: str, filename: str, file_hash: str,
+                   on_stage: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """OCR + NLP + enhanced analysis for an uploaded report; saves and returns the results.
+
+    Shared by the synchronous /upload route and the background job queue.
+    ``on_stage(stage, partial_results)`` is called as each stage completes:
+    ocr, nlp, measurements, enhanced, persisted (or cached on a duplicate upload).
+    """
+    on_stage = on_stage or (lambda stage, data=None: None)
+    print(f"\n[📤] Upload started: {filename}")
+    print(f"[🆔] Report ID: {report_id}")
+
+    cached = Config.result_cache.get("upload", file_hash)
+    if cached is not None:
+        print(f"[⚡] Same file analysed before ({file_hash[:12]}) - returning cached results")
+        result_data = {"status": "success", "report_id": report_id, "filename": filename, **cached}
+        save_report_results(report_id, result_data)
+        on_stage("cached", {"extracted_text": cached.get("extracted_text", "")})
+        return result_data
+
+    # Try OCR extraction - the function will attempt all available methods
+    print("[🔍] Starting OCR extraction...")
+    print(f"[📁] File path: {saved_path}")
+    print(f"[📄] File exists: {os.path.exists(saved_path)}")
+    print(f"[📏] File size: {os.path.getsize(saved_path) if os.path.exists(saved_path) else 0} bytes")
+
+    try:
+        extracted_text = extract_text_with_fallback(saved_path, file_hash)
+    except ValueError as e:
+        # Handle case where no OCR service is available or extraction failed
+        file_ext = Path(saved_path).suffix.lower()
+        error_message = str(e)
+        print(f"[❌] OCR extraction failed: {error_message}")
+        print(f"[📋] File extension: {file_ext}")
+        print(f"[🔧] Azure OCR available: {azure_client is not None}")
+        print(f"[🔧] OCR.Space available: {ocrspace_available}")
+        print(f"[🔧] PyPDF2 available: {pypdf2_available}")
+
+        raise ReportError({
+            "status": "error",
+            "message": error_message,
+            "report_id": report_id,
+            "filename": filename,
+            "debug_info": {
+                "file_extension": file_ext,
+                "azure_ocr_configured": azure_client is not None,
+                "ocrspace_configured": ocrspace_available,
+                "pypdf2_installed": pypdf2_available
+            }
+        }, 500)
+    print(f"[✅] OCR Extraction Complete - Text length: {len(extracted_text)} characters")
+    print(f"[📄] OCR Text preview (first 200 chars): {extracted_text[:200]}...")
+
+    if not extracted_text or not extracted_text.strip():
+        print("[❌] No text extracted from document")
+        raise ReportError({"status": "error", "message": "No text extracted from the document"}, 400)
+    on_stage("ocr", {"extracted_text": extracted_text})
+
+    print("[🧠] Starting NLP processing...")
+    try:
+        analysis = run_nlp(extracted_text)
+    except NLPPoolBusy as e:
+        print(f"[⏳] NLP workers busy: {e}")
+        raise ReportError({"status": "error", "message": "Server busy, please retry shortly"}, 503)
+    except NLPTimeout as e:
+        print(f"[❌] {e}")
+        raise ReportError({"status": "error", "message": "NLP processing timed out"}, 504)
+    except Exception as e:
+        print(f"[❌] NLP engine not initialized: {e}")
+        raise ReportError({
+            "status": "error",
+            "message": "NLP engine not initialized"
+        }, 500)
+    print(f"[✅] NLP Processing Complete")
+    print(f"[📊] Analysis results:")
+    print(f"   - Diseases found: {len(analysis.get('diseases', []))}")
+    print(f"   - Medications found: {len(analysis.get('medications', []))}")
+    print(f"   - Diseases: {analysis.get('diseases', [])}")
+    print(f"   - Medications: {analysis.get('medications', [])}")
+    on_stage("nlp", {
+        "diseases": analysis.get("diseases", []),
+        "medications": analysis.get("medications", []),
+        "measurements": analysis.get("measurements", {})
+    })
+
+    diseases = analysis.get("diseases", [])
+
+    disease_names = [d.lower() for d in diseases]
+    normalized_recommendations = {k.lower(): v for k, v in symptoms_recommendations.items()}
+    recommendations = list({rec for d in disease_names for rec in normalized_recommendations.get(d, [])})
+    print(f"[💡] Recommendations generated: {len(recommendations)}")
+
+    print("[🔬] Starting enhanced analysis...")
+    # Analyze measurements with normal ranges
+    measurements_analysis = Config.analysis_engine.analyze_measurements(analysis.get("measurements", {}))
+    print(f"[📊] Measurements Analysis Complete")
+    print(f"   - Total tests: {measurements_analysis.get('total_tests', 0)}")
+    print(f"   - Abnormal tests: {measurements_analysis.get('abnormal_count', 0)}")
+    on_stage("measurements", {"measurements_analysis": measurements_analysis})
+
+    # Suggest diseases from abnormal measurements
+    suggested_diseases_from_measurements = Config.analysis_engine.suggest_diseases_from_measurements(
+        measurements_analysis.get("abnormal_tests", [])
+    )
+    print(f"[🦠] Suggested diseases from measurements: {suggested_diseases_from_measurements}")
+
+    # Merge suggested diseases with detected diseases
+    existing_diseases = analysis.get("diseases", [])
+    all_diseases = list(set(existing_diseases + suggested_diseases_from_measurements))
+    analysis["diseases"] = all_diseases
+
+    # Add measurements_analysis to analysis object for priority recommendations
+    analysis["measurements_analysis"] = measurements_analysis
+
+    # Enhanced analysis
+    enhanced_analysis = Config.analysis_engine.generate_comprehensive_summary(analysis)
+    priority_recommendations = Config.analysis_engine.generate_priority_recommendations(analysis)
+    drug_interactions = Config.analysis_engine.check_drug_interactions(analysis.get("medications", []))
+    print(f"[✅] Enhanced Analysis Complete")
+    print(f"   - Priority recommendations: {len(priority_recommendations)}")
+    print(f"   - Drug interactions: {len(drug_interactions)}")
+    on_stage("enhanced", {
+        "enhanced_analysis": enhanced_analysis,
+        "priority_recommendations": priority_recommendations,
+        "drug_interactions": drug_interactions
+    })
+
+    result_data = {
+        "status": "success",
+        "report_id": report_id,
+        "filename": filename,
+        "extracted_text": extracted_text,
+        "analysis": analysis,
+        "recommendations": recommendations,
+        "enhanced_analysis": enhanced_analysis,
+        "priority_recommendations": priority_recommendations,
+        "drug_interactions": drug_interactions,
+        "measurements_analysis": measurements_analysis
+    }
+
+    result_json_path = save_report_results(report_id, result_data)
+    Config.result_cache.set(
+        {k: v for k, v in result_data.items() if k not in ("status", "report_id", "filename")},
+        "upload", file_hash
+    )
+
+    print(f"[💾] Results saved to: {result_json_path}")
+    on_stage("persisted", {"result_url": f"/api/get-report/{report_id}"})
+    return result_data
+
+def _run_report_job(report_id: str, payload: Dict, progress) -> None:
+    process_report(report_id, payload["saved_path"], payload["filename"], payload["file_hash"], progress)
+
+# Background processing for /upload?async=1; status and results via /api/get-report/<report_id>
+report_jobs = JobQueue(
+    make_job_store(),
+    _run_report_job,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "50"))
+)
+# Process start, reset by a pre-fork worker when it is forked; reported by /api/health
+STARTED_AT = time.time()
+
+# NLP pool workers (spawn/forkserver) re-import the main script, and with it this module;
+# start-up work below belongs to the serving process only
+_POOL_CHILD = multiprocessing.parent_process() is not None
+
+# A pre-fork master sets JOB_RECOVER=0 and lets its first worker re-queue jobs after forking
+if os.getenv("JOB_RECOVER", "1") == "1" and not _POOL_CHILD:
+    report_jobs.recover()
+
+if Config.SERVICE_WARMUP in ("background", "blocking") and not _POOL_CHILD:
+    services.warm_up(background=Config.SERVICE_WARMUP == "background")
+
+def wants_async(req) -> bool:
+    return req.args.get("async", "").lower() in ("1", "true", "yes") or \
+        "respond-async" in req.headers.get("Prefer", "")
+
 @app.route("/upload", methods=["POST"])
 def upload_file_report():
     if "report" not in request.files:
@@ -244,124 +637,30 @@ def upload_file_report():
     filename = secure_filename(file.filename)
     report_id = str(uuid.uuid4())
     saved_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{report_id}_{filename}")
+    file_hash = file_sha256(file.stream)
     file.save(saved_path)
 
-    try:
-        print(f"\n[📤] Upload started: {filename}")
-        print(f"[🆔] Report ID: {report_id}")
-        
-        # Try OCR extraction - the function will attempt all available methods
-        print("[🔍] Starting OCR extraction...")
-        print(f"[📁] File path: {saved_path}")
-        print(f"[📄] File exists: {os.path.exists(saved_path)}")
-        print(f"[📏] File size: {os.path.getsize(saved_path) if os.path.exists(saved_path) else 0} bytes")
-        
+    if wants_async(request):
         try:
-            extracted_text = extract_text_with_fallback(saved_path)
-        except ValueError as e:
-            # Handle case where no OCR service is available or extraction failed
-            file_ext = Path(saved_path).suffix.lower()
-            error_message = str(e)
-            print(f"[❌] OCR extraction failed: {error_message}")
-            print(f"[📋] File extension: {file_ext}")
-            print(f"[🔧] Azure OCR available: {azure_client is not None}")
-            print(f"[🔧] OCR.Space available: {ocrspace_available}")
-            print(f"[🔧] PyPDF2 available: {pypdf2_available}")
-            
-            return jsonify({
-                "status": "error", 
-                "message": error_message,
-                "report_id": report_id,
-                "filename": filename,
-                "debug_info": {
-                    "file_extension": file_ext,
-                    "azure_ocr_configured": azure_client is not None,
-                    "ocrspace_configured": ocrspace_available,
-                    "pypdf2_installed": pypdf2_available
-                }
-            }), 500
-        print(f"[✅] OCR Extraction Complete - Text length: {len(extracted_text)} characters")
-        print(f"[📄] OCR Text preview (first 200 chars): {extracted_text[:200]}...")
-        
-        if not extracted_text or not extracted_text.strip():
-            print("[❌] No text extracted from document")
-            return jsonify({"status": "error", "message": "No text extracted from the document"}), 400
-
-        # Check if NLP engine is available
-        if not Config.nlp_engine:
-            print("[❌] NLP engine not initialized")
-            return jsonify({
-                "status": "error",
-                "message": "NLP engine not initialized"
-            }), 500
-        
-        print("[🧠] Starting NLP processing...")
-        analysis = Config.nlp_engine.process_text(extracted_text)
-        print(f"[✅] NLP Processing Complete")
-        print(f"[📊] Analysis results:")
-        print(f"   - Diseases found: {len(analysis.get('diseases', []))}")
-        print(f"   - Medications found: {len(analysis.get('medications', []))}")
-        print(f"   - Diseases: {analysis.get('diseases', [])}")
-        print(f"   - Medications: {analysis.get('medications', [])}")
-        
-        diseases = analysis.get("diseases", [])
-
-        disease_names = [d.lower() for d in diseases]
-        normalized_recommendations = {k.lower(): v for k, v in symptoms_recommendations.items()}
-        recommendations = list({rec for d in disease_names for rec in normalized_recommendations.get(d, [])})
-        print(f"[💡] Recommendations generated: {len(recommendations)}")
-
-        print("[🔬] Starting enhanced analysis...")
-        # Analyze measurements with normal ranges
-        measurements_analysis = Config.analysis_engine.analyze_measurements(analysis.get("measurements", {}))
-        print(f"[📊] Measurements Analysis Complete")
-        print(f"   - Total tests: {measurements_analysis.get('total_tests', 0)}")
-        print(f"   - Abnormal tests: {measurements_analysis.get('abnormal_count', 0)}")
-        
-        # Suggest diseases from abnormal measurements
-        suggested_diseases_from_measurements = Config.analysis_engine.suggest_diseases_from_measurements(
-            measurements_analysis.get("abnormal_tests", [])
-        )
-        print(f"[🦠] Suggested diseases from measurements: {suggested_diseases_from_measurements}")
-        
-        # Merge suggested diseases with detected diseases
-        existing_diseases = analysis.get("diseases", [])
-        all_diseases = list(set(existing_diseases + suggested_diseases_from_measurements))
-        analysis["diseases"] = all_diseases
-        
-        # Add measurements_analysis to analysis object for priority recommendations
-        analysis["measurements_analysis"] = measurements_analysis
-        
-        # Enhanced analysis
-        enhanced_analysis = Config.analysis_engine.generate_comprehensive_summary(analysis)
-        priority_recommendations = Config.analysis_engine.generate_priority_recommendations(analysis)
-        drug_interactions = Config.analysis_engine.check_drug_interactions(analysis.get("medications", []))
-        print(f"[✅] Enhanced Analysis Complete")
-        print(f"   - Priority recommendations: {len(priority_recommendations)}")
-        print(f"   - Drug interactions: {len(drug_interactions)}")
-
-        result_data = {
-            "status": "success",
+            report_jobs.submit(report_id, saved_path=saved_path, filename=filename, file_hash=file_hash)
+        except QueueFull as e:
+            print(f"[⏳] Rejecting upload, job queue full: {e}")
+            return jsonify({"status": "error", "message": "Server busy, please retry shortly"}), 503, {"Retry-After": "5"}
+        print(f"[📥] Queued report {report_id} ({filename})")
+        return jsonify({
+            "status": "queued",
             "report_id": report_id,
             "filename": filename,
-            "extracted_text": extracted_text,
-            "analysis": analysis,
-            "recommendations": recommendations,
-            "enhanced_analysis": enhanced_analysis,
-            "priority_recommendations": priority_recommendations,
-            "drug_interactions": drug_interactions,
-            "measurements_analysis": measurements_analysis
-        }
+            "status_url": f"/api/get-report/{report_id}"
+        }), 202
 
-        result_json_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{report_id}.results.json")
-        with open(result_json_path, "w", encoding="utf-8") as f:
-            json.dump(result_data, f, indent=2)
-        
-        print(f"[💾] Results saved to: {result_json_path}")
+    try:
+        result_data = process_report(report_id, saved_path, filename, file_hash)
         print(f"[✅] Upload processing complete - Returning response\n")
-        
         return jsonify(result_data)
 
+    except ReportError as e:
+        return jsonify(e.body), e.status
     except ValueError as e:
         # Handle specific value errors (like missing Azure client)
         print(f"[❌] Value error in upload: {str(e)}")
@@ -398,46 +697,22 @@ def upload_file():
     try:
         filename = generate_unique_filename(file.filename)
         file_path = Config.UPLOAD_FOLDER / filename
+        file_hash = file_sha256(file.stream)
         file.save(file_path)
-        
-        extracted_text = extract_text_with_fallback(file_path)
-        
-        if not extracted_text.strip():
-            return jsonify({"error": "OCR failed to extract text"}), 400
-            
-        if len(extracted_text.strip()) < 20:
-            return jsonify({
-                "status": "error",
-                "message": "Insufficient text extracted",
-                "debug": {
-                    "text_sample": extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text,
-                    "length": len(extracted_text)
-                }
-            }), 400
-            
-        if validation := validate_report_content(extracted_text):
-            return jsonify(validation), 400
 
-        analysis = analyze_medical_text(extracted_text, Config.AWS_ACCESS_KEY, Config.AWS_SECRET_KEY)
-        
-        # Enhanced analysis
-        enhanced_analysis = Config.analysis_engine.generate_comprehensive_summary(analysis)
-        priority_recommendations = Config.analysis_engine.generate_priority_recommendations(analysis)
-        drug_interactions = Config.analysis_engine.check_drug_interactions(analysis.get("medications", []))
-        
+        cached = Config.result_cache.get("api_upload", file_hash)
+        if cached is None:
+            cached, error = _analyze_upload(file_path, file_hash)
+            if error:
+                return jsonify(error), 400
+            Config.result_cache.set(cached, "api_upload", file_hash)
+
         response = {
             "status": "success",
             "report_id": str(uuid.uuid4()),
             "filename": filename,
-            "analysis": analysis,
-            "enhanced_analysis": enhanced_analysis,
-            "priority_recommendations": priority_recommendations,
-            "drug_interactions": drug_interactions,
-            "metadata": {
-            "processing_time": time.time(),
-            "text_length": len(extracted_text),
-            "pages": extracted_text.count('\n\n') + 1
-            }
+            **{k: v for k, v in cached.items() if k != "metadata"},
+            "metadata": {"processing_time": time.time(), **cached["metadata"]}
         }
 
         results_path = Config.UPLOAD_FOLDER / f"{filename}.results.json"
@@ -454,6 +729,47 @@ def upload_file():
             "error": str(e)
         }), 500
 
+def _analyze_upload(file_path, file_hash=None):
+    """OCR + Comprehend analysis behind /api/upload.
+
+    Returns (result, None), or (None, error_body) when the extracted text is unusable.
+    """
+    extracted_text = extract_text_with_fallback(file_path, file_hash)
+
+    if not extracted_text.strip():
+        return None, {"error": "OCR failed to extract text"}
+
+    if len(extracted_text.strip()) < 20:
+        return None, {
+            "status": "error",
+            "message": "Insufficient text extracted",
+            "debug": {
+                "text_sample": extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text,
+                "length": len(extracted_text)
+            }
+        }
+
+    if validation := validate_report_content(extracted_text):
+        return None, validation
+
+    analysis = analyze_medical_text(extracted_text, Config.AWS_ACCESS_KEY, Config.AWS_SECRET_KEY)
+
+    # Enhanced analysis
+    enhanced_analysis = Config.analysis_engine.generate_comprehensive_summary(analysis)
+    priority_recommendations = Config.analysis_engine.generate_priority_recommendations(analysis)
+    drug_interactions = Config.analysis_engine.check_drug_interactions(analysis.get("medications", []))
+
+    return {
+        "analysis": analysis,
+        "enhanced_analysis": enhanced_analysis,
+        "priority_recommendations": priority_recommendations,
+        "drug_interactions": drug_interactions,
+        "metadata": {
+            "text_length": len(extracted_text),
+            "pages": extracted_text.count('\n\n') + 1
+        }
+    }, None
+
 @app.route('/api/analyze/text', methods=['POST'])
 def analyze_text():
     """Endpoint for direct text analysis (no OCR)"""
@@ -484,6 +800,123 @@ def analyze_text():
             "error": str(e)
         }), 500
 
+def _batch_too_large():
+    return jsonify({
+        "status": "error",
+        "message": f"Too many items in batch (max {Config.BATCH_MAX_ITEMS})"
+    }), 400
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Endpoint for batch analysis of many texts or report files.
+
+    Accepts either JSON ``{"texts": [...]}`` or multipart uploads under
+    ``reports``. Results are returned in the same order as the inputs.
+    """
+    items = []  # (source, text or None, error or None)
+    if request.is_json:
+        texts = (request.get_json(silent=True) or {}).get('texts')
+        if not isinstance(texts, list):
+            return jsonify({"status": "error", "message": "'texts' must be a list"}), 400
+        if len(texts) > Config.BATCH_MAX_ITEMS:
+            return _batch_too_large()
+        for i, text in enumerate(texts):
+            text = text.strip() if isinstance(text, str) else ''
+            if len(text) < 50:
+                items.append((f"texts[{i}]", None, "Text too short"))
+            else:
+                items.append((f"texts[{i}]", text, None))
+    else:
+        files = request.files.getlist('reports')
+        if not files:
+            return jsonify({"status": "error", "message": "No texts or files provided"}), 400
+        # Reject before saving or OCR'ing anything: OCR calls are billed per document
+        if len(files) > Config.BATCH_MAX_ITEMS:
+            return _batch_too_large()
+        for file in files:
+            if not file.filename or not allowed_file(file.filename):
+                items.append((file.filename, None, "Invalid file type"))
+                continue
+            file_path = Config.UPLOAD_FOLDER / generate_unique_filename(file.filename)
+            file.save(file_path)
+            try:
+                text = extract_text_with_fallback(file_path)
+            except Exception as e:
+                items.append((file.filename, None, str(e)))
+                continue
+            finally:
+                # Batch uploads are only read once; nothing links back to the saved file
+                file_path.unlink(missing_ok=True)
+            if not text or not text.strip():
+                items.append((file.filename, None, "No text extracted from the document"))
+            else:
+                items.append((file.filename, text, None))
+
+    if not items:
+        return jsonify({"status": "error", "message": "No texts or files provided"}), 400
+
+    try:
+        start = time.time()
+        analyses = iter(run_nlp_batch([text for _, text, error in items if error is None]))
+        results = []
+        for index, (source, text, error) in enumerate(items):
+            if error is not None:
+                results.append({"index": index, "source": source, "status": "error", "message": error})
+            else:
+                results.append({"index": index, "source": source, "status": "success", "analysis": next(analyses)})
+        return jsonify({
+            "status": "success",
+            "results": results,
+            "metadata": {
+                "processing_time": time.time() - start,
+                "count": len(results)
+            }
+        })
+    except NLPPoolBusy as e:
+        print(f"[⏳] Rejecting batch, NLP workers busy: {e}")
+        return jsonify({"status": "error", "message": "Server busy, please retry shortly"}), 503, {"Retry-After": "5"}
+    except NLPTimeout as e:
+        return jsonify({"status": "error", "message": "Batch analysis timed out", "error": str(e)}), 504
+    except Exception as e:
+        app.logger.error(f"Error analyzing batch: {str(e)}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "Failed to analyze batch",
+            "error": str(e)
+        }), 500
+
+@app.route('/api/debug/cache-stats', methods=['GET'])
+def debug_cache_stats():
+    """Debug endpoint exposing in-memory cache counters for sizing"""
+    # Pool workers keep their own normalization caches; the pool's counters stand in for them
+    # Reported once something has used the pool; reading stats shouldn't start its workers
+    if Config.NLP_POOL_WORKERS > 0:
+        nlp_stats = [services.get("nlp_pool").stats()] if services.loaded("nlp_pool") else []
+    else:
+        nlp_stats = nlp_engine().cache_stats()
+    return jsonify({
+        "status": "success",
+        "caches": nlp_stats + [
+            ENTITY_CORRECTIONS.stats(), Config.result_cache.stats(), Config.ocr_cache.stats(), report_jobs.stats()
+        ] + ([azure_client.stats()] if azure_client else [])
+    })
+
+@app.route('/api/debug/services', methods=['GET'])
+def debug_services():
+    """Debug endpoint showing which lazy services are loaded and how long each took"""
+    return jsonify({"status": "success", "warmup": Config.SERVICE_WARMUP, "services": services.stats()})
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Liveness of the process that answered: pid (which pre-fork worker), uptime, job queue, loaded services"""
+    return jsonify({
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime": round(time.time() - STARTED_AT, 1),
+        "jobs": report_jobs.stats(),
+        "services": {s["name"]: s["loaded"] for s in services.stats()}
+    })
+
 @app.route('/api/debug/ocr', methods=['POST'])
 def debug_ocr():
     """Debug endpoint for OCR testing"""
@@ -528,10 +961,14 @@ def analyze():
     file = request.files['report']
     filename = generate_unique_filename(file.filename)
     file_path = Config.UPLOAD_FOLDER / filename
+    file_hash = file_sha256(file.stream)
     file.save(file_path)
 
-    text = extract_text_with_fallback(file_path)
-    result = analyze_medical_text(text, Config.AWS_ACCESS_KEY, Config.AWS_SECRET_KEY)
+    result = Config.result_cache.get("analyze", file_hash)
+    if result is None:
+        text = extract_text_with_fallback(file_path, file_hash)
+        result = analyze_medical_text(text, Config.AWS_ACCESS_KEY, Config.AWS_SECRET_KEY)
+        Config.result_cache.set(result, "analyze", file_hash)
 
     return render_template('report-analysis.html', result=result)
 
@@ -548,6 +985,11 @@ def get_report(report_id):
         result_json_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{report_id}.results.json")
         
         if not os.path.exists(result_json_path):
+            job = report_jobs.store.get(report_id)
+            if job and job["status"] == "failed":
+                return jsonify(job["error"]), job["http_status"] or 500
+            if job and job["status"] != "done":
+                return jsonify({"status": job["status"], "report_id": report_id}), 202
             return jsonify({
                 "status": "error",
                 "message": f"Report with ID {report_id} not found"
@@ -567,6 +1009,67 @@ def get_report(report_id):
             "message": f"Failed to load report: {str(e)}"
         }), 500
 
+report_event_streams = threading.BoundedSemaphore(Config.REPORT_EVENTS_MAX_STREAMS)
+
+@app.route('/api/report/<report_id>/events', methods=['GET'])
+def report_events(report_id):
+    """Server-sent events for a queued report: one event per completed stage.
+
+    Stages carry partial results (OCR text, detected entities, measurements)
+    so the page can render early; "done" or "failed" ends the stream.
+    Reconnecting clients resume after Last-Event-ID. Jobs running in another
+    worker process only report their stage names, read from the job store.
+    Beyond REPORT_EVENTS_MAX_STREAMS open streams the answer is 503, and the
+    page polls /api/get-report instead.
+    """
+    job = report_jobs.store.get(report_id)
+    if job is None and not report_jobs.events.known(report_id):
+        return jsonify({"status": "error", "message": f"Report with ID {report_id} not found"}), 404
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", "-1"))
+    except ValueError:
+        last_id = -1
+    if not report_event_streams.acquire(blocking=False):
+        return jsonify({"status": "error", "message": "Too many open event streams, poll /api/get-report"}), \
+            503, {"Retry-After": "5"}
+    deadline = time.time() + Config.REPORT_EVENTS_TIMEOUT
+
+    def sse(event_id, event, data):
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def stream():
+        seen, stage = last_id, None
+        yield "retry: 3000\n\n"
+        while time.time() < deadline:
+            events = report_jobs.events.wait(report_id, seen, timeout=15)
+            for event_id, event, data in events:
+                yield sse(event_id, event, data)
+                seen = event_id
+                if event in report_jobs.events.TERMINAL:
+                    return
+            if events:
+                continue
+            job = report_jobs.store.get(report_id)
+            if job is None:
+                return
+            if job["status"] == "done":
+                yield sse(seen + 1, "done", {"report_id": report_id})
+                return
+            if job["status"] == "failed":
+                yield sse(seen + 1, "failed", job["error"])
+                return
+            if job["stage"] != stage and not report_jobs.events.known(report_id):
+                stage = job["stage"]
+                yield f"event: {stage}\ndata: {{}}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes every response, including ones whose client left before the first event
+    response.call_on_close(report_event_streams.release)
+    return response
+
 @app.route('/upload_image', methods=['POST'])
 def upload_image():
     """Alternative upload endpoint"""
@@ -579,12 +1082,16 @@ def upload_image():
     
     os.makedirs('temp', exist_ok=True)
     image_path = os.path.join('temp', image.filename)
+    file_hash = file_sha256(image.stream)
+    cached = Config.result_cache.get("upload_image", file_hash)
+    if cached is not None:
+        return jsonify(cached)
     image.save(image_path)
 
     try:
         # Extract text using OCR with fallback
         try:
-            text = extract_text_with_fallback(image_path)
+            text = extract_text_with_fallback(image_path, file_hash)
         except ValueError as e:
             # Handle case where no OCR service is available
             file_ext = Path(image_path).suffix.lower()
@@ -632,14 +1139,16 @@ def upload_image():
         priority_recommendations = Config.analysis_engine.generate_priority_recommendations(nlp_dict)
         drug_interactions = Config.analysis_engine.check_drug_interactions(nlp_dict.get("medications", []))
 
-        return jsonify({
+        result = {
             'text': clean_text,
             'nlp_results': nlp_results,
             'summary': summary,
             'enhanced_analysis': enhanced_analysis,
             'priority_recommendations': priority_recommendations,
             'drug_interactions': drug_interactions
-        })
+        }
+        Config.result_cache.set(result, "upload_image", file_hash)
+        return jsonify(result)
 
     except ValueError as e:
         # Handle specific value errors (like missing Azure client)
@@ -702,9 +1211,9 @@ def ask():
         )
 
     # Try Gemini first
-    if gemini_model:
+    if GEMINI_API_KEY:
         try:
-            gemini_response = gemini_model.generate_content(prompt)
+            gemini_response = services.get("gemini").generate_content(prompt)
             clean_response = gemini_response.text.replace("*", "")
             return jsonify({"answer": clean_response.strip()})
         except Exception as e:
@@ -713,13 +1222,13 @@ def ask():
         app.logger.warning("Gemini API not configured. Please set GEMINI_API_KEY environment variable.")
 
     # Fallback: Cohere
-    if not co:
+    if not COHERE_API_KEY:
         return jsonify({
             "answer": "⚠️ AI services are not configured. Please set GEMINI_API_KEY or COHERE_API_KEY environment variables."
         }), 500
     
     try:
-        cohere_response = co.chat(
+        cohere_response = services.get("cohere").chat(
             model="command-r-plus-08-2024",
             message=prompt,
             temperature=0.7,
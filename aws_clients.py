@@ -0,0 +1,67 @@
+# aws_clients.py - Shared, thread-safe boto3 clients for AWS services
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+_clients: Dict[Tuple, object] = {}
+_clients_lock = threading.Lock()
+_clients_pid = os.getpid()
+
+
+def _client_config():
+    from botocore.config import Config as BotoConfig
+
+    return BotoConfig(
+        max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "10")),
+        connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("AWS_READ_TIMEOUT", "60")),
+        retries={"max_attempts": int(os.getenv("AWS_MAX_ATTEMPTS", "3")), "mode": "standard"},
+    )
+
+
+def get_client(service: str, access_key: Optional[str] = None, secret_key: Optional[str] = None,
+               region: str = "us-east-1", session_token: Optional[str] = None):
+    """Return the process-wide boto3 client for (service, region, credentials).
+
+    Building a client reloads the endpoint and service models, resolves
+    credentials and opens a new connection pool, so each combination is built
+    once and reused. boto3 clients are thread-safe once created; creation
+    itself (and the Session behind it) is not, hence the lock. A forked worker
+    starts with an empty registry rather than inheriting the parent's sockets.
+
+    Set <SERVICE>_ENDPOINT_URL (e.g. COMPREHENDMEDICAL_ENDPOINT_URL) to point a
+    service at a local stub; for in-process tests, wrap the returned client in
+    botocore.stub.Stubber - callers get the same instance back.
+    """
+    global _clients_pid
+    key = (service, region, access_key, secret_key, session_token)
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(key)
+        if client is None:
+            import boto3  # deferred: ~0.15 s to import, and only the Comprehend path needs it
+
+            session = boto3.session.Session(
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                aws_session_token=session_token,
+                region_name=region,
+            )
+            endpoint_url = os.getenv(f"{service.upper().replace('-', '_')}_ENDPOINT_URL") or None
+            client = session.client(service, config=_client_config(), endpoint_url=endpoint_url)
+            _clients[key] = client
+            print(f"🔌 Created {service} client for {region}")
+        return client
+
+
+def get_comprehend_medical_client(access_key: Optional[str] = None, secret_key: Optional[str] = None,
+                                  region: str = "us-east-1"):
+    return get_client("comprehendmedical", access_key, secret_key, region)
+
+
+def reset_clients() -> None:
+    """Drop all cached clients (credential rotation, tests)"""
+    with _clients_lock:
+        _clients.clear()
@@ -1,8 +1,12 @@
 # azure_ocr.py - Azure Form Recognizer OCR service
+import asyncio
+import atexit
 import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional, Tuple
+
 from dotenv import load_dotenv
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
 
 # Load environment variables
 load_dotenv()
@@ -11,16 +15,164 @@ load_dotenv()
 subscription_key = os.getenv("AZURE_OCR_KEY")
 endpoint = os.getenv("AZURE_OCR_ENDPOINT")
 
-# ✅ Initialize Azure Form Recognizer Client (only if credentials are available)
-client = None
-if subscription_key and endpoint:
-    client = DocumentAnalysisClient(endpoint=endpoint, credential=AzureKeyCredential(subscription_key))
+
+def _read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+class AzureOCRService:
+    """Runs Azure Form Recognizer analyses on one shared asyncio client.
+
+    The aio DocumentAnalysisClient (and its connection pool) lives on a private
+    event loop in a daemon thread, so sync callers - Flask handlers, report job
+    workers - hand documents to it and many analyses poll concurrently while no
+    thread sits in a blocking poller. At most max_concurrency documents are in
+    flight (Azure throttles per resource); polling_interval is the seconds
+    between status polls of each analyze operation.
+
+    The endpoint may be plain http, so a local fake server that answers
+    ``POST {endpoint}/formrecognizer/documentModels/prebuilt-read:analyze`` with
+    202 + Operation-Location, and ``GET`` on that URL with
+    ``{"status": "succeeded", "analyzeResult": {...}}``, stands in for Azure.
+    Extra keyword arguments go to the client (e.g. ``retry_total=0``).
+    The Azure SDK is only imported when the first document (or warm_up) needs it.
+    """
+
+    def __init__(self, endpoint: str, key: str, max_concurrency: Optional[int] = None,
+                 polling_interval: Optional[float] = None, timeout: Optional[float] = None,
+                 model: str = "prebuilt-read", **client_kwargs):
+        self.endpoint = endpoint
+        self.key = key
+        self.model = model
+        self.max_concurrency = max_concurrency or int(os.getenv("AZURE_OCR_MAX_CONCURRENCY", "8"))
+        self.polling_interval = (polling_interval if polling_interval is not None
+                                 else float(os.getenv("AZURE_OCR_POLL_INTERVAL", "1")))
+        self.timeout = timeout or float(os.getenv("AZURE_OCR_TIMEOUT", "120"))
+        self.client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Only touched on the loop thread
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread on first use (and again in a forked child, which has no threads)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="azure-ocr-loop", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+                self._client, self._semaphore = None, None
+            return self._loop
+
+    def _get_client(self):
+        if self._client is None:
+            from azure.ai.formrecognizer.aio import DocumentAnalysisClient
+            from azure.core.credentials import AzureKeyCredential
+
+            self._client = DocumentAnalysisClient(
+                endpoint=self.endpoint,
+                credential=AzureKeyCredential(self.key),
+                polling_interval=self.polling_interval,
+                **self.client_kwargs,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            print(f"🔌 Created Azure OCR client for {self.endpoint} (max {self.max_concurrency} in flight)")
+        return self._client
+
+    async def analyze(self, file_path: str) -> str:
+        """OCR one document on the service loop; returns its lines joined by newlines"""
+        client = self._get_client()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                # Read on a worker thread: a large scan on slow disk would stall every other analysis
+                document = await asyncio.to_thread(_read_bytes, file_path)
+                poller = await client.begin_analyze_document(self.model, document=document)
+                result = await poller.result()
+                self.completed += 1
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            except BaseException:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+        return "\n".join(line.content for page in result.pages for line in page.lines).strip()
+
+    def warm_up(self) -> None:
+        """Import the SDK and build the client now instead of on the first document"""
+        async def build():
+            self._get_client()
+        asyncio.run_coroutine_threadsafe(build(), self._ensure_loop()).result()
+
+    def submit(self, file_path: str) -> Future:
+        """Queue a document for OCR; the returned future resolves to its text"""
+        return asyncio.run_coroutine_threadsafe(self.analyze(file_path), self._ensure_loop())
+
+    def extract_text(self, file_path: str, timeout: Optional[float] = None) -> str:
+        """Blocking OCR of one document; the analysis is cancelled if it overruns timeout"""
+        future = self.submit(file_path)
+        try:
+            return future.result(timeout or self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop, self._client = None, None
+        if loop is None or self._pid != os.getpid():
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": "azure_ocr", "endpoint": self.endpoint, "max_concurrency": self.max_concurrency,
+                "polling_interval": self.polling_interval, "in_flight": self.in_flight,
+                "completed": self.completed, "failed": self.failed, "cancelled": self.cancelled}
+
+
+_services: Dict[Tuple[str, str], AzureOCRService] = {}
+_services_lock = threading.Lock()
+
+
+def get_azure_ocr_service(endpoint: Optional[str], key: Optional[str]) -> Optional[AzureOCRService]:
+    """Process-wide service per (endpoint, key); None when either is missing"""
+    if not (endpoint and key):
+        return None
+    with _services_lock:
+        service = _services.get((endpoint, key))
+        if service is None:
+            service = _services[(endpoint, key)] = AzureOCRService(endpoint, key)
+        return service
+
+
+@atexit.register
+def _close_services() -> None:
+    for service in list(_services.values()):
+        try:
+            service.close()
+        except Exception:
+            pass
+
+
+# ✅ Shared Azure OCR service (only if credentials are available)
+service = get_azure_ocr_service(endpoint, subscription_key)
 
 
 class MedicalOCR:
     def __init__(self):
-        # This class is a placeholder for future OCR functionality
-        # Currently, OCR is handled by extract_text_azure() function
+        # Thin wrapper kept for callers of the old API; the work happens in the shared AzureOCRService
         pass
 
     def extract_text_from_file(self, file_path):
@@ -29,23 +181,16 @@ class MedicalOCR:
             print(f"[❌] File not found: {file_path}")
             return ""
 
-        if not client:
+        if not service:
             print("[❌] Azure OCR client not initialized. Please set AZURE_OCR_KEY and AZURE_OCR_ENDPOINT environment variables.")
             return ""
-        
-        try:
-            with open(file_path, "rb") as f:
-                poller = client.begin_analyze_document("prebuilt-read", document=f)
-            result = poller.result()
 
-            text = ""
-            for page in result.pages:
-                for line in page.lines:
-                    text += line.content + "\n"
+        try:
+            text = service.extract_text(file_path)
 
-            if text.strip():
+            if text:
                 print("[📄] OCR Extraction Successful.")
-                return text.strip()
+                return text
             else:
                 print("[⚠️] No text extracted.")
                 return ""
@@ -0,0 +1,129 @@
+# benchmark_nlp.py - Performance benchmarks for the report analysis pipeline
+"""
+Usage:
+    python benchmark_nlp.py executors [--repeat N] [--concurrency N]
+    python benchmark_nlp.py importtime [--module app] [--repeat N] [--top N]
+"""
+import argparse
+import concurrent.futures
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SAMPLE_REPORT = """PATIENT REPORT
+Name: Mr. Ramesh Kumar  Age: 54/M
+Diagnosis: Type 2 Diabetes, Hypertension, hypothyroidism. Known case of asthma.
+Medications: Metformin 500 mg BD, Amlodipine 5 mg OD, Dolo 650 mg SOS, Atorva 10mg
+Hemoglobin: 11.2 g/dl
+Total Leukocyte Count: 8,400 cumm
+Platelet Count 2,10,000
+Glucose: 182 mg/dl
+HbA1c: 8.1 %
+Blood Pressure 150/95 mmHg, pulse 88 bpm
+TSH: 6.2
+Serum Creatinine: 1.4 mg/dl
+IMPRESSION: Poorly controlled diabetes with anemia.
+Recommendation: Continue metformin. Monitor blood sugar daily. Avoid sugary food.
+Follow up after 2 weeks.
+"""
+
+REPORT_SIZES = {
+    "small": 1,    # single-page report
+    "large": 40,   # multi-page lab report / discharge summary
+}
+
+
+def _time_calls(fn, texts, concurrency):
+    """Return per-call latencies (ms) running fn over texts with N caller threads"""
+    def timed(text):
+        start = time.perf_counter()
+        fn(text)
+        return (time.perf_counter() - start) * 1000
+
+    if concurrency <= 1:
+        return [timed(t) for t in texts]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as callers:
+        return list(callers.map(timed, texts))
+
+
+def bench_executors(args):
+    """Compare MedicalNLP extractor execution strategies on small and large reports"""
+    from medical_nlp import MedicalNLP, EXECUTOR_STRATEGIES
+
+    engine = MedicalNLP()
+    print(f"\n{'size':<7}{'chars':>8}{'strategy':>12}{'callers':>9}{'mean ms':>10}{'p95 ms':>10}{'wall s':>9}")
+    for size, copies in REPORT_SIZES.items():
+        text = SAMPLE_REPORT * copies
+        for strategy in EXECUTOR_STRATEGIES:
+            engine.set_executor_strategy(strategy)
+            engine.process_text(text)  # warm caches and pools
+            for callers in sorted({1, args.concurrency}):
+                wall = time.perf_counter()
+                latencies = _time_calls(engine.process_text, [text] * args.repeat, callers)
+                wall = time.perf_counter() - wall
+                p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+                print(f"{size:<7}{len(text):>8}{strategy:>12}{callers:>9}"
+                      f"{statistics.mean(latencies):>10.2f}{p95:>10.2f}{wall:>9.2f}")
+
+
+def _import_once(module):
+    """Import module in a fresh interpreter; returns (wall seconds, -X importtime rows)"""
+    code = (f"import time; start = time.perf_counter(); import {module}; "
+            f"print('__wall__', time.perf_counter() - start)")
+    env = dict(os.environ, SERVICE_WARMUP="off")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          cwd=Path(__file__).resolve().parent, env=env)
+    wall = [line for line in proc.stdout.splitlines() if line.startswith("__wall__")]
+    if proc.returncode or not wall:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return float(wall[0].split()[1]), rows
+
+
+def bench_importtime(args):
+    """Cold-start cost of importing a module, with the slowest imports by cumulative time"""
+    walls = []
+    for _ in range(args.repeat):
+        wall, rows = _import_once(args.module)
+        walls.append(wall)
+    print(f"\nimport {args.module}: median {statistics.median(walls):.3f}s over {args.repeat} run(s) "
+          f"(min {min(walls):.3f}s, includes module-level initialisation)")
+    # Top-level packages plus their direct children, from the last run
+    top = sorted((r for r in rows if r[2] <= args.depth), reverse=True)[:args.top]
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for cumulative_us, self_us, depth, name in top:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {'  ' * (depth - 1)}{name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Swasthmate performance benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    executors = sub.add_parser("executors", help=bench_executors.__doc__)
+    executors.add_argument("--repeat", type=int, default=50, help="reports analysed per configuration")
+    executors.add_argument("--concurrency", type=int, default=8,
+                           help="concurrent caller threads (Waitress default is 4-8)")
+    executors.set_defaults(func=bench_executors)
+
+    importtime = sub.add_parser("importtime", help=bench_importtime.__doc__)
+    importtime.add_argument("--module", default="app", help="module to import cold (default: app)")
+    importtime.add_argument("--repeat", type=int, default=3, help="fresh interpreters to time")
+    importtime.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    importtime.add_argument("--depth", type=int, default=2, help="import nesting depth to include")
+    importtime.set_defaults(func=bench_importtime)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# jobs.py - Background job queue for report processing
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds max_pending unfinished jobs"""
+
+
+class JobEvents:
+    """In-process event history per job, replayable by late subscribers (e.g. SSE clients)"""
+
+    TERMINAL = ("done", "failed")
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._logs: "OrderedDict[str, List[Tuple[int, str, Any]]]" = OrderedDict()
+        self._cond = threading.Condition()
+
+    def publish(self, job_id: str, event: str, data: Any = None) -> None:
+        with self._cond:
+            log = self._logs.setdefault(job_id, [])
+            log.append((len(log), event, data))
+            self._logs.move_to_end(job_id)
+            while len(self._logs) > self.max_jobs:
+                self._logs.popitem(last=False)
+            self._cond.notify_all()
+
+    def wait(self, job_id: str, after: int = -1, timeout: float = 15.0) -> List[Tuple[int, str, Any]]:
+        """Events with id > after, blocking up to timeout for the first one"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._logs.get(job_id, ())) > after + 1, timeout)
+            return list(self._logs.get(job_id, ())[after + 1:])
+
+    def known(self, job_id: str) -> bool:
+        with self._cond:
+            return job_id in self._logs
+
+
+TERMINAL_STATUSES = ("done", "failed")
+# Finished jobs are kept this long for /api/get-report polling, then pruned on a later create
+JOB_TTL = float(os.getenv("JOB_TTL", "86400"))
+
+
+class MemoryJobStore:
+    """Job records in a dict; lost on restart.
+
+    Finished jobs are dropped once older than ttl, or oldest first once more
+    than max_jobs are kept, so a long-running process doesn't grow forever.
+    """
+
+    def __init__(self, ttl: float = JOB_TTL, max_jobs: int = 1000):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in TERMINAL_STATUSES]
+        excess = len(self._jobs) + 1 - self.max_jobs  # room for the job being created
+        for job_id in finished:
+            if excess > 0 or self._jobs[job_id]["updated"] < now - self.ttl:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def create(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        job = {"id": job_id, "status": "queued", "stage": None, "payload": payload,
+               "error": None, "http_status": None, "created": now, "updated": now}
+        with self._lock:
+            self._prune(now)
+            self._jobs[job_id] = job
+        return dict(job)
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(j) for j in self._jobs.values() if j["status"] in ("queued", "processing")]
+
+
+class SQLiteJobStore:
+    """Job records in SQLite; queued and in-flight jobs are picked up again after a restart.
+
+    Finished jobs older than ttl are deleted on a later create.
+    """
+
+    _FIELDS = ("id", "status", "stage", "payload", "error", "http_status", "created", "updated")
+
+    def __init__(self, path, ttl: float = JOB_TTL):
+        self.ttl = ttl
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, "
+            "payload TEXT NOT NULL, error TEXT, http_status INTEGER, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._conn.commit()
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn_pid = os.getpid()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # A forked worker must not reuse its parent's connection
+        if self._conn_pid != os.getpid():
+            self._connect()
+        return self._conn
+
+    def _row(self, row) -> Dict[str, Any]:
+        job = dict(zip(self._FIELDS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["error"] = json.loads(job["error"]) if job["error"] else None
+        return job
+
+    def create(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                             (now - self.ttl,))
+            self._db.execute(
+                "INSERT INTO jobs (id, status, payload, created, updated) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now),
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields) -> None:
+        if "error" in fields and fields["error"] is not None:
+            fields["error"] = json.dumps(fields["error"])
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(self._FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(self._FIELDS)} FROM jobs WHERE status IN ('queued', 'processing') ORDER BY created"
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+
+JOB_BACKENDS = {"memory": MemoryJobStore, "sqlite": SQLiteJobStore}
+
+
+def make_job_store(backend: Optional[str] = None, path: Optional[str] = None):
+    """Build the configured job store (JOB_BACKEND=memory|sqlite, JOB_DB_PATH)"""
+    backend = (backend or os.getenv("JOB_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore(path or os.getenv("JOB_DB_PATH", "uploads/.jobs.sqlite3"))
+    raise ValueError(f"Unknown job backend {backend!r}; expected one of {sorted(JOB_BACKENDS)}")
+
+
+class JobQueue:
+    """Runs handler(job_id, payload, progress) for submitted jobs on a bounded thread pool.
+
+    The handler returns nothing on success (it persists its own results) and
+    raises on failure; an exception carrying ``body`` and ``status`` attributes
+    is recorded as that JSON body and HTTP status, anything else as a 500.
+    ``progress(stage, data)`` records the stage on the job and publishes it,
+    with any partial results, to ``events``; "done"/"failed" close the stream.
+    """
+
+    def __init__(self, store, handler: Callable[[str, Dict[str, Any], Callable], None],
+                 workers: int = 2, max_pending: int = 50):
+        self.store = store
+        self.handler = handler
+        self.events = JobEvents()
+        self.max_pending = max_pending
+        self._pool = None
+        self._pool_pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.workers = workers
+
+    def _executor(self) -> ThreadPoolExecutor:
+        """The worker pool, created on first use and again in a forked child (threads don't survive fork)"""
+        if self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+            self._pool_pid = os.getpid()
+            self._pending = 0
+        return self._pool
+
+    def submit(self, job_id: str, **payload) -> Dict[str, Any]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} reports already waiting")
+            pool = self._executor()
+            self._pending += 1
+        job = self.store.create(job_id, payload)
+        pool.submit(self._run, job_id, payload)
+        return job
+
+    def recover(self) -> int:
+        """Re-enqueue jobs a previous process left unfinished (persistent stores only)"""
+        jobs = self.store.unfinished()
+        for job in jobs:
+            with self._lock:
+                pool = self._executor()
+                self._pending += 1
+            self.store.update(job["id"], status="queued")
+            pool.submit(self._run, job["id"], job["payload"])
+        if jobs:
+            print(f"[🔁] Re-queued {len(jobs)} unfinished report job(s)")
+        return len(jobs)
+
+    def progress(self, job_id: str, stage: str, data: Any = None) -> None:
+        self.store.update(job_id, stage=stage)
+        self.events.publish(job_id, stage, data)
+
+    def _run(self, job_id: str, payload: Dict[str, Any]) -> None:
+        try:
+            self.store.update(job_id, status="processing")
+            self.handler(job_id, payload, lambda stage, data=None: self.progress(job_id, stage, data))
+            self.store.update(job_id, status="done")
+            self.events.publish(job_id, "done", {"report_id": job_id})
+        except Exception as e:
+            body = getattr(e, "body", None) or {"status": "error", "message": f"Failed to process file: {str(e)}"}
+            print(f"[❌] Report job {job_id} failed: {body.get('message')}")
+            self.store.update(job_id, status="failed", error=body, http_status=getattr(e, "status", 500))
+            self.events.publish(job_id, "failed", body)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": "report_jobs", "backend": type(self.store).__name__,
+                    "workers": self.workers, "pending": self._pending, "max_pending": self.max_pending}
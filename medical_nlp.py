@@ -1,14 +1,793 @@
 # medical_nlp.py - Medical Natural Language Processing module
+import hashlib
+import importlib.metadata
 import json
+import os
+import pickle
 import re
+import shutil
 import spacy
+from spacy.tokenizer import Tokenizer
 from spacy.tokens import Span
 from rapidfuzz import process, fuzz
 from medspacy.ner import TargetRule
-from typing import Dict, List, Set
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
 from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
 import concurrent.futures
 import threading
+from caching import BoundedCache
+from process_pools import clean_mp_context
+
+
+# === Lab measurement registry (compiled once at import) ===
+# Default fallback units
+_DEFAULT_UNITS = {
+    # Vitals
+    "Blood Pressure": "mmHg",
+    "Heart Rate": "bpm",
+    "Respiratory Rate": "breaths/min",
+    "Temperature": "°C",
+    "SpO2": "%",
+    "Height": "cm",
+    "Weight": "kg",
+    "BMI": "kg/m²",
+
+    # Diabetes
+    "Glucose": "mg/dL",
+    "HbA1c": "%",
+
+    # Hematology
+    "Hemoglobin": "g/dL",
+    "Total Leukocyte Count": "cells/cumm",
+    "Total RBC Count": "million/cumm",
+    "Platelet Count": "lakh/cumm",
+    "Hematocrit (HCT)": "%",
+    "MCV": "fL",
+    "MCH": "pg",
+    "MCHC": "g/dL",
+    "Neutrophils": "%",
+    "Lymphocytes": "%",
+    "Monocytes": "%",
+    "Eosinophils": "%",
+    "Basophils": "%",
+
+    # Lipid Profile
+    "Total Cholesterol": "mg/dL",
+    "HDL Cholesterol": "mg/dL",
+    "LDL Cholesterol": "mg/dL",
+    "Triglycerides": "mg/dL",
+
+    # Liver Function
+    "SGPT (ALT)": "U/L",
+    "SGOT (AST)": "U/L",
+    "ALP": "U/L",
+    "Bilirubin Total": "mg/dL",
+    "Bilirubin Direct": "mg/dL",
+    "Albumin": "g/dL",
+
+    # Kidney Function
+    "Serum Creatinine": "mg/dL",
+    "BUN": "mg/dL",
+    "Urea": "mg/dL",
+    "eGFR": "mL/min/1.73m²",
+
+    # Electrolytes
+    "Sodium": "mmol/L",
+    "Potassium": "mmol/L",
+    "Calcium": "mg/dL",
+    "Phosphate": "mg/dL",
+    "Magnesium": "mg/dL",
+    "Chloride": "mmol/L",
+
+    # Thyroid
+    "TSH": "µIU/mL",
+    "T3": "ng/dL",
+    "T4": "µg/dL",
+    "Insulin": "µIU/mL",
+
+    # Vitamins
+    "Vitamin D": "ng/mL",
+    "Vitamin B12": "pg/mL",
+    "Folate": "ng/mL",
+    "Vitamin A": "µg/L",
+    "Vitamin E": "mg/L",
+    "Vitamin K": "ng/mL",
+
+    # Cardiac Markers
+    "Troponin": "ng/mL",
+    "CKMB": "U/L",
+    "Pro-BNP": "pg/mL",
+    "NT-proBNP": "pg/mL",
+
+    # Coagulation
+    "INR": "",
+    "PT": "sec",
+    "PTT": "sec",
+    "Fibrinogen": "mg/dL",
+
+    # Inflammation
+    "ESR": "mm/hr",
+    "CRP": "mg/L",
+    "hs-CRP": "mg/L",
+    "Procalcitonin": "ng/mL",
+    "D-Dimer": "µg/mL",
+
+    # Uric Acid
+    "Uric Acid": "mg/dL",
+
+    # Iron Studies
+    "Serum Iron": "µg/dL",
+    "TIBC": "µg/dL",
+    "Transferrin Saturation": "%",
+
+    # Extended Kidney
+    "Urine Albumin": "mg/L",
+    "Albumin/Creatinine Ratio": "mg/g",
+
+    # Autoimmune
+    "Rheumatoid Factor": "IU/mL",
+    "Anti-CCP": "U/mL",
+    "ANA": "",
+
+    # Tumor Markers
+    "PSA": "ng/mL",
+    "CA-125": "U/mL",
+    "CEA": "ng/mL",
+    "AFP": "ng/mL",
+}
+
+# Raw patterns per test; group 1 is the value, optional group 2 the unit
+_MEASUREMENT_PATTERNS = {
+    # --- Vitals ---
+    "Blood Pressure": r"(\d{2,3})/(\d{2,3})\s*mmHg",
+    "Heart Rate": r"(\d+)\s*bpm",
+    "Respiratory Rate": r"(\d+)\s*breaths/min",
+    "Temperature": r"(?i)(?:temperature|temp)\s*[:\-]?\s*(\d{2,3}(?:\.\d+)?)\s*(°?[cCfF])",
+    "SpO2": r"(\d+)\s*%\s*SpO2",
+
+    # --- Anthropometric ---
+    "Height": r"(?i)height\s*[:\-]?\s*(\d+\.?\d*)\s*(cm|m|ft|in|feet|inches)",
+    "Weight": r"(?i)(\d+\.?\d*)\s*(kg|lbs|Ibs)",
+    "BMI": r"(?i)BMI\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Blood Glucose / Diabetes ---
+    "Glucose": r"(?i)(?:glucose|sugar|bs|rbs|fbs)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl|mg%)?",
+    "HbA1c": r"(?i)(?:hba1c|a1c|glycohemoglobin)\s*[:\-]?\s*(\d+\.?\d*)\s*%?",
+
+    # --- Hematology (CBC) ---
+    "Hemoglobin": r"(?i)(?:hb|hemoglobin)\s*[:\-]?\s*([\d.,]+)\s*(g/dl|gm%|gram%)?",
+    "Total Leukocyte Count": r"(?i)(?:total\s+leukocyte\s+count|tlc|wbc|white\s*blood\s*cells)\s*[:\-]?\s*([\d,]+\.?\d*)\s*(cumm|cells/?cumm|k/μl|k/ul|10\^3/μl)?",
+    "Total RBC Count": r"(?i)(?:total\s*rbc\s*count|rbc\s*count|trbc|rbc)\s*[:\-]?\s*([\d,]+\.?\d*)\s*(million/?cumm|10\^6/μl)?",
+    "Platelet Count": r"(?i)(?:platelet\s*count|platelets|plt)\s*[:\-]?\s*([\d,]+\.?\d*)\s*(lakhs/?cumm|k/μl|10\^3/μl)?",
+    "Hematocrit (HCT)": r"(?i)(?:hematocrit|hct|pcv)\s*[:\-]?\s*([\d.,]+)\s*%?",
+    "MCV": r"(?i)MCV\s*[:\-]?\s*([\d.,]+)\s*(fL|fl)?",
+    "MCH": r"(?i)MCH\s*[:\-]?\s*([\d.,]+)\s*(pg)?",
+    "MCHC": r"(?i)MCHC\s*[:\-]?\s*([\d.,]+)\s*(g/dl|%)?",
+    "Neutrophils": r"(?i)neutrophils?\s*[:\-]?\s*([\d.,]+)\s*%?",
+    "Lymphocytes": r"(?i)lymphocytes?\s*[:\-]?\s*([\d.,]+)\s*%?",
+    "Monocytes": r"(?i)monocytes?\s*[:\-]?\s*([\d.,]+)\s*%?",
+    "Eosinophils": r"(?i)eosinophils?\s*[:\-]?\s*([\d.,]+)\s*%?",
+    "Basophils": r"(?i)basophils?\s*[:\-]?\s*([\d.,]+)\s*%?",
+
+    # --- Lipid Profile ---
+    "Total Cholesterol": r"(?i)total\s*cholesterol\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "HDL Cholesterol": r"(?i)hdl\s*cholesterol\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "LDL Cholesterol": r"(?i)ldl\s*cholesterol\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "Triglycerides": r"(?i)triglycerides\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+
+    # --- Liver Function ---
+    "SGPT (ALT)": r"(?i)(?:sgpt|alt)\s*[:\-]?\s*(\d+\.?\d*)\s*(u/l)?",
+    "SGOT (AST)": r"(?i)(?:sgot|ast)\s*[:\-]?\s*(\d+\.?\d*)\s*(u/l)?",
+    "ALP": r"(?i)ALP\s*[:\-]?\s*(\d+\.?\d*)\s*(U/L)?",
+    "Bilirubin Total": r"(?i)bilirubin\s*total\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "Bilirubin Direct": r"(?i)bilirubin\s*direct\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "Albumin": r"(?i)albumin\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Kidney Function ---
+    "Serum Creatinine": r"(?i)(?:creatinine|scr)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "BUN": r"(?i)BUN\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "Urea": r"(?i)urea\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    "eGFR": r"(?i)eGFR\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Electrolytes ---
+    "Sodium": r"(?i)sodium\s*[:\-]?\s*(\d+\.?\d*)",
+    "Potassium": r"(?i)potassium\s*[:\-]?\s*(\d+\.?\d*)",
+    "Calcium": r"(?i)calcium\s*[:\-]?\s*(\d+\.?\d*)",
+    "Phosphate": r"(?i)phosphate\s*[:\-]?\s*(\d+\.?\d*)",
+    "Magnesium": r"(?i)magnesium\s*[:\-]?\s*(\d+\.?\d*)",
+    "Chloride": r"(?i)chloride\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Thyroid & Hormones ---
+    "TSH": r"(?i)TSH\s*[:\-]?\s*(\d+\.?\d*)",
+    "T3": r"(?i)T3\s*[:\-]?\s*(\d+\.?\d*)",
+    "T4": r"(?i)T4\s*[:\-]?\s*(\d+\.?\d*)",
+    "Insulin": r"(?i)insulin\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Vitamins ---
+    "Vitamin D": r"(?i)(?:vitamin d|25-oh)\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml|nmol/L)?",
+    "Vitamin B12": r"(?i)vitamin\s*b12\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Cardiac Markers ---
+    "Troponin": r"(?i)troponin\s*[:\-]?\s*(\d+\.?\d*)",
+    "CKMB": r"(?i)CK[-\s]?MB\s*[:\-]?\s*(\d+\.?\d*)",
+    "Pro-BNP": r"(?i)(?:pro[-\s]?bnp|bnp)\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Coagulation ---
+    "INR": r"(?i)INR\s*[:\-]?\s*(\d+\.?\d*)",
+    "PT": r"(?i)PT\s*[:\-]?\s*(\d+\.?\d*)",
+    "PTT": r"(?i)PTT\s*[:\-]?\s*(\d+\.?\d*)",
+    "Fibrinogen": r"(?i)fibrinogen\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Infection / Inflammation ---
+    "ESR": r"(?i)ESR\s*[:\-]?\s*(\d+\.?\d*)",
+    "CRP": r"(?i)CRP\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L)?",
+    "Procalcitonin": r"(?i)procalcitonin\s*[:\-]?\s*(\d+\.?\d*)",
+    "D-Dimer": r"(?i)D-?Dimer\s*[:\-]?\s*(\d+\.?\d*)",
+
+    # --- Uric Acid ---
+    "Uric Acid": r"(?i)uric acid\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
+    #Iron Studies
+    "Serum Iron": r"(?i)serum iron\s*[:\-]?\s*(\d+\.?\d*)\s*(µg/dl|ug/dl)?",
+    "TIBC": r"(?i)(?:tibc|total iron binding capacity)\s*[:\-]?\s*(\d+\.?\d*)\s*(µg/dl|ug/dl)?",
+    "Transferrin Saturation": r"(?i)transferrin\s*saturation\s*[:\-]?\s*(\d+\.?\d*)\s*%?",
+    #Kidney Extended
+    "Urine Albumin": r"(?i)(?:urine\s*albumin|microalbuminuria)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L|mg/g)?",
+    "Albumin/Creatinine Ratio": r"(?i)(?:acr|albumin.creatinine ratio)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/g)?",
+    "hs-CRP": r"(?i)(?:hs.?crp|high.sensitivity crp)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L)?",
+    "NT-proBNP": r"(?i)(?:nt.?probnp|nt pro bnp)\s*[:\-]?\s*(\d+\.?\d*)",
+    "Homocysteine": r"(?i)homocysteine\s*[:\-]?\s*(\d+\.?\d*)\s*(µmol/L|umol/L)?",
+    "PSA": r"(?i)(?:psa|prostate specific antigen)\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
+    "CA-125": r"(?i)CA.?125\s*[:\-]?\s*(\d+\.?\d*)\s*(U/ml)?",
+    "CEA": r"(?i)CEA\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
+    "AFP": r"(?i)(?:AFP|alpha fetoprotein)\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
+    "HIV": r"(?i)(?:hiv\s*1/?2|anti.?hiv)\s*[:\-]?\s*(reactive|non.?reactive|positive|negative)",
+    "HBsAg": r"(?i)(?:hbsag|hepatitis\s*b\s*surface\s*antigen)\s*[:\-]?\s*(reactive|non.?reactive|positive|negative)",
+    "HCV": r"(?i)(?:hcv|anti.?hcv)\s*[:\-]?\s*(reactive|non.?reactive|positive|negative)",
+    "ANA": r"(?i)(?:ana|antinuclear antibody)\s*[:\-]?\s*(positive|negative|[\d\.]+)",
+    "Rheumatoid Factor": r"(?i)(?:rf|rheumatoid\s*factor)\s*[:\-]?\s*(\d+\.?\d*)\s*(IU/ml)?",
+    "Anti-CCP": r"(?i)(?:anti.?ccp)\s*[:\-]?\s*(\d+\.?\d*)\s*(U/ml)?",
+    "Folate": r"(?i)folate\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
+    "Vitamin A": r"(?i)vitamin\s*A\s*[:\-]?\s*(\d+\.?\d*)\s*(µg/L|ug/L)?",
+    "Vitamin E": r"(?i)vitamin\s*E\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L)?",
+    "Vitamin K": r"(?i)vitamin\s*K\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
+}
+
+
+def _parse_measurement_value(raw_val: str) -> Optional[float]:
+    """Parse a captured lab value, ignoring thousands separators"""
+    cleaned = raw_val.replace(",", "").strip()
+    try:
+        return float(cleaned)
+    except Exception:
+        return float(re.sub(r"[^\d.]", "", cleaned)) if re.search(r"\d", cleaned) else None
+
+
+class MeasurementSpec(NamedTuple):
+    """One lab test: compiled pattern, fallback unit and value parser"""
+    name: str
+    pattern: re.Pattern
+    default_unit: str
+    parse: Callable[[str], Optional[float]] = _parse_measurement_value
+
+    @property
+    def has_unit_group(self) -> bool:
+        return self.pattern.groups >= 2
+
+
+MEASUREMENT_SPECS: Tuple[MeasurementSpec, ...] = tuple(
+    MeasurementSpec(name, re.compile(pattern, re.IGNORECASE), _DEFAULT_UNITS.get(name, ""))
+    for name, pattern in _MEASUREMENT_PATTERNS.items()
+)
+
+# Generic "test name / value / unit" line formats for tests not in the registry
+_GENERIC_SKIP_WORDS = frozenset({
+    'page', 'date', 'time', 'report', 'patient', 'doctor', 'lab', 'laboratory',
+    'normal', 'range', 'reference', 'value', 'result', 'test', 'name', 'id',
+    'age', 'gender', 'male', 'female', 'years', 'old', 'mm', 'dd', 'yyyy',
+    'header', 'footer', 'page', 'of', 'total'})
+# Pattern 1: Test Name: value unit or Test Name - value unit
+_GENERIC_COLON_PATTERN = re.compile(r'(?i)^([A-Z][A-Za-z0-9\s\-/\(\)]{2,40}?)\s*[:\-]\s*(\d+[.,]?\d*)\s*([a-zA-Z/%°µ²³]+)?')
+# Pattern 2: Test Name followed by value on same line (common in tables)
+_GENERIC_TABLE_PATTERN = re.compile(r'(?i)^([A-Z][A-Za-z0-9\s\-/\(\)]{2,40}?)\s+(\d+[.,]?\d*)\s+([a-zA-Z/%°µ²³]+)?\s*$')
+# Value and unit on the line after the test name
+_GENERIC_VALUE_LINE_PATTERN = re.compile(r'^(\d+[.,]?\d*)\s+([a-zA-Z/%°µ²³]+)?')
+
+
+def extract_measurements(text: str) -> Dict[str, List[Dict[str, str]]]:
+    """Extract lab values using the precompiled measurement registry"""
+    results = defaultdict(list)
+    # First, extract using predefined patterns
+    for spec in MEASUREMENT_SPECS:
+        try:
+            for m in spec.pattern.finditer(text):
+                unit = m.group(2) if spec.has_unit_group and m.group(2) else ""
+                # fallback to default units
+                if not unit:
+                    unit = spec.default_unit
+                num = spec.parse(m.group(1))
+                if num is not None:
+                    results[spec.name].append({"value": num, "unit": unit.strip()})
+        except Exception as e:
+            print(f"[ERROR] Pattern '{spec.name}': {e}")
+
+    # Generic pattern to catch any test name with value (for tests not in predefined list)
+    # Look for common medical report table formats:
+    # 1. Test Name: value unit
+    # 2. Test Name - value unit  
+    # 3. Test Name value unit (on same line)
+    # 4. Test Name (newline) value unit
+    skip_words = _GENERIC_SKIP_WORDS
+
+    lines = text.split('\n')
+    captured_tests = set(results.keys())
+
+    # Process each line looking for test patterns
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or len(line) < 5:
+            continue
+
+        # Try pattern 1 (with colon or dash)
+        match1 = _GENERIC_COLON_PATTERN.match(line)
+        if match1:
+            test_name = match1.group(1).strip()
+            value_str = match1.group(2).replace(",", "").strip()
+            unit = match1.group(3).strip() if match1.group(3) else ""
+
+            if _is_valid_test_name(test_name, skip_words, captured_tests):
+                try:
+                    value = float(value_str)
+                    if 0 <= value <= 10000:
+                        normalized_name = _normalize_test_name(test_name)
+                        if normalized_name not in results:
+                            results[normalized_name].append({"value": value, "unit": unit})
+                            captured_tests.add(normalized_name)
+                except (ValueError, AttributeError):
+                    continue
+
+        # Try pattern 2 (space-separated, common in tables)
+        match2 = _GENERIC_TABLE_PATTERN.match(line)
+        if match2:
+            test_name = match2.group(1).strip()
+            value_str = match2.group(2).replace(",", "").strip()
+            unit = match2.group(3).strip() if match2.group(3) else ""
+
+            if _is_valid_test_name(test_name, skip_words, captured_tests):
+                try:
+                    value = float(value_str)
+                    if 0 <= value <= 10000:
+                        normalized_name = _normalize_test_name(test_name)
+                        if normalized_name not in results:
+                            results[normalized_name].append({"value": value, "unit": unit})
+                            captured_tests.add(normalized_name)
+                except (ValueError, AttributeError):
+                    continue
+
+        # Also check if next line has a value (test name on one line, value on next)
+        if i < len(lines) - 1:
+            next_line = lines[i + 1].strip()
+            value_match = _GENERIC_VALUE_LINE_PATTERN.match(next_line)
+            if value_match and _is_valid_test_name(line, skip_words, captured_tests):
+                value_str = value_match.group(1).replace(",", "").strip()
+                unit = value_match.group(2).strip() if value_match.group(2) else ""
+                try:
+                    value = float(value_str)
+                    if 0 <= value <= 10000:
+                        normalized_name = _normalize_test_name(line)
+                        if normalized_name not in results:
+                            results[normalized_name].append({"value": value, "unit": unit})
+                            captured_tests.add(normalized_name)
+                except (ValueError, AttributeError):
+                    continue
+
+    return dict(results)
+
+
+def _is_valid_test_name(test_name: str, skip_words: set, captured_tests: set) -> bool:
+    """Check if a test name is valid and should be extracted"""
+    if len(test_name) < 2 or len(test_name) > 50:
+        return False
+    if any(skip_word in test_name.lower() for skip_word in skip_words):
+        return False
+    # Check against captured tests (case-insensitive)
+    normalized_check = _normalize_test_name(test_name)
+    if any(normalized_check.lower() == ct.lower() for ct in captured_tests):
+        return False
+    # Check if it looks like a test name (has letters, not just numbers)
+    if not re.search(r'[A-Za-z]', test_name):
+        return False
+    return True
+
+
+def _normalize_test_name(test_name: str) -> str:
+    """Normalize test name to standard format"""
+    # Remove extra spaces
+    normalized = ' '.join(test_name.split())
+    # Capitalize properly (Title Case but preserve acronyms)
+    words = normalized.split()
+    normalized_words = []
+    for word in words:
+        if word.isupper() and len(word) > 1:
+            # Preserve acronyms like "RBC", "WBC", "HDL", etc.
+            normalized_words.append(word)
+        else:
+            normalized_words.append(word.title())
+    return ' '.join(normalized_words)
+
+
+def extract_key_findings(text: str) -> str:
+    """Extract impression/findings section with improved regex"""
+    findings_match = re.search(
+        r"(IMPRESSION|FINDINGS|CONCLUSION|OPINION)[:\s]*(.*?)(?=\n\n|\Z)", 
+        text, re.IGNORECASE | re.DOTALL)
+    return findings_match.group(2).strip() if findings_match else ""
+
+
+# === Extractor execution strategies ===
+# inline    - run extractors sequentially in the request thread (no thread churn;
+#             the extractors are pure-Python and serialize on the GIL anyway)
+# threads   - submit extractors to one long-lived, process-wide thread pool
+# processes - offload CPU-bound, doc-independent extractors to a shared
+#             process pool while the rest run inline
+EXECUTOR_STRATEGIES = ("inline", "threads", "processes")
+# Module-level extractors that only need the raw text and can be pickled
+PROCESS_POOL_EXTRACTORS = frozenset({"measurements", "findings"})
+
+_pool_lock = threading.Lock()
+_thread_pool = None
+_thread_pool_pid = None
+_process_pool = None
+_process_pool_pid = None
+
+
+def get_thread_pool(max_workers: Optional[int] = None) -> concurrent.futures.ThreadPoolExecutor:
+    """Shared extractor thread pool, created on first use (and again in a forked child, which has no threads)"""
+    global _thread_pool, _thread_pool_pid
+    with _pool_lock:
+        if _thread_pool is None or _thread_pool_pid != os.getpid():
+            _thread_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers or int(os.getenv("NLP_EXECUTOR_WORKERS", "4")),
+                thread_name_prefix="nlp-extract")
+            _thread_pool_pid = os.getpid()
+        return _thread_pool
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> concurrent.futures.ProcessPoolExecutor:
+    """Shared extractor process pool, created on first use (and again in a forked child, which can't use the parent's)"""
+    global _process_pool, _process_pool_pid
+    with _pool_lock:
+        if _process_pool is None or _process_pool_pid != os.getpid():
+            _process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers or int(os.getenv("NLP_EXECUTOR_WORKERS", "4")),
+                mp_context=clean_mp_context(["medical_nlp"]))
+            _process_pool_pid = os.getpid()
+        return _process_pool
+
+
+class VocabularyIndex(NamedTuple):
+    """Immutable lookup tables over a vocabulary, built once per engine"""
+    by_lower: Mapping[str, str]             # lowercase term -> canonical term
+    by_length: Mapping[int, Tuple[str, ...]]  # normalized length -> canonical terms
+    choices: Tuple[str, ...]                # prebuilt rapidfuzz choice list
+
+    @classmethod
+    def build(cls, terms) -> "VocabularyIndex":
+        choices = tuple(sorted(terms))
+        by_lower = {}
+        buckets = defaultdict(list)
+        for term in choices:
+            by_lower.setdefault(term.lower(), term)
+            buckets[len(' '.join(term.split()))].append(term)
+        return cls(
+            by_lower=MappingProxyType(by_lower),
+            by_length=MappingProxyType({n: tuple(t) for n, t in buckets.items()}),
+            choices=choices,
+        )
+
+    @classmethod
+    def _from_tables(cls, by_lower, by_length, choices) -> "VocabularyIndex":
+        return cls(MappingProxyType(by_lower), MappingProxyType(by_length), choices)
+
+    def __reduce__(self):
+        # MappingProxyType can't be pickled; ship plain dicts and re-wrap them on load
+        return (VocabularyIndex._from_tables, (dict(self.by_lower), dict(self.by_length), self.choices))
+
+    def lookup(self, text_lower: str) -> Optional[str]:
+        """Exact case-insensitive lookup"""
+        return self.by_lower.get(text_lower)
+
+    def candidates(self, text_lower: str, score_cutoff: float) -> List[str]:
+        """Terms whose length still allows a ratio of at least score_cutoff.
+
+        Indel-based ratios are bounded by 1 - |len_a - len_b| / (len_a + len_b), so terms
+        outside that length band can never reach the cutoff and are skipped.
+        """
+        n = len(' '.join(text_lower.split()))
+        slack = (100 - score_cutoff) / 100
+        lo = int(n * (1 - slack) / (1 + slack))
+        hi = int(n * (1 + slack) / (1 - slack)) + 1
+        return [t for size in range(lo, hi + 1) for t in self.by_length.get(size, ())]
+
+    def best_match(self, text_lower: str, scorer=fuzz.token_sort_ratio, score_cutoff: float = 85) -> Optional[str]:
+        """Best fuzzy match among length-compatible terms, or None"""
+        choices = self.candidates(text_lower, score_cutoff)
+        if not choices:
+            return None
+        result = process.extractOne(text_lower, choices, scorer=scorer, score_cutoff=score_cutoff)
+        return result[0] if result else None
+
+
+# Disease synonym groups - expanded
+DISEASE_SYNONYM_GROUPS = (
+    ("diabetes", "diabetes mellitus", "dm", "type 1 diabetes", "type 2 diabetes"),
+    ("hypertension", "htn", "high blood pressure", "bp"),
+    ("pneumonia", "bronchitis", "bronchiolitis", "pneumonitis"),
+    ("asthma", "copd", "chronic obstructive pulmonary disease"),
+    ("tuberculosis", "tb", "pulmonary tb"),
+    ("covid-19", "covid", "coronavirus", "sars-cov-2"),
+    ("cancer", "carcinoma", "tumor", "malignancy", "neoplasm", "oncology"),
+    ("heart attack", "myocardial infarction", "mi", "cardiac arrest"),
+    ("stroke", "cva", "cerebrovascular accident", "brain attack"),
+    ("epilepsy", "seizure", "convulsion", "fits"),
+    ("parkinson", "alzheimer", "dementia", "memory loss"),
+    ("arthritis", "rheumatoid", "osteoarthritis", "ra", "oa"),
+    ("kidney disease", "ckd", "chronic kidney disease", "renal failure"),
+    ("liver disease", "hepatitis", "cirrhosis", "fatty liver"),
+    ("thyroid", "hypothyroidism", "hyperthyroidism", "goiter"),
+    ("anemia", "iron deficiency", "vitamin deficiency"),
+    ("depression", "anxiety", "ptsd", "bipolar", "schizophrenia"),
+    ("uti", "urinary tract infection", "cystitis"),
+    ("gastritis", "gerd", "peptic ulcer", "ibd", "ibs"),
+    ("migraine", "headache", "cluster headache"),
+)
+
+# Medicine synonym groups - expanded with more medicines
+MEDICINE_SYNONYM_GROUPS = (
+    ("paracetamol", "acetaminophen", "dolo", "crocin", "tylenol"),
+    ("metformin", "glucophage", "glycomet", "metfor"),
+    ("amlodipine", "amlodep", "amlo", "norvasc"),
+    ("atorvastatin", "atorva", "lipitor", "ator"),
+    ("pantoprazole", "pantazol", "pantaprazole", "pantodac"),
+    ("azithromycin", "azit", "azithral", "zithromax"),
+    ("amoxicillin", "amoxycilin", "amoxil", "augmentin"),
+    ("levipil", "levetiracetam", "levepil", "keppra"),
+    ("insulin", "humalog", "lantus", "novolog", "humulin"),
+    ("aspirin", "ecosprin", "disprin", "asa"),
+    ("ibuprofen", "brufen", "advil", "motrin"),
+    ("omeprazole", "omez", "prilosec", "omep"),
+    ("losartan", "cozaar", "losar"),
+    ("ramipril", "altace", "ramip"),
+    ("telmisartan", "micardis", "telma"),
+    ("levothyroxine", "eltroxin", "thyronorm", "synthroid"),
+    ("prednisolone", "prednisone", "deltasone"),
+    ("dexamethasone", "decadron", "dexona"),
+    ("warfarin", "coumadin", "warf"),
+    ("clopidogrel", "plavix", "clopid"),
+    ("salbutamol", "ventolin", "albuterol"),
+    ("montelukast", "singulair", "montair"),
+    ("cetirizine", "zyrtec", "cetrizin"),
+    ("furosemide", "lasix", "frusemide"),
+    ("cefixime", "cefix", "suprax"),
+    ("ceftriaxone", "rocephin", "ceftriax"),
+    ("doxycycline", "doxy", "vibramycin"),
+    ("fluconazole", "diflucan", "flucan"),
+    ("acyclovir", "zovirax", "acyclo"),
+    ("sertraline", "zoloft", "sertra"),
+    ("fluoxetine", "prozac", "fluox"),
+    ("sildenafil", "viagra", "silden"),
+    ("tadalafil", "cialis", "tadala"),
+)
+
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+class KeywordHit(NamedTuple):
+    start: int
+    end: int
+    text: str
+    labels: frozenset
+
+
+class KeywordMatcher:
+    """Single-pass multi-keyword matcher.
+
+    All keywords are folded into one prefix trie that is emitted as a single
+    regex, so a scan costs one pass over the text regardless of how many
+    synonyms are registered. Matching is case-insensitive on word boundaries
+    and reports every keyword starting at every position: the regex finds the
+    longest, and the shorter keywords that are prefixes of it ending on a word
+    boundary ("insulin" in "insulin resistance") are added from a table built
+    with the trie. Nested hits ("type 2 diabetes" and "diabetes") are all
+    returned with offsets.
+    """
+
+    def __init__(self, labelled_terms: Dict[str, List[str]]):
+        labels = defaultdict(set)
+        for label, terms in labelled_terms.items():
+            for term in terms:
+                term = term.strip().lower()
+                if term:
+                    labels[term].add(label)
+        self._labels = {term: frozenset(found) for term, found in labels.items()}
+        self._prefixes = {}
+        for term in self._labels:
+            shorter = [term[:i] for i in range(1, len(term))
+                       if term[:i] in self._labels and not _WORD_CHAR.match(term[i])]
+            if shorter:
+                self._prefixes[term] = shorter
+        self.pattern = re.compile(
+            r'(?<!\w)(?=(' + self._trie_regex(self._labels) + r')(?!\w))', re.I)
+
+    def __len__(self):
+        return len(self._labels)
+
+    @staticmethod
+    def _trie_regex(terms) -> str:
+        trie = {}
+        for term in terms:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        def emit(node):
+            branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            if '' in node:
+                # Optional tail is greedy, so longer keywords win over their prefixes
+                body = (body if len(branches) == 1 and len(branches[0]) == 1 else '(?:' + body + ')') + '?'
+            return body
+
+        return emit(trie)
+
+    def find(self, text: str) -> List[KeywordHit]:
+        """Return every keyword hit in text order"""
+        hits = []
+        for m in self.pattern.finditer(text):
+            start, matched = m.start(1), m.group(1)
+            for prefix in self._prefixes.get(matched.lower(), ()):
+                hits.append(KeywordHit(start, start + len(prefix), matched[:len(prefix)], self._labels[prefix]))
+            hits.append(KeywordHit(start, m.end(1), matched, self._labels.get(matched.lower(), frozenset())))
+        return hits
+
+
+def build_keyword_matcher(disease_vocabulary: Iterable[str]) -> KeywordMatcher:
+    """Matcher for the synonym groups plus the disease names the old per-word lookup could see"""
+    return KeywordMatcher({
+        "DISEASE": [term for group in DISEASE_SYNONYM_GROUPS for term in group],
+        "MEDICINE": [term for group in MEDICINE_SYNONYM_GROUPS for term in group],
+        # Single words of 4+ characters, as `\b\w{4,}\b` found them; no MI, PE, ALL or phrases
+        "DISEASE_VOCAB": [d for d in disease_vocabulary if re.fullmatch(r'\w{4,}', d.lower())],
+    })
+
+
+@lru_cache(maxsize=None)
+def _alternatives(groups: Tuple[Tuple[str, ...], ...]) -> Dict[str, List[Tuple[int, int]]]:
+    order = defaultdict(list)
+    for g, group in enumerate(groups):
+        for a, term in enumerate(group):
+            order[term].append((g, a))
+    return dict(order)
+
+
+def synonym_matches(hits: List[KeywordHit], groups: Tuple[Tuple[str, ...], ...], label: str) -> List[List[KeywordHit]]:
+    """Per group, the hits a `\b(alt1|alt2|...)\b` regex over the text finds.
+
+    At each position the first listed alternative that matches wins, and a
+    group's matches don't overlap - the semantics of the per-group regexes
+    these synonym groups were written for.
+    """
+    order = _alternatives(groups)
+    best: Dict[Tuple[int, int], Tuple[int, KeywordHit]] = {}
+    for hit in hits:
+        if label not in hit.labels:
+            continue
+        for g, a in order.get(hit.text.lower(), ()):
+            key = (g, hit.start)
+            if key not in best or a < best[key][0]:
+                best[key] = (a, hit)
+    found: List[List[KeywordHit]] = [[] for _ in groups]
+    ends = [0] * len(groups)
+    for (g, start), (_, hit) in sorted(best.items(), key=lambda item: item[0][1]):
+        if start >= ends[g]:
+            found[g].append(hit)
+            ends[g] = hit.end
+    return found
+
+
+# === Prebuilt pipeline artifact ===
+# Pipes of en_core_web_sm that MedicalNLP never runs
+EXCLUDED_PIPES = ("tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer")
+PIPELINE_ARTIFACT = Path(os.getenv("MEDICAL_NLP_PIPELINE", Path(__file__).with_name("models") / "medical_nlp"))
+
+
+@lru_cache(maxsize=None)
+def artifact_version() -> str:
+    """Stamp for a pipeline artifact: the rule sources plus the spaCy, medspacy and model versions"""
+    digest = hashlib.sha256()
+    for name in ("medical_nlp.py", "text_analyzer.py"):
+        digest.update(Path(__file__).with_name(name).read_bytes())
+    for dist in ("spacy", "medspacy", "en_core_web_sm"):
+        try:
+            digest.update(f"{dist}={importlib.metadata.version(dist)}".encode())
+        except importlib.metadata.PackageNotFoundError:
+            digest.update(f"{dist}=missing".encode())
+    return digest.hexdigest()[:12]
+
+
+@spacy.registry.tokenizers("medical_nlp.serialized_tokenizer.v1")
+def _serialized_tokenizer():
+    """Rule-less tokenizer for artifacts: from_disk restores the saved rules.
+
+    The default factory first compiles the language's own rules and special
+    cases, which from_disk then replaces, doubling tokenizer load time.
+    """
+    def create(nlp):
+        return Tokenizer(nlp.vocab)
+    return create
+
+
+def load_pipeline_artifact(path=None) -> Optional[Dict]:
+    """Prebuilt pipeline and lookup tables, or None if missing or built from other sources.
+
+    tables.pkl is unpickled, which can run arbitrary code: the artifact
+    directory must be one only the deployment writes (build it at release
+    time and mount it read-only). Its version.txt is checked first, so a
+    stale artifact is rejected without unpickling anything.
+    """
+    path = Path(path or PIPELINE_ARTIFACT)
+    try:
+        version = (path / "version.txt").read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    if version != artifact_version():
+        print(f"[⚠️] Ignoring stale NLP pipeline artifact at {path}; rebuild with: python medical_nlp.py build-pipeline")
+        return None
+    with open(path / "tables.pkl", "rb") as f:
+        tables = pickle.load(f)
+    tables["nlp"] = spacy.load(path / "pipeline")
+    return tables
+
+
+def build_pipeline_artifact(path=None) -> Path:
+    """Build the configured pipeline and lookup tables once and save them for workers to load.
+
+    The spaCy pipeline goes through nlp.to_disk (medspacy pipes are re-created
+    from its config on load); vocabularies, indexes and the keyword matcher are
+    pickled alongside, and version.txt records artifact_version() so edits to
+    the rules make workers fall back to a live build instead of loading stale tables.
+    """
+    path = Path(path or PIPELINE_ARTIFACT)
+    engine = object.__new__(MedicalNLP)  # bypass the singleton and any existing artifact
+    engine._build_components()
+    engine._compile_patterns()
+
+    staging = path.with_name(path.name + ".building")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    engine.nlp.to_disk(staging / "pipeline")
+    config = spacy.util.load_config(staging / "pipeline" / "config.cfg")
+    config["nlp"]["tokenizer"] = {"@tokenizers": "medical_nlp.serialized_tokenizer.v1"}
+    config.to_disk(staging / "pipeline" / "config.cfg")
+    with open(staging / "tables.pkl", "wb") as f:
+        pickle.dump({
+            "diseases": engine.diseases,
+            "medicines": engine.medicines,
+            "disease_index": engine.disease_index,
+            "medicine_index": engine.medicine_index,
+            "keyword_matcher": engine.keyword_matcher,
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    (staging / "version.txt").write_text(artifact_version() + "\n", encoding="utf-8")
+    shutil.rmtree(path, ignore_errors=True)
+    staging.rename(path)
+    return path
+
 
 class MedicalNLP:
     _instance = None
@@ -28,8 +807,35 @@ class MedicalNLP:
             return
         self._initialized = True
         
-        # Optimize spaCy loading - disable unnecessary pipes for speed
-        self.nlp = spacy.load("en_core_web_sm", disable=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"])
+        # Prefer the prebuilt artifact (python medical_nlp.py build-pipeline); fall back to a live build
+        artifact = load_pipeline_artifact()
+        if artifact is not None:
+            self.nlp = artifact["nlp"]
+            self.diseases = artifact["diseases"]
+            self.medicines = artifact["medicines"]
+            self.disease_index = artifact["disease_index"]
+            self.medicine_index = artifact["medicine_index"]
+            self.keyword_matcher = artifact["keyword_matcher"]
+            print(f"DEBUG: Loaded prebuilt pipeline ({len(self.diseases)} diseases, {len(self.medicines)} medicines)")
+        else:
+            self._build_components()
+        
+        # Compile regex patterns for faster matching
+        self._compile_patterns()
+        
+        # Bounded caches for fuzzy matching (shared by all request threads)
+        cache_size = int(os.getenv("NLP_CACHE_SIZE", "10000"))
+        cache_ttl = float(os.getenv("NLP_CACHE_TTL", "0"))
+        self._disease_cache = BoundedCache(cache_size, ttl=cache_ttl, name="disease")
+        self._medicine_cache = BoundedCache(cache_size, ttl=cache_ttl, name="medicine")
+        
+        # How extractors are scheduled for each document
+        self.set_executor_strategy(os.getenv("NLP_EXECUTOR", "inline"))
+    
+    def _build_components(self):
+        """Load spaCy, add the medical pipes and build vocabularies and lookup indexes"""
+        # Optimize spaCy loading - unused pipes are excluded, not just disabled, so their weights are never loaded
+        self.nlp = spacy.load("en_core_web_sm", exclude=list(EXCLUDED_PIPES))
         print("DEBUG: SpaCy model loaded successfully (optimized)")
         
         # Load vocabularies
@@ -37,15 +843,18 @@ class MedicalNLP:
         self.medicines = self._load_medicine_vocabulary()
         print(f"DEBUG: Loaded {len(self.diseases)} diseases and {len(self.medicines)} medicines")
         
+        # Build lookup indexes once instead of per call
+        self.disease_index = VocabularyIndex.build(self.diseases)
+        self.medicine_index = VocabularyIndex.build(self.medicines)
+        
         # Setup pipelines
         self._setup_pipelines()
-        
-        # Compile regex patterns for faster matching
-        self._compile_patterns()
-        
-        # Cache for fuzzy matching
-        self._disease_cache = {}
-        self._medicine_cache = {}
+    
+    def set_executor_strategy(self, strategy: str):
+        """Select how extractors run: 'inline', 'threads' or 'processes'"""
+        if strategy not in EXECUTOR_STRATEGIES:
+            raise ValueError(f"Unknown executor strategy '{strategy}'. Choose one of: {', '.join(EXECUTOR_STRATEGIES)}")
+        self.executor_strategy = strategy
         
     def _setup_pipelines(self):
         """Setup optimized NLP pipelines"""
@@ -88,67 +897,15 @@ class MedicalNLP:
             }
     
     def _compile_patterns(self):
-        """Pre-compile regex patterns for faster matching - expanded patterns"""
-        # Disease patterns - expanded
-        self.disease_patterns = [
-            re.compile(r'\b(diabetes|diabetes mellitus|dm|type 1 diabetes|type 2 diabetes)\b', re.I),
-            re.compile(r'\b(hypertension|htn|high blood pressure|bp)\b', re.I),
-            re.compile(r'\b(pneumonia|bronchitis|bronchiolitis|pneumonitis)\b', re.I),
-            re.compile(r'\b(asthma|copd|chronic obstructive pulmonary disease)\b', re.I),
-            re.compile(r'\b(tuberculosis|tb|pulmonary tb)\b', re.I),
-            re.compile(r'\b(covid-19|covid|coronavirus|sars-cov-2)\b', re.I),
-            re.compile(r'\b(cancer|carcinoma|tumor|malignancy|neoplasm|oncology)\b', re.I),
-            re.compile(r'\b(heart attack|myocardial infarction|mi|cardiac arrest)\b', re.I),
-            re.compile(r'\b(stroke|cva|cerebrovascular accident|brain attack)\b', re.I),
-            re.compile(r'\b(epilepsy|seizure|convulsion|fits)\b', re.I),
-            re.compile(r'\b(parkinson|alzheimer|dementia|memory loss)\b', re.I),
-            re.compile(r'\b(arthritis|rheumatoid|osteoarthritis|ra|oa)\b', re.I),
-            re.compile(r'\b(kidney disease|ckd|chronic kidney disease|renal failure)\b', re.I),
-            re.compile(r'\b(liver disease|hepatitis|cirrhosis|fatty liver)\b', re.I),
-            re.compile(r'\b(thyroid|hypothyroidism|hyperthyroidism|goiter)\b', re.I),
-            re.compile(r'\b(anemia|iron deficiency|vitamin deficiency)\b', re.I),
-            re.compile(r'\b(depression|anxiety|ptsd|bipolar|schizophrenia)\b', re.I),
-            re.compile(r'\b(uti|urinary tract infection|cystitis)\b', re.I),
-            re.compile(r'\b(gastritis|gerd|peptic ulcer|ibd|ibs)\b', re.I),
-            re.compile(r'\b(migraine|headache|cluster headache)\b', re.I),
-        ]
+        """Pre-compile synonym matcher and regex patterns for faster matching"""
+        # Synonym groups, each matched like the former `\b(a|b|...)\b` regex
+        self.disease_patterns = DISEASE_SYNONYM_GROUPS
+        self.medicine_patterns = MEDICINE_SYNONYM_GROUPS
         
-        # Medicine patterns - expanded with more medicines
-        self.medicine_patterns = [
-            re.compile(r'\b(paracetamol|acetaminophen|dolo|crocin|tylenol)\b', re.I),
-            re.compile(r'\b(metformin|glucophage|glycomet|metfor)\b', re.I),
-            re.compile(r'\b(amlodipine|amlodep|amlo|norvasc)\b', re.I),
-            re.compile(r'\b(atorvastatin|atorva|lipitor|ator)\b', re.I),
-            re.compile(r'\b(pantoprazole|pantazol|pantaprazole|pantodac)\b', re.I),
-            re.compile(r'\b(azithromycin|azit|azithral|zithromax)\b', re.I),
-            re.compile(r'\b(amoxicillin|amoxycilin|amoxil|augmentin)\b', re.I),
-            re.compile(r'\b(levipil|levetiracetam|levepil|keppra)\b', re.I),
-            re.compile(r'\b(insulin|humalog|lantus|novolog|humulin)\b', re.I),
-            re.compile(r'\b(aspirin|ecosprin|disprin|asa)\b', re.I),
-            re.compile(r'\b(ibuprofen|brufen|advil|motrin)\b', re.I),
-            re.compile(r'\b(omeprazole|omez|prilosec|omep)\b', re.I),
-            re.compile(r'\b(losartan|cozaar|losar)\b', re.I),
-            re.compile(r'\b(ramipril|altace|ramip)\b', re.I),
-            re.compile(r'\b(telmisartan|micardis|telma)\b', re.I),
-            re.compile(r'\b(levothyroxine|eltroxin|thyronorm|synthroid)\b', re.I),
-            re.compile(r'\b(prednisolone|prednisone|deltasone)\b', re.I),
-            re.compile(r'\b(dexamethasone|decadron|dexona)\b', re.I),
-            re.compile(r'\b(warfarin|coumadin|warf)\b', re.I),
-            re.compile(r'\b(clopidogrel|plavix|clopid)\b', re.I),
-            re.compile(r'\b(salbutamol|ventolin|albuterol)\b', re.I),
-            re.compile(r'\b(montelukast|singulair|montair)\b', re.I),
-            re.compile(r'\b(cetirizine|zyrtec|cetrizin)\b', re.I),
-            re.compile(r'\b(furosemide|lasix|frusemide)\b', re.I),
-            re.compile(r'\b(cefixime|cefix|suprax)\b', re.I),
-            re.compile(r'\b(ceftriaxone|rocephin|ceftriax)\b', re.I),
-            re.compile(r'\b(doxycycline|doxy|vibramycin)\b', re.I),
-            re.compile(r'\b(fluconazole|diflucan|flucan)\b', re.I),
-            re.compile(r'\b(acyclovir|zovirax|acyclo)\b', re.I),
-            re.compile(r'\b(sertraline|zoloft|sertra)\b', re.I),
-            re.compile(r'\b(fluoxetine|prozac|fluox)\b', re.I),
-            re.compile(r'\b(sildenafil|viagra|silden)\b', re.I),
-            re.compile(r'\b(tadalafil|cialis|tadala)\b', re.I),
-        ]
+        # One automaton over every synonym and disease name, scanned once per report.
+        # Prebuilt pipeline artifacts already carry it.
+        if getattr(self, "keyword_matcher", None) is None:
+            self.keyword_matcher = build_keyword_matcher(self.disease_index.choices)
         
         # Recommendation patterns - expanded with more keywords
         self.recommendation_patterns = [
@@ -205,26 +962,14 @@ class MedicalNLP:
             return text_lower
         
         # Check cache first
-        if text_lower in self._disease_cache:
-            return self._disease_cache[text_lower]
-        
-        # Try exact match first (fastest)
-        diseases_lower = {d.lower(): d for d in self.diseases}
-        if text_lower in diseases_lower:
-            result = diseases_lower[text_lower]
-            self._disease_cache[text_lower] = result
-            return result
-        
-        # Fuzzy match with higher threshold for speed
-        result = process.extractOne(text_lower, self.diseases, scorer=fuzz.token_sort_ratio)
-        if result and len(result) >= 2:
-            match, score = result[0], result[1]
-            if score >= 85:
-                self._disease_cache[text_lower] = match
-                return match
-        
-        self._disease_cache[text_lower] = text_lower
-        return text_lower
+        cached = self._disease_cache.get(text_lower)
+        if cached is not None:
+            return cached
+        
+        # Try exact match first (fastest), then fuzzy match with higher threshold
+        result = self.disease_index.lookup(text_lower) or self.disease_index.best_match(text_lower) or text_lower
+        self._disease_cache.set(text_lower, result)
+        return result
     
     def _normalize_medicine(self, text):
         """Cached medicine normalization"""
@@ -232,24 +977,17 @@ class MedicalNLP:
         if not text_lower:
             return text_lower
         
-        if text_lower in self._medicine_cache:
-            return self._medicine_cache[text_lower]
+        cached = self._medicine_cache.get(text_lower)
+        if cached is not None:
+            return cached
         
-        medicines_lower = {m.lower(): m for m in self.medicines}
-        if text_lower in medicines_lower:
-            result = medicines_lower[text_lower]
-            self._medicine_cache[text_lower] = result
-            return result
-        
-        result = process.extractOne(text_lower, self.medicines, scorer=fuzz.token_sort_ratio)
-        if result and len(result) >= 2:
-            match, score = result[0], result[1]
-            if score >= 85:
-                self._medicine_cache[text_lower] = match
-                return match
-        
-        self._medicine_cache[text_lower] = text_lower
-        return text_lower
+        result = self.medicine_index.lookup(text_lower) or self.medicine_index.best_match(text_lower) or text_lower
+        self._medicine_cache.set(text_lower, result)
+        return result
+    
+    def cache_stats(self) -> List[Dict]:
+        """Hit/miss/eviction counters for the normalization caches"""
+        return [self._disease_cache.stats(), self._medicine_cache.stats()]
 
 
     def _load_disease_vocabulary(self) -> Set[str]:
@@ -402,379 +1140,8 @@ class MedicalNLP:
         matcher.add(clinical_concepts)
         
     def _extract_measurements(self, text: str) -> Dict[str, List[Dict[str, str]]]:
-        lines = text.splitlines()
-        blocks = []
-        for i in range(len(lines) - 3):
-            block = ' '.join(lines[i:i+4])
-            blocks.append(block)
-            # Default fallback units
-        default_units = {
-        # Vitals
-        "Blood Pressure": "mmHg",
-        "Heart Rate": "bpm",
-        "Respiratory Rate": "breaths/min",
-        "Temperature": "°C",
-        "SpO2": "%",
-        "Height": "cm",
-        "Weight": "kg",
-        "BMI": "kg/m²",
-
-        # Diabetes
-        "Glucose": "mg/dL",
-        "HbA1c": "%",
-
-        # Hematology
-        "Hemoglobin": "g/dL",
-        "Total Leukocyte Count": "cells/cumm",
-        "Total RBC Count": "million/cumm",
-        "Platelet Count": "lakh/cumm",
-        "Hematocrit (HCT)": "%",
-        "MCV": "fL",
-        "MCH": "pg",
-        "MCHC": "g/dL",
-        "Neutrophils": "%",
-        "Lymphocytes": "%",
-        "Monocytes": "%",
-        "Eosinophils": "%",
-        "Basophils": "%",
-
-        # Lipid Profile
-        "Total Cholesterol": "mg/dL",
-        "HDL Cholesterol": "mg/dL",
-        "LDL Cholesterol": "mg/dL",
-        "Triglycerides": "mg/dL",
-
-        # Liver Function
-        "SGPT (ALT)": "U/L",
-        "SGOT (AST)": "U/L",
-        "ALP": "U/L",
-        "Bilirubin Total": "mg/dL",
-        "Bilirubin Direct": "mg/dL",
-        "Albumin": "g/dL",
-
-        # Kidney Function
-        "Serum Creatinine": "mg/dL",
-        "BUN": "mg/dL",
-        "Urea": "mg/dL",
-        "eGFR": "mL/min/1.73m²",
-
-        # Electrolytes
-        "Sodium": "mmol/L",
-        "Potassium": "mmol/L",
-        "Calcium": "mg/dL",
-        "Phosphate": "mg/dL",
-        "Magnesium": "mg/dL",
-        "Chloride": "mmol/L",
-
-        # Thyroid
-        "TSH": "µIU/mL",
-        "T3": "ng/dL",
-        "T4": "µg/dL",
-        "Insulin": "µIU/mL",
-
-        # Vitamins
-        "Vitamin D": "ng/mL",
-        "Vitamin B12": "pg/mL",
-        "Folate": "ng/mL",
-        "Vitamin A": "µg/L",
-        "Vitamin E": "mg/L",
-        "Vitamin K": "ng/mL",
-
-        # Cardiac Markers
-        "Troponin": "ng/mL",
-        "CKMB": "U/L",
-        "Pro-BNP": "pg/mL",
-        "NT-proBNP": "pg/mL",
-
-        # Coagulation
-        "INR": "",
-        "PT": "sec",
-        "PTT": "sec",
-        "Fibrinogen": "mg/dL",
-
-        # Inflammation
-        "ESR": "mm/hr",
-        "CRP": "mg/L",
-        "hs-CRP": "mg/L",
-        "Procalcitonin": "ng/mL",
-        "D-Dimer": "µg/mL",
-
-        # Uric Acid
-        "Uric Acid": "mg/dL",
-
-        # Iron Studies
-        "Serum Iron": "µg/dL",
-        "TIBC": "µg/dL",
-        "Transferrin Saturation": "%",
-
-        # Extended Kidney
-        "Urine Albumin": "mg/L",
-        "Albumin/Creatinine Ratio": "mg/g",
-
-        # Autoimmune
-        "Rheumatoid Factor": "IU/mL",
-        "Anti-CCP": "U/mL",
-        "ANA": "",
-
-        # Tumor Markers
-        "PSA": "ng/mL",
-        "CA-125": "U/mL",
-        "CEA": "ng/mL",
-        "AFP": "ng/mL",
-        }
-
-        #------all the patterns are written dow
-        patterns = {
-    # --- Vitals ---
-    "Blood Pressure": r"(\d{2,3})/(\d{2,3})\s*mmHg",
-    "Heart Rate": r"(\d+)\s*bpm",
-    "Respiratory Rate": r"(\d+)\s*breaths/min",
-    "Temperature": r"(?i)(?:temperature|temp)\s*[:\-]?\s*(\d{2,3}(?:\.\d+)?)\s*(°?[cCfF])",
-    "SpO2": r"(\d+)\s*%\s*SpO2",
-
-    # --- Anthropometric ---
-    "Height": r"(?i)height\s*[:\-]?\s*(\d+\.?\d*)\s*(cm|m|ft|in|feet|inches)",
-    "Weight": r"(?i)(\d+\.?\d*)\s*(kg|lbs|Ibs)",
-    "BMI": r"(?i)BMI\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Blood Glucose / Diabetes ---
-    "Glucose": r"(?i)(?:glucose|sugar|bs|rbs|fbs)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl|mg%)?",
-    "HbA1c": r"(?i)(?:hba1c|a1c|glycohemoglobin)\s*[:\-]?\s*(\d+\.?\d*)\s*%?",
-
-    # --- Hematology (CBC) ---
-    "Hemoglobin": r"(?i)(?:hb|hemoglobin)\s*[:\-]?\s*([\d.,]+)\s*(g/dl|gm%|gram%)?",
-    "Total Leukocyte Count": r"(?i)(?:total\s+leukocyte\s+count|tlc|wbc|white\s*blood\s*cells)\s*[:\-]?\s*([\d,]+\.?\d*)\s*(cumm|cells/?cumm|k/μl|k/ul|10\^3/μl)?",
-    "Total RBC Count": r"(?i)(?:total\s*rbc\s*count|rbc\s*count|trbc|rbc)\s*[:\-]?\s*([\d,]+\.?\d*)\s*(million/?cumm|10\^6/μl)?",
-    "Platelet Count": r"(?i)(?:platelet\s*count|platelets|plt)\s*[:\-]?\s*([\d,]+\.?\d*)\s*(lakhs/?cumm|k/μl|10\^3/μl)?",
-    "Hematocrit (HCT)": r"(?i)(?:hematocrit|hct|pcv)\s*[:\-]?\s*([\d.,]+)\s*%?",
-    "MCV": r"(?i)MCV\s*[:\-]?\s*([\d.,]+)\s*(fL|fl)?",
-    "MCH": r"(?i)MCH\s*[:\-]?\s*([\d.,]+)\s*(pg)?",
-    "MCHC": r"(?i)MCHC\s*[:\-]?\s*([\d.,]+)\s*(g/dl|%)?",
-    "Neutrophils": r"(?i)neutrophils?\s*[:\-]?\s*([\d.,]+)\s*%?",
-    "Lymphocytes": r"(?i)lymphocytes?\s*[:\-]?\s*([\d.,]+)\s*%?",
-    "Monocytes": r"(?i)monocytes?\s*[:\-]?\s*([\d.,]+)\s*%?",
-    "Eosinophils": r"(?i)eosinophils?\s*[:\-]?\s*([\d.,]+)\s*%?",
-    "Basophils": r"(?i)basophils?\s*[:\-]?\s*([\d.,]+)\s*%?",
-
-    # --- Lipid Profile ---
-    "Total Cholesterol": r"(?i)total\s*cholesterol\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "HDL Cholesterol": r"(?i)hdl\s*cholesterol\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "LDL Cholesterol": r"(?i)ldl\s*cholesterol\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "Triglycerides": r"(?i)triglycerides\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-
-    # --- Liver Function ---
-    "SGPT (ALT)": r"(?i)(?:sgpt|alt)\s*[:\-]?\s*(\d+\.?\d*)\s*(u/l)?",
-    "SGOT (AST)": r"(?i)(?:sgot|ast)\s*[:\-]?\s*(\d+\.?\d*)\s*(u/l)?",
-    "ALP": r"(?i)ALP\s*[:\-]?\s*(\d+\.?\d*)\s*(U/L)?",
-    "Bilirubin Total": r"(?i)bilirubin\s*total\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "Bilirubin Direct": r"(?i)bilirubin\s*direct\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "Albumin": r"(?i)albumin\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Kidney Function ---
-    "Serum Creatinine": r"(?i)(?:creatinine|scr)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "BUN": r"(?i)BUN\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "Urea": r"(?i)urea\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    "eGFR": r"(?i)eGFR\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Electrolytes ---
-    "Sodium": r"(?i)sodium\s*[:\-]?\s*(\d+\.?\d*)",
-    "Potassium": r"(?i)potassium\s*[:\-]?\s*(\d+\.?\d*)",
-    "Calcium": r"(?i)calcium\s*[:\-]?\s*(\d+\.?\d*)",
-    "Phosphate": r"(?i)phosphate\s*[:\-]?\s*(\d+\.?\d*)",
-    "Magnesium": r"(?i)magnesium\s*[:\-]?\s*(\d+\.?\d*)",
-    "Chloride": r"(?i)chloride\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Thyroid & Hormones ---
-    "TSH": r"(?i)TSH\s*[:\-]?\s*(\d+\.?\d*)",
-    "T3": r"(?i)T3\s*[:\-]?\s*(\d+\.?\d*)",
-    "T4": r"(?i)T4\s*[:\-]?\s*(\d+\.?\d*)",
-    "Insulin": r"(?i)insulin\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Vitamins ---
-    "Vitamin D": r"(?i)(?:vitamin d|25-oh)\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml|nmol/L)?",
-    "Vitamin B12": r"(?i)vitamin\s*b12\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Cardiac Markers ---
-    "Troponin": r"(?i)troponin\s*[:\-]?\s*(\d+\.?\d*)",
-    "CKMB": r"(?i)CK[-\s]?MB\s*[:\-]?\s*(\d+\.?\d*)",
-    "Pro-BNP": r"(?i)(?:pro[-\s]?bnp|bnp)\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Coagulation ---
-    "INR": r"(?i)INR\s*[:\-]?\s*(\d+\.?\d*)",
-    "PT": r"(?i)PT\s*[:\-]?\s*(\d+\.?\d*)",
-    "PTT": r"(?i)PTT\s*[:\-]?\s*(\d+\.?\d*)",
-    "Fibrinogen": r"(?i)fibrinogen\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Infection / Inflammation ---
-    "ESR": r"(?i)ESR\s*[:\-]?\s*(\d+\.?\d*)",
-    "CRP": r"(?i)CRP\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L)?",
-    "Procalcitonin": r"(?i)procalcitonin\s*[:\-]?\s*(\d+\.?\d*)",
-    "D-Dimer": r"(?i)D-?Dimer\s*[:\-]?\s*(\d+\.?\d*)",
-
-    # --- Uric Acid ---
-    "Uric Acid": r"(?i)uric acid\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/dl)?",
-    #Iron Studies
-    "Serum Iron": r"(?i)serum iron\s*[:\-]?\s*(\d+\.?\d*)\s*(µg/dl|ug/dl)?",
-    "TIBC": r"(?i)(?:tibc|total iron binding capacity)\s*[:\-]?\s*(\d+\.?\d*)\s*(µg/dl|ug/dl)?",
-    "Transferrin Saturation": r"(?i)transferrin\s*saturation\s*[:\-]?\s*(\d+\.?\d*)\s*%?",
-    #Kidney Extended
-    "Urine Albumin": r"(?i)(?:urine\s*albumin|microalbuminuria)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L|mg/g)?",
-    "Albumin/Creatinine Ratio": r"(?i)(?:acr|albumin.creatinine ratio)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/g)?",
-    "hs-CRP": r"(?i)(?:hs.?crp|high.sensitivity crp)\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L)?",
-    "NT-proBNP": r"(?i)(?:nt.?probnp|nt pro bnp)\s*[:\-]?\s*(\d+\.?\d*)",
-    "Homocysteine": r"(?i)homocysteine\s*[:\-]?\s*(\d+\.?\d*)\s*(µmol/L|umol/L)?",
-    "PSA": r"(?i)(?:psa|prostate specific antigen)\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
-    "CA-125": r"(?i)CA.?125\s*[:\-]?\s*(\d+\.?\d*)\s*(U/ml)?",
-    "CEA": r"(?i)CEA\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
-    "AFP": r"(?i)(?:AFP|alpha fetoprotein)\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
-    "HIV": r"(?i)(?:hiv\s*1/?2|anti.?hiv)\s*[:\-]?\s*(reactive|non.?reactive|positive|negative)",
-    "HBsAg": r"(?i)(?:hbsag|hepatitis\s*b\s*surface\s*antigen)\s*[:\-]?\s*(reactive|non.?reactive|positive|negative)",
-    "HCV": r"(?i)(?:hcv|anti.?hcv)\s*[:\-]?\s*(reactive|non.?reactive|positive|negative)",
-    "ANA": r"(?i)(?:ana|antinuclear antibody)\s*[:\-]?\s*(positive|negative|[\d\.]+)",
-    "Rheumatoid Factor": r"(?i)(?:rf|rheumatoid\s*factor)\s*[:\-]?\s*(\d+\.?\d*)\s*(IU/ml)?",
-    "Anti-CCP": r"(?i)(?:anti.?ccp)\s*[:\-]?\s*(\d+\.?\d*)\s*(U/ml)?",
-    "Folate": r"(?i)folate\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
-    "Vitamin A": r"(?i)vitamin\s*A\s*[:\-]?\s*(\d+\.?\d*)\s*(µg/L|ug/L)?",
-    "Vitamin E": r"(?i)vitamin\s*E\s*[:\-]?\s*(\d+\.?\d*)\s*(mg/L)?",
-    "Vitamin K": r"(?i)vitamin\s*K\s*[:\-]?\s*(\d+\.?\d*)\s*(ng/ml)?",
-}
+        return extract_measurements(text)
 
-        results = defaultdict(list)
-        # First, extract using predefined patterns
-        for name, pattern in patterns.items():
-            try:
-                for m in re.finditer(pattern, text, re.IGNORECASE):
-                    raw_val = m.group(1)
-                    unit = m.group(2) if len(m.groups()) >= 2 and m.group(2) else ""
-                    # fallback to default units
-                    if not unit and name in default_units:
-                        unit = default_units[name]
-                    # commas hatao
-                    cleaned = raw_val.replace(",", "").strip()
-                    try:
-                        num = float(cleaned)
-                    except Exception:
-                        num = float(re.sub(r"[^\d.]", "", cleaned)) if re.search(r"\d", cleaned) else None
-                    if num is not None:
-                        results[name].append({"value": num, "unit": unit.strip()})
-            except Exception as e:
-                print(f"[ERROR] Pattern '{name}': {e}")
-        
-        # Generic pattern to catch any test name with value (for tests not in predefined list)
-        # Look for common medical report table formats:
-        # 1. Test Name: value unit
-        # 2. Test Name - value unit  
-        # 3. Test Name value unit (on same line)
-        # 4. Test Name (newline) value unit
-        
-        # Common words to skip (not test names)
-        skip_words = {'page', 'date', 'time', 'report', 'patient', 'doctor', 'lab', 'laboratory', 
-                      'normal', 'range', 'reference', 'value', 'result', 'test', 'name', 'id',
-                      'age', 'gender', 'male', 'female', 'years', 'old', 'mm', 'dd', 'yyyy',
-                      'header', 'footer', 'page', 'of', 'total'}
-        
-        # Pattern 1: Test Name: value unit or Test Name - value unit
-        generic_pattern1 = r'(?i)^([A-Z][A-Za-z0-9\s\-/\(\)]{2,40}?)\s*[:\-]\s*(\d+[.,]?\d*)\s*([a-zA-Z/%°µ²³]+)?'
-        
-        # Pattern 2: Test Name followed by value on same line (common in tables)
-        generic_pattern2 = r'(?i)^([A-Z][A-Za-z0-9\s\-/\(\)]{2,40}?)\s+(\d+[.,]?\d*)\s+([a-zA-Z/%°µ²³]+)?\s*$'
-        
-        lines = text.split('\n')
-        captured_tests = set(results.keys())
-        
-        # Process each line looking for test patterns
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line or len(line) < 5:
-                continue
-            
-            # Try pattern 1 (with colon or dash)
-            match1 = re.match(generic_pattern1, line)
-            if match1:
-                test_name = match1.group(1).strip()
-                value_str = match1.group(2).replace(",", "").strip()
-                unit = match1.group(3).strip() if match1.group(3) else ""
-                
-                if self._is_valid_test_name(test_name, skip_words, captured_tests):
-                    try:
-                        value = float(value_str)
-                        if 0 <= value <= 10000:
-                            normalized_name = self._normalize_test_name(test_name)
-                            if normalized_name not in results:
-                                results[normalized_name].append({"value": value, "unit": unit})
-                                captured_tests.add(normalized_name)
-                    except (ValueError, AttributeError):
-                        continue
-            
-            # Try pattern 2 (space-separated, common in tables)
-            match2 = re.match(generic_pattern2, line)
-            if match2:
-                test_name = match2.group(1).strip()
-                value_str = match2.group(2).replace(",", "").strip()
-                unit = match2.group(3).strip() if match2.group(3) else ""
-                
-                if self._is_valid_test_name(test_name, skip_words, captured_tests):
-                    try:
-                        value = float(value_str)
-                        if 0 <= value <= 10000:
-                            normalized_name = self._normalize_test_name(test_name)
-                            if normalized_name not in results:
-                                results[normalized_name].append({"value": value, "unit": unit})
-                                captured_tests.add(normalized_name)
-                    except (ValueError, AttributeError):
-                        continue
-            
-            # Also check if next line has a value (test name on one line, value on next)
-            if i < len(lines) - 1:
-                next_line = lines[i + 1].strip()
-                value_match = re.match(r'^(\d+[.,]?\d*)\s+([a-zA-Z/%°µ²³]+)?', next_line)
-                if value_match and self._is_valid_test_name(line, skip_words, captured_tests):
-                    value_str = value_match.group(1).replace(",", "").strip()
-                    unit = value_match.group(2).strip() if value_match.group(2) else ""
-                    try:
-                        value = float(value_str)
-                        if 0 <= value <= 10000:
-                            normalized_name = self._normalize_test_name(line)
-                            if normalized_name not in results:
-                                results[normalized_name].append({"value": value, "unit": unit})
-                                captured_tests.add(normalized_name)
-                    except (ValueError, AttributeError):
-                        continue
-        
-        return dict(results)
-    
-    def _is_valid_test_name(self, test_name: str, skip_words: set, captured_tests: set) -> bool:
-        """Check if a test name is valid and should be extracted"""
-        if len(test_name) < 2 or len(test_name) > 50:
-            return False
-        if any(skip_word in test_name.lower() for skip_word in skip_words):
-            return False
-        # Check against captured tests (case-insensitive)
-        normalized_check = self._normalize_test_name(test_name)
-        if any(normalized_check.lower() == ct.lower() for ct in captured_tests):
-            return False
-        # Check if it looks like a test name (has letters, not just numbers)
-        if not re.search(r'[A-Za-z]', test_name):
-            return False
-        return True
-    
-    def _normalize_test_name(self, test_name: str) -> str:
-        """Normalize test name to standard format"""
-        # Remove extra spaces
-        normalized = ' '.join(test_name.split())
-        # Capitalize properly (Title Case but preserve acronyms)
-        words = normalized.split()
-        normalized_words = []
-        for word in words:
-            if word.isupper() and len(word) > 1:
-                # Preserve acronyms like "RBC", "WBC", "HDL", etc.
-                normalized_words.append(word)
-            else:
-                normalized_words.append(word.title())
-        return ' '.join(normalized_words)
-
-    
-    
     def _predict_specialization(self, doc) -> str:
         """Predict medical specialty with enhanced logic"""
         specialization_map = {
@@ -1003,7 +1370,7 @@ class MedicalNLP:
     
     
 
-    def _extract_diseases(self, doc) -> List[str]:
+    def _extract_diseases(self, doc, hits: Optional[List[KeywordHit]] = None) -> List[str]:
         """Extract disease entities with optimized pattern matching"""
         diseases = set()
         
@@ -1014,47 +1381,43 @@ class MedicalNLP:
                 if normalized and len(normalized) > 2:
                     diseases.add(normalized)
         
-        # Method 2: Fast regex pattern matching
-        text_lower = doc.text.lower()
-        for pattern in self.disease_patterns:
-            matches = pattern.findall(text_lower)
-            for match in matches:
-                if isinstance(match, tuple):
-                    match = match[0] if match else ""
-                if match:
-                    normalized = self._normalize_disease(match)
-                    if normalized:
-                        diseases.add(normalized)
+        if hits is None:
+            hits = self.keyword_matcher.find(doc.text)
+        
+        # Method 2: Synonym matching
+        for group in synonym_matches(hits, self.disease_patterns, "DISEASE"):
+            for hit in group:
+                normalized = self._normalize_disease(hit.text)
+                if normalized:
+                    diseases.add(normalized)
         
         # Method 3: Direct vocabulary lookup for common terms
-        words = set(re.findall(r'\b\w{4,}\b', text_lower))
-        for word in words:
-            if word in {d.lower() for d in self.diseases}:
-                diseases.add(next(d for d in self.diseases if d.lower() == word))
+        for hit in hits:
+            if "DISEASE_VOCAB" in hit.labels:
+                diseases.add(self.disease_index.lookup(hit.text.lower()))
         
         return sorted(diseases)
     
-    def _extract_medicines(self, text: str) -> List[Dict[str, str]]:
+    def _extract_medicines(self, text: str, hits: Optional[List[KeywordHit]] = None) -> List[Dict[str, str]]:
         """Fast medicine extraction using patterns and fuzzy matching"""
         medicines = []
-        text_lower = text.lower()
+        if hits is None:
+            hits = self.keyword_matcher.find(text)
         
-        # Pattern-based extraction
-        for pattern in self.medicine_patterns:
-            matches = pattern.finditer(text)
-            for match in matches:
-                med_name = match.group(1)
-                normalized = self._normalize_medicine(med_name)
-                
-                # Extract dose if present
-                dose_match = re.search(r'(\d+\s*(?:mg|mcg|ml|g|units?))', text[match.end():match.end()+50], re.I)
-                dose = dose_match.group(1) if dose_match else ""
-                
-                medicines.append({
-                    "name": normalized,
-                    "original": med_name,
-                    "dose": dose
-                })
+        # Synonym-based extraction, group by group as before
+        for hit in (hit for group in synonym_matches(hits, self.medicine_patterns, "MEDICINE") for hit in group):
+            med_name = hit.text
+            normalized = self._normalize_medicine(med_name)
+            
+            # Extract dose if present
+            dose_match = re.search(r'(\d+\s*(?:mg|mcg|ml|g|units?))', text[hit.end:hit.end+50], re.I)
+            dose = dose_match.group(1) if dose_match else ""
+            
+            medicines.append({
+                "name": normalized,
+                "original": med_name,
+                "dose": dose
+            })
         
         # Also check for common medicine patterns
         med_pattern = re.compile(r'\b([A-Z][a-z]+(?: [A-Z][a-z]+)*)\s+(\d+\s*(?:mg|mcg|ml))', re.I)
@@ -1073,11 +1436,7 @@ class MedicalNLP:
 
 
     def _extract_key_findings(self, text: str) -> str:
-        """Extract impression/findings section with improved regex"""
-        findings_match = re.search(
-            r"(IMPRESSION|FINDINGS|CONCLUSION|OPINION)[:\s]*(.*?)(?=\n\n|\Z)", 
-            text, re.IGNORECASE | re.DOTALL)
-        return findings_match.group(2).strip() if findings_match else ""
+        return extract_key_findings(text)
 
     def _extract_recommendations(self, doc) -> List[str]:
         """Fast recommendation extraction using multiple methods"""
@@ -1142,7 +1501,7 @@ class MedicalNLP:
             if len(word) < 4:  # Skip short words
                 continue
                 
-            match, score = process.extractOne(word, self.diseases)
+            match, score, _ = process.extractOne(word, self.disease_index.choices)
             if score >= threshold:
                 found.add(match)
                 
@@ -1150,21 +1509,43 @@ class MedicalNLP:
     def process_text(self, text):
         """Optimized text processing with parallel extraction where possible"""
         # Process spaCy doc once
-        doc = self.nlp(text)
+        return self._analyze_doc(self.nlp(text))
+    
+    def process_texts(self, texts: Iterable[str], batch_size: int = 32, n_process: int = 1) -> List[Dict]:
+        """Batch version of process_text built on nlp.pipe.
+
+        Returns one analysis per input text, in input order.
+        """
+        return [self._analyze_doc(doc)
+                for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)]
+    
+    def _analyze_doc(self, doc) -> Dict:
+        """Run all extractors over an already processed spaCy doc"""
+        text = doc.text
+        # Scan for disease and medicine synonyms once and share the hits
+        hits = self.keyword_matcher.find(text)
+        
+        tasks = {
+            'diseases': (self._extract_diseases, doc, hits),
+            'measurements': (extract_measurements, text),
+            'medicines': (self._extract_medicines, text, hits),
+            'findings': (extract_key_findings, text),
+            'recommendations': (self._extract_recommendations, doc),
+            'specialization': (self._predict_specialization, doc)
+        }
         
-        # Extract in parallel for faster processing
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {
-                'diseases': executor.submit(self._extract_diseases, doc),
-                'measurements': executor.submit(self._extract_measurements, text),
-                'medicines': executor.submit(self._extract_medicines, text),
-                'findings': executor.submit(self._extract_key_findings, text),
-                'recommendations': executor.submit(self._extract_recommendations, doc),
-                'specialization': executor.submit(self._predict_specialization, doc)
-            }
-            
-            # Wait for all to complete
+        if self.executor_strategy == "threads":
+            pool = get_thread_pool()
+            futures = {key: pool.submit(*task) for key, task in tasks.items()}
             results = {key: future.result() for key, future in futures.items()}
+        elif self.executor_strategy == "processes":
+            # Ship text-only extractors to worker processes, run the rest here meanwhile
+            pool = get_process_pool()
+            futures = {key: pool.submit(*tasks[key]) for key in PROCESS_POOL_EXTRACTORS}
+            results = {key: fn(*args) for key, (fn, *args) in tasks.items() if key not in futures}
+            results.update({key: future.result() for key, future in futures.items()})
+        else:
+            results = {key: fn(*args) for key, (fn, *args) in tasks.items()}
         
         analysis = {
             "measurements": results['measurements'],
@@ -1176,3 +1557,21 @@ class MedicalNLP:
         }
 
         return analysis
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    # Pickle classes under their importable name, not __main__, so workers can load the tables
+    from medical_nlp import PIPELINE_ARTIFACT, artifact_version, build_pipeline_artifact
+
+    parser = argparse.ArgumentParser(description="MedicalNLP pipeline tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build-pipeline", help=build_pipeline_artifact.__doc__.splitlines()[0])
+    build.add_argument("--output", default=None, help=f"artifact directory (default: {PIPELINE_ARTIFACT})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out = build_pipeline_artifact(args.output)
+    print(f"[✅] Built NLP pipeline artifact {artifact_version()} at {out} in {time.perf_counter() - start:.2f}s")
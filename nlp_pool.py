@@ -0,0 +1,188 @@
+# nlp_pool.py - Process pool of warm MedicalNLP workers for request threads
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from process_pools import clean_mp_context
+
+NLP_POOL_WORKERS = int(os.getenv("NLP_POOL_WORKERS", str(os.cpu_count() or 1)))
+# Tasks queued or running across the pool before new requests wait (then get NLPPoolBusy)
+NLP_POOL_MAX_PENDING = int(os.getenv("NLP_POOL_MAX_PENDING", str(NLP_POOL_WORKERS * 4)))
+NLP_POOL_QUEUE_TIMEOUT = float(os.getenv("NLP_POOL_QUEUE_TIMEOUT", "5"))
+NLP_POOL_TIMEOUT = float(os.getenv("NLP_POOL_TIMEOUT", "60"))
+
+
+class NLPPoolBusy(Exception):
+    """Raised when max_pending texts are already waiting for a worker"""
+
+
+class NLPTimeout(TimeoutError):
+    """Raised when an analysis doesn't finish within the request timeout"""
+
+
+# === Worker side: one engine per process, built by the pool initializer ===
+_engine = None
+
+
+def _build_engine():
+    from medical_nlp import MedicalNLP
+    return MedicalNLP()
+
+
+def _init_worker(factory: Callable[[], Any]) -> None:
+    global _engine
+    start = time.perf_counter()
+    _engine = factory()
+    # Already one process per core: extractors run inline instead of in nested pools
+    _engine.set_executor_strategy("inline")
+    print(f"[⚡] NLP worker {os.getpid()} ready in {time.perf_counter() - start:.2f}s")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _analyze(text: str) -> Dict:
+    return _engine.process_text(text)
+
+
+def _analyze_batch(texts: List[str], batch_size: int) -> List[Dict]:
+    return _engine.process_texts(texts, batch_size=batch_size)
+
+
+class NLPWorkerPool:
+    """MedicalNLP analyses on worker processes, so request threads don't hold the GIL.
+
+    Each worker builds the engine once (factory, in the pool initializer) and
+    then only texts go in and analysis dicts come out; both pickle compactly.
+    At most max_pending tasks are queued or running: a caller beyond that waits
+    up to queue_timeout for a slot and then gets NLPPoolBusy, so a burst is
+    turned away instead of piling up. A caller whose analysis overruns timeout
+    gets NLPTimeout; the worker finishes that task and keeps its slot until then.
+    A pool whose worker died (e.g. OOM-killed) is rebuilt and the call retried once.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 queue_timeout: Optional[float] = None, timeout: Optional[float] = None,
+                 factory: Callable[[], Any] = _build_engine):
+        self.workers = workers or NLP_POOL_WORKERS
+        self.max_pending = max_pending or NLP_POOL_MAX_PENDING
+        self.queue_timeout = queue_timeout if queue_timeout is not None else NLP_POOL_QUEUE_TIMEOUT
+        self.timeout = timeout or NLP_POOL_TIMEOUT
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the pool on first use (and again in a forked child, which can't use the parent's)"""
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=clean_mp_context(["nlp_pool", "medical_nlp"]),
+                                                 initializer=_init_worker, initargs=(self.factory,))
+                self._pid = os.getpid()
+            return self._pool
+
+    def _reset_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is not broken:
+                return  # another thread already replaced it
+            self._pool = None
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        self._slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            if future is not None and not future.cancelled():
+                if future.exception() is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def _submit(self, pool: ProcessPoolExecutor, fn: Callable, *args) -> Future:
+        """Queue fn(*args) on a worker once a slot is free; the slot is held until the worker is done"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise NLPPoolBusy(f"{self.max_pending} NLP tasks already waiting for a worker")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _run(self, calls: List[tuple], timeout: Optional[float] = None) -> List:
+        """Results of (fn, *args) calls run concurrently, in order; retried once on a broken pool"""
+        timeout = timeout or self.timeout
+        for attempt in (1, 2):
+            pool = self._get_pool()
+            futures: List[Future] = []
+            try:
+                for fn, *args in calls:
+                    futures.append(self._submit(pool, fn, *args))
+                deadline = time.monotonic() + timeout
+                return [future.result(max(0.0, deadline - time.monotonic())) for future in futures]
+            except FutureTimeout:
+                # A running analysis can't be interrupted; it keeps its slot until it really finishes
+                with self._lock:
+                    self.timeouts += 1
+                raise NLPTimeout(f"NLP analysis took longer than {timeout:g}s") from None
+            except BrokenProcessPool:
+                print(f"[⚠️] NLP worker pool broke, restarting it (attempt {attempt}/2)")
+                self._reset_pool(pool)
+                if attempt == 2:
+                    raise
+            finally:
+                for future in futures:
+                    future.cancel()  # no-op for finished or running tasks
+
+    def analyze(self, text: str, timeout: Optional[float] = None) -> Dict:
+        """Analysis dict of one text, as MedicalNLP.process_text returns it"""
+        return self._run([(_analyze, text)], timeout)[0]
+
+    def analyze_many(self, texts: List[str], batch_size: int = 32, timeout: Optional[float] = None) -> List[Dict]:
+        """Analyses of several texts in input order, split into one nlp.pipe batch per worker"""
+        texts = list(texts)
+        if not texts:
+            return []
+        step = -(-len(texts) // self.workers)
+        chunks = self._run([(_analyze_batch, texts[start:start + step], batch_size)
+                            for start in range(0, len(texts), step)], timeout)
+        return [analysis for chunk in chunks for analysis in chunk]
+
+    def warm_up(self) -> "NLPWorkerPool":
+        """Start every worker and build its engine now instead of on the first requests"""
+        # Each submit starts another worker while none is idle; the answers mean engines are built
+        pool = self._get_pool()
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        print(f"[🔥] NLP worker pool warm: {self.workers} process(es) started")
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pid == os.getpid():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": "nlp_pool", "workers": self.workers, "max_pending": self.max_pending,
+                "in_flight": self.in_flight, "completed": self.completed, "failed": self.failed,
+                "timeouts": self.timeouts, "rejected": self.rejected, "restarts": self.restarts}
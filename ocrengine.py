@@ -1,29 +1,77 @@
 import httpx
 import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Load OCR.Space API key from environment variable
 OCRSPACE_API_KEY = os.getenv("OCRSPACE_API_KEY", "YOUR_OCRSPACE_API_KEY")
+OCRSPACE_ENDPOINT_URL = os.getenv("OCRSPACE_ENDPOINT_URL", "https://api.ocr.space/parse/image")
+OCRSPACE_TIMEOUT = float(os.getenv("OCRSPACE_TIMEOUT", "60"))
+OCRSPACE_MAX_ATTEMPTS = int(os.getenv("OCRSPACE_MAX_ATTEMPTS", "3"))
+OCRSPACE_MAX_CONNECTIONS = int(os.getenv("OCRSPACE_MAX_CONNECTIONS", "8"))
 
+# Throttling and transient server errors are worth another attempt; anything else is final
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
-async def extract_text_async(image_path, api_key=OCRSPACE_API_KEY):
-    """Async OCR extraction using OCR.Space API"""
-    with open(image_path, "rb") as image_file:
-        files = {"filename": (image_path, image_file, "image/jpeg")}
-        data = {"apikey": api_key, "language": "eng"}
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.ocr.space/parse/image",
-                files=files,
-                data=data
+_client: Optional[httpx.Client] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    """Process-wide keep-alive client, so repeated calls reuse pooled TLS connections.
+
+    httpx.Client is thread-safe; the transport retries failed connects and a
+    forked worker builds its own client instead of sharing the parent's sockets.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = httpx.Client(
+                timeout=httpx.Timeout(OCRSPACE_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(max_connections=OCRSPACE_MAX_CONNECTIONS,
+                                    max_keepalive_connections=OCRSPACE_MAX_CONNECTIONS,
+                                    keepalive_expiry=60.0),
+                transport=httpx.HTTPTransport(retries=OCRSPACE_MAX_ATTEMPTS - 1),
             )
+            _client_pid = os.getpid()
+        return _client
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+
+
+def _post(image_path, api_key) -> httpx.Response:
+    """POST one image, retrying throttled/5xx responses and timeouts with backoff"""
+    client = get_client()
+    for attempt in range(1, OCRSPACE_MAX_ATTEMPTS + 1):
+        try:
+            with open(image_path, "rb") as image_file:
+                files = {"filename": (image_path, image_file, "image/jpeg")}
+                data = {"apikey": api_key, "language": "eng"}
+                response = client.post(OCRSPACE_ENDPOINT_URL, files=files, data=data)
+            if response.status_code not in RETRY_STATUSES or attempt == OCRSPACE_MAX_ATTEMPTS:
+                return response
+            print(f"[⚠️] OCR.Space returned {response.status_code}, retrying ({attempt}/{OCRSPACE_MAX_ATTEMPTS})")
+        except httpx.TimeoutException:
+            if attempt == OCRSPACE_MAX_ATTEMPTS:
+                raise
+            print(f"[⚠️] OCR.Space timed out, retrying ({attempt}/{OCRSPACE_MAX_ATTEMPTS})")
+        time.sleep(0.5 * 2 ** (attempt - 1))
 
-    result = response.json()
 
+def _parse(result) -> str:
     if result.get("IsErroredOnProcessing"):
         print("OCR.Space Error:", result.get("ErrorMessage", "Unknown error"))
         return ""
@@ -36,5 +84,33 @@ async def extract_text_async(image_path, api_key=OCRSPACE_API_KEY):
 
 
 def extract_text(image_path, api_key=OCRSPACE_API_KEY):
-    """Sync wrapper for Flask/Django apps (runs the async function)"""
-    return asyncio.run(extract_text_async(image_path, api_key))
+    """OCR one image with OCR.Space over the shared client"""
+    response = _post(image_path, api_key)
+    response.raise_for_status()
+    return _parse(response.json())
+
+
+def extract_many(image_paths: Iterable[str], api_key=OCRSPACE_API_KEY, concurrency: Optional[int] = None) -> List:
+    """OCR several images concurrently, in input order.
+
+    Each slot holds the text, or the exception that image raised, so one bad
+    file doesn't discard the rest of the batch.
+    """
+    paths = list(image_paths)
+    if not paths:
+        return []
+    workers = min(concurrency or OCRSPACE_MAX_CONNECTIONS, len(paths))
+
+    def run(path):
+        try:
+            return extract_text(path, api_key)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocrspace") as pool:
+        return list(pool.map(run, paths))
+
+
+async def extract_text_async(image_path, api_key=OCRSPACE_API_KEY):
+    """Async OCR extraction using OCR.Space API (runs on the shared client off the event loop)"""
+    return await asyncio.to_thread(extract_text, image_path, api_key)
@@ -0,0 +1,109 @@
+# pdf_text.py - Page-parallel PDF text-layer extraction with per-page OCR fallback
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import PyPDF2
+
+from process_pools import clean_mp_context
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Below this many pages, parsing in-process beats shipping work to the pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+# A page whose text layer is shorter than this is treated as scanned
+PDF_PAGE_MIN_CHARS = int(os.getenv("PDF_PAGE_MIN_CHARS", "20"))
+PDF_OCR_WORKERS = int(os.getenv("PDF_OCR_WORKERS", "4"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=clean_mp_context(["pdf_text"]))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Text layer of pages [start, stop); runs in a pool worker, which re-opens the file"""
+    reader = PyPDF2.PdfReader(file_path)
+    pages = []
+    for index in range(start, stop):
+        try:
+            pages.append((index, reader.pages[index].extract_text() or ""))
+        except Exception as e:
+            print(f"[⚠️] Page {index + 1}: Extraction error - {str(e)}")
+            pages.append((index, ""))
+    return pages
+
+
+def extract_text_layers(file_path: str) -> List[str]:
+    """Embedded text of every page, in page order ("" for pages without a text layer)"""
+    total = len(PyPDF2.PdfReader(file_path).pages)
+    if total < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+        return [text for _, text in _extract_page_range(file_path, 0, total)]
+
+    # Contiguous ranges, so each worker parses the document once for several pages
+    step = -(-total // PDF_WORKERS)
+    pool = _get_pool()
+    futures = [pool.submit(_extract_page_range, file_path, start, min(start + step, total))
+               for start in range(0, total, step)]
+    pages: Dict[int, str] = {}
+    for future in futures:
+        pages.update(future.result())
+    return [pages[index] for index in range(total)]
+
+
+def _write_page(file_path: str, index: int, directory: str) -> str:
+    writer = PyPDF2.PdfWriter()
+    writer.add_page(PyPDF2.PdfReader(file_path).pages[index])
+    page_path = os.path.join(directory, f"page-{index + 1}.pdf")
+    with open(page_path, "wb") as f:
+        writer.write(f)
+    return page_path
+
+
+def extract_pdf_text(file_path: str, ocr_page: Optional[Callable[[str], str]] = None) -> Tuple[str, List[int], List[int]]:
+    """Text layers, with only the scanned pages sent to ocr_page, reassembled in page order.
+
+    ocr_page receives the path of a one-page PDF and returns its text. When no
+    page has a text layer, nothing is OCR'd here: the caller is better off
+    sending the whole document to OCR in one request. Returns the text, the
+    (1-based) page numbers whose text is still under PDF_PAGE_MIN_CHARS and
+    wasn't OCR'd (no ocr_page, every page scanned, or OCR failed), and those
+    among them whose OCR raised - a transient failure. A page OCR returned
+    little or nothing for is really blank and not listed.
+    """
+    pages = extract_text_layers(file_path)
+    failed: List[int] = []
+    ocred: List[int] = []
+    scanned = [i for i, text in enumerate(pages) if len(text.strip()) < PDF_PAGE_MIN_CHARS]
+    print(f"[📄] PDF has {len(pages)} page(s), {len(scanned)} without a text layer")
+
+    if scanned and ocr_page and len(scanned) < len(pages):
+        with tempfile.TemporaryDirectory(prefix="pdfpages-") as directory:
+            def ocr(index):
+                try:
+                    return ocr_page(_write_page(file_path, index, directory)) or ""
+                except Exception as e:
+                    print(f"[⚠️] Page {index + 1}: OCR failed - {str(e)}")
+                    failed.append(index + 1)
+                    return ""
+
+            with ThreadPoolExecutor(max_workers=min(PDF_OCR_WORKERS, len(scanned))) as pool:
+                for index, text in zip(scanned, pool.map(ocr, scanned)):
+                    if index + 1 in failed:
+                        continue
+                    ocred.append(index)
+                    if text.strip():
+                        pages[index] = text
+                        print(f"[✅] Page {index + 1}: OCR'd {len(text)} characters")
+
+    missing = [i + 1 for i in scanned if i not in ocred]
+    return "\n".join(text for text in pages if text.strip()).strip(), missing, sorted(failed)
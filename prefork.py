@@ -0,0 +1,352 @@
+# prefork.py - Pre-fork server: build the models once, fork workers that share them copy-on-write
+"""
+Usage:
+    python prefork.py [--workers N|auto] [--threads N] [--host 0.0.0.0] [--port 8080]
+                      [--status-interval SECONDS] [--graceful-timeout SECONDS]
+
+The master imports the app and builds MedicalNLP (spaCy pipeline, vocabularies,
+keyword matcher, rapidfuzz choice lists) and EnhancedAnalysisEngine, freezes the
+garbage collector, then forks the Waitress workers, one per core by default,
+all accepting on one shared listening socket. The preloaded objects live in
+pages every worker maps from the master instead of in one private copy per
+worker. CPython still writes reference counts into objects it touches, so the
+pages that request handling reads get copied over time; the status report
+(USS/PSS per process) shows what is really shared.
+
+Signals to the master:
+    HUP       graceful reload: re-exec the master on the same socket, preload the new
+              code, start new workers, then let the old ones drain and exit
+    USR1      print the worker status report (also every --status-interval seconds)
+    TERM/INT  drain workers (up to --graceful-timeout) and stop
+
+Remote SDK clients (Azure, Comprehend, Gemini, Cohere) are created lazily in each
+worker: they own sockets and background threads, which don't survive fork().
+With more than one worker, jobs default to JOB_BACKEND=sqlite (memory is refused),
+so any worker can answer status and event requests for a job another one is processing.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Models built in the master before forking; everything else stays lazy per worker
+PRELOAD_SERVICES = ("nlp_engine", "common_fixes")
+# Set across a reload's exec(): the inherited listening socket, and the workers to retire
+LISTEN_FD_ENV = "PREFORK_LISTEN_FD"
+RETIRING_ENV = "PREFORK_RETIRING"
+# A worker that dies sooner than this after starting is respawned with growing back-off
+MIN_WORKER_LIFETIME = 5.0
+
+
+def preload():
+    """Import the app and build its CPU-side models in this (master) process"""
+    os.environ["SERVICE_WARMUP"] = "off"
+    os.environ["JOB_RECOVER"] = "0"  # the first worker re-queues unfinished jobs after forking
+    # The workers already cover the cores and share the preloaded engine; an NLP pool
+    # per worker would hold another copy of the models in each of its processes
+    os.environ.setdefault("NLP_POOL_WORKERS", "0")
+    import app as app_module
+
+    names = [name for name in PRELOAD_SERVICES if name in app_module.services]
+    start = time.perf_counter()
+    app_module.services.warm_up(names, background=False)
+    print(f"[✅] Preloaded {', '.join(names)} in {time.perf_counter() - start:.2f}s (pid {os.getpid()})")
+    return app_module
+
+
+class WorkerInfo:
+    def __init__(self, index: int, started: float, restarts: int = 0):
+        self.index = index
+        self.started = started
+        self.restarts = restarts
+
+
+class RespawnSchedule:
+    """When to respawn crashed worker slots: at once, or with doubling back-off (up to 30s)
+    while a slot's workers keep dying within MIN_WORKER_LIFETIME of starting"""
+
+    MAX_DELAY = 30
+
+    def __init__(self):
+        self.quick_deaths: Dict[int, int] = {}
+        # index -> (monotonic respawn time, restarts)
+        self.pending: Dict[int, Tuple[float, int]] = {}
+
+    def worker_exited(self, index: int, lived: float, restarts: int, now: float) -> int:
+        """Schedule the slot's respawn and return its delay in seconds"""
+        self.quick_deaths[index] = self.quick_deaths.get(index, 0) + 1 if lived < MIN_WORKER_LIFETIME else 0
+        delay = min(2 ** self.quick_deaths[index] - 1, self.MAX_DELAY)
+        self.pending[index] = (now + delay, restarts + 1)
+        return delay
+
+    def due(self, now: float) -> List[Tuple[int, int]]:
+        """(index, restarts) of the slots to respawn now, removed from the schedule"""
+        ready = sorted((index, restarts) for index, (spawn_at, restarts) in self.pending.items() if now >= spawn_at)
+        for index, _ in ready:
+            del self.pending[index]
+        return ready
+
+    def waiting(self, now: float) -> List[Tuple[int, float]]:
+        """(index, seconds left) of the slots still backing off"""
+        return [(index, max(0.0, spawn_at - now)) for index, (spawn_at, _) in sorted(self.pending.items())]
+
+
+def worker_report(master_pid: int, workers: Dict[int, WorkerInfo]) -> List[Dict]:
+    """Memory (RSS/USS/PSS, bytes), CPU and uptime per process; USS is private memory, PSS splits shared pages"""
+    import psutil
+
+    processes = {master_pid: None, **workers}
+    rows = []
+    for pid, info in processes.items():
+        try:
+            proc = psutil.Process(pid)
+            memory = proc.memory_full_info()
+            cpu = proc.cpu_times()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        rows.append({
+            "pid": pid,
+            "role": "master" if info is None else f"worker {info.index}",
+            "uptime": time.time() - (proc.create_time() if info is None else info.started),
+            "restarts": 0 if info is None else info.restarts,
+            "cpu_seconds": cpu.user + cpu.system,
+            "threads": proc.num_threads(),
+            "rss": memory.rss,
+            "uss": memory.uss,
+            "pss": getattr(memory, "pss", None),
+        })
+    return rows
+
+
+def print_worker_report(master_pid: int, workers: Dict[int, WorkerInfo]) -> None:
+    mb = 1024 * 1024
+    rows = worker_report(master_pid, workers)
+    print(f"\n{'pid':>8}  {'role':<10}{'uptime s':>9}{'restarts':>9}{'cpu s':>8}{'threads':>8}"
+          f"{'rss MB':>9}{'uss MB':>9}{'pss MB':>9}")
+    for row in rows:
+        pss = f"{row['pss'] / mb:>9.1f}" if row["pss"] is not None else f"{'n/a':>9}"
+        print(f"{row['pid']:>8}  {row['role']:<10}{row['uptime']:>9.0f}{row['restarts']:>9}{row['cpu_seconds']:>8.1f}"
+              f"{row['threads']:>8}{row['rss'] / mb:>9.1f}{row['uss'] / mb:>9.1f}{pss}")
+    total_rss = sum(row["rss"] for row in rows)
+    if all(row["pss"] is not None for row in rows):
+        total_pss = sum(row["pss"] for row in rows)
+        print(f"{'total':>8}  {'':<52}{total_rss / mb:>9.1f}{'':>9}{total_pss / mb:>9.1f}"
+              f"\n          (PSS total = actual footprint; RSS total counts shared pages once per process)\n")
+    else:
+        print(f"{'total':>8}  {'':<52}{total_rss / mb:>9.1f}   (PSS not available on this platform)\n")
+
+
+def _listen(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        sock = socket.socket(fileno=int(inherited))
+    else:
+        sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)  # survives the exec() of a graceful reload
+    return sock
+
+
+def run_worker(app_module, sock: socket.socket, index: int, threads: int, graceful_timeout: float,
+               recover_jobs: bool) -> None:
+    """Body of a forked worker; never returns"""
+    # Drop the master's handlers; until the drain handler is set up, TERM simply ends the worker
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+        signal.signal(signum, signal.SIG_DFL)
+    gc.enable()
+    app_module.STARTED_AT = time.time()
+    code = 0
+    try:
+        from waitress import create_server
+
+        server = create_server(app_module.app, sockets=[sock], threads=threads)
+
+        def drain():
+            deadline = time.monotonic() + graceful_timeout
+            while time.monotonic() < deadline:
+                dispatcher = server.task_dispatcher
+                busy = (dispatcher.active_count > 0 or dispatcher.queue
+                        or any(channel.writable() for channel in list(server.active_channels.values()))
+                        or app_module.report_jobs.stats()["pending"])
+                if not busy:
+                    break
+                time.sleep(0.1)
+            os._exit(0)
+
+        def on_term(signum, frame):
+            # Stop taking connections (siblings keep serving the socket), finish what's in flight, exit
+            server.accepting = False
+            threading.Thread(target=drain, name="drain", daemon=True).start()
+
+        signal.signal(signal.SIGTERM, on_term)
+        if recover_jobs:
+            app_module.report_jobs.recover()
+        print(f"[👷] Worker {index} serving (pid {os.getpid()}, {threads} threads)")
+        server.run()
+    except Exception as e:
+        print(f"[❌] Worker {index} crashed: {e}")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def _use_shared_job_store(workers: int) -> None:
+    """Several workers need one job store: default JOB_BACKEND to sqlite, refuse memory"""
+    backend = os.getenv("JOB_BACKEND", "").lower()
+    if workers <= 1 or backend == "sqlite":
+        return
+    if backend == "memory":
+        sys.exit(f"JOB_BACKEND=memory keeps each job inside the worker that runs it; "
+                 f"use JOB_BACKEND=sqlite with {workers} workers")
+    if not backend:
+        os.environ["JOB_BACKEND"] = "sqlite"
+        print(f"[⚡] JOB_BACKEND=sqlite: the {workers} workers share one job store")
+
+
+def _parse_workers(value: str) -> int:
+    if value in ("", "auto", "0"):
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Swasthmate pre-fork server")
+    parser.add_argument("--workers", type=_parse_workers, default=_parse_workers(os.getenv("PREFORK_WORKERS", "auto")),
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("PREFORK_THREADS", "4")),
+                        help="Waitress threads per worker")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--status-interval", type=float, default=float(os.getenv("PREFORK_STATUS_INTERVAL", "0")),
+                        help="print worker health and memory every N seconds (0: only on SIGUSR1)")
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("PREFORK_GRACEFUL_TIMEOUT", "30")),
+                        help="seconds a stopping worker may spend finishing in-flight requests and jobs")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("prefork.py needs os.fork(); use run_waitress.py on this platform")
+
+    _use_shared_job_store(args.workers)
+    sock = _listen(args.host, args.port)
+    reloading = RETIRING_ENV in os.environ
+    retiring = [int(pid) for pid in os.environ.pop(RETIRING_ENV, "").split(",") if pid]
+
+    # Keep the collector from touching (and so un-sharing) the preloaded objects:
+    # no collections while building them, and frozen into the permanent generation before fork
+    gc.disable()
+    try:
+        app_module = preload()
+    except Exception as e:
+        if not reloading:
+            raise
+        # The old workers keep serving the previous code; another HUP retries the reload
+        print(f"[❌] Reload failed, old workers keep serving: {e}")
+        app_module = None
+    gc.freeze()
+
+    workers: Dict[int, WorkerInfo] = {}
+    respawns = RespawnSchedule()
+
+    def spawn(index: int, restarts: int = 0, recover_jobs: bool = False) -> None:
+        pid = os.fork()
+        if pid == 0:
+            run_worker(app_module, sock, index, args.threads, args.graceful_timeout, recover_jobs)
+        workers[pid] = WorkerInfo(index, time.time(), restarts)
+
+    if app_module is not None:
+        print(f"🚀 Starting Swasthmate on http://{args.host}:{args.port} with {args.workers} pre-forked worker(s), "
+              f"{args.threads} threads each")
+        for index in range(args.workers):
+            # Jobs are recovered on a cold start only: after a reload the old workers are still finishing theirs
+            spawn(index, recover_jobs=index == 0 and not reloading)
+        for pid in retiring:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        if retiring:
+            print(f"[🔄] Reload complete; {len(retiring)} old worker(s) draining")
+            retiring = []
+    else:
+        workers.update({pid: WorkerInfo(index, time.time()) for index, pid in enumerate(retiring)})
+        retiring = []
+
+    pending_signal: Optional[int] = None
+
+    def on_signal(signum, frame):
+        nonlocal pending_signal
+        pending_signal = signum
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+        signal.signal(signum, on_signal)
+
+    next_report = time.monotonic() + args.status_interval if args.status_interval else None
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in workers:
+            info = workers.pop(pid)
+            print(f"[⚠️] Worker {info.index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+            if app_module is not None and pending_signal not in (signal.SIGTERM, signal.SIGINT):
+                # Spawned by the tick below, so signals and other slots are still handled meanwhile
+                delay = respawns.worker_exited(info.index, time.time() - info.started, info.restarts,
+                                               time.monotonic())
+                if delay:
+                    print(f"[⏳] Worker {info.index} keeps dying; respawning in {delay}s")
+
+        if pending_signal not in (signal.SIGTERM, signal.SIGINT):
+            for index, restarts in respawns.due(time.monotonic()):
+                spawn(index, restarts=restarts)
+
+        if next_report and time.monotonic() >= next_report:
+            pending_signal = pending_signal or signal.SIGUSR1
+            next_report = time.monotonic() + args.status_interval
+
+        signum, pending_signal = pending_signal, None
+        if signum == signal.SIGUSR1:
+            print_worker_report(os.getpid(), workers)
+            for index, left in respawns.waiting(time.monotonic()):
+                print(f"[⏳] Worker {index} respawns in {left:.0f}s")
+        elif signum == signal.SIGHUP:
+            print("[🔄] Reloading: re-executing the master; current workers serve until the new ones are up")
+            os.environ[LISTEN_FD_ENV] = str(sock.fileno())
+            os.environ[RETIRING_ENV] = ",".join(str(pid) for pid in workers)
+            sys.stdout.flush()
+            os.execv(sys.executable, [sys.executable] + sys.argv)
+        elif signum in (signal.SIGTERM, signal.SIGINT):
+            break
+        time.sleep(0.2)
+
+    print(f"[🛑] Stopping {len(workers)} worker(s), up to {args.graceful_timeout:.0f}s to drain...")
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + args.graceful_timeout + 5
+    while workers and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.pop(pid, None)
+        else:
+            time.sleep(0.1)
+    for pid in workers:
+        print(f"[⚠️] Worker pid {pid} didn't stop in time, killing it")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+
+if __name__ == "__main__":
+    main()
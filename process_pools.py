@@ -0,0 +1,34 @@
+# process_pools.py - Start method for worker process pools created inside the web process
+import multiprocessing
+import os
+import threading
+from typing import Iterable, Optional
+
+_lock = threading.Lock()
+_preload = set()
+# Process that first asked for the fork server; forked children of it must not use that server
+_forkserver_owner: Optional[int] = None
+
+
+def clean_mp_context(preload: Iterable[str] = ()):
+    """multiprocessing context whose workers don't start as a fork of the caller.
+
+    Forking a threaded web process copies whatever locks other request
+    threads hold at that instant (stdout, imports, connection pools), so pool
+    workers come from a fork server instead, which preloads the given modules
+    (merged across callers: the server starts once) - and not __main__, which
+    for `python app.py` would re-run the app's start-up in it. A forked child of the
+    process owning the fork server - a pre-fork worker - can't talk to its
+    parent's server, so it gets spawn, as do platforms without forkserver.
+    """
+    global _forkserver_owner
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        with _lock:
+            if _forkserver_owner is None:
+                _forkserver_owner = os.getpid()
+            if _forkserver_owner == os.getpid():
+                _preload.update(preload)
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(sorted(_preload))
+                return context
+    return multiprocessing.get_context("spawn")
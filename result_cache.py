@@ -0,0 +1,239 @@
+# result_cache.py - Content-addressed cache for OCR text and analysis results
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Modules whose rules shape an analysis; editing any of them invalidates cached results
+RULESET_MODULES = ("medical_nlp.py", "text_analyzer.py", "analysis_engine.py", "recommendations.py")
+
+
+def ruleset_version() -> str:
+    """Short hash of the NLP rule modules (plus RESULT_CACHE_SALT, to force a flush)"""
+    digest = hashlib.sha256(os.getenv("RESULT_CACHE_SALT", "").encode())
+    for name in RULESET_MODULES:
+        path = Path(__file__).with_name(name)
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def file_sha256(path_or_stream) -> str:
+    """SHA-256 of a file's bytes; streams are rewound afterwards so they can still be saved"""
+    digest = hashlib.sha256()
+    if hasattr(path_or_stream, "read"):
+        for block in iter(lambda: path_or_stream.read(1 << 20), b""):
+            digest.update(block)
+        path_or_stream.seek(0)
+    else:
+        with open(path_or_stream, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskStore:
+    """One JSON file per entry; least recently read files are evicted past max_bytes.
+
+    The size is tracked per process, but other processes (pre-fork workers)
+    write to the same directory: after local writes worth RESCAN_FRACTION
+    of max_bytes, the directory is re-measured so their entries count too.
+    """
+
+    RESCAN_FRACTION = 0.1
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.directory.glob("*.json"))
+        self._written = 0  # bytes this process added since the last scan
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            data = path.read_text(encoding="utf-8")
+            os.utime(path)  # mtime doubles as last-access time for eviction
+            return data
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, data: str) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        with self._lock:
+            try:
+                replaced = path.stat().st_size  # overwriting an entry only changes the size by the difference
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)  # atomic, so concurrent workers never read half an entry
+            growth = len(data.encode("utf-8")) - replaced
+            self._size += growth
+            self._written += max(growth, 0)
+            if self._size > self.max_bytes or self._written >= self.max_bytes * self.RESCAN_FRACTION:
+                entries = self._scan()
+                if self._size > self.max_bytes:
+                    self._evict(entries)
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every entry, oldest first; resets the size to what is on disk"""
+        entries = []
+        for p in self.directory.glob("*.json"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        self._written = 0
+        return entries
+
+    def _evict(self, entries: List[Tuple[float, int, Path]]) -> None:
+        target = self.max_bytes * 0.9
+        for _, size, p in entries:
+            if self._size <= target:
+                break
+            try:
+                p.unlink()
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "disk", "path": str(self.directory), "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+class SQLiteStore:
+    """Single-file SQLite store; least recently read rows are evicted past max_bytes"""
+
+    def __init__(self, path, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn_pid = os.getpid()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # A forked worker must not reuse its parent's connection
+        if self._conn_pid != os.getpid():
+            self._connect()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def set(self, key: str, data: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), time.time()),
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                target = self.max_bytes * 0.9
+                evict = []
+                for row_key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                    if total <= target:
+                        break
+                    evict.append((row_key,))
+                    total -= size
+                self._db.executemany("DELETE FROM entries WHERE key = ?", evict)
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"backend": "sqlite", "path": str(self.path), "entries": count, "bytes": total,
+                "max_bytes": self.max_bytes}
+
+
+STORE_BACKENDS = {"disk": DiskStore, "sqlite": SQLiteStore}
+
+
+def make_store(backend: Optional[str] = None, path: Optional[str] = None, max_mb: Optional[float] = None):
+    """Build the configured store (RESULT_CACHE_BACKEND / _PATH / _MAX_MB); None when disabled"""
+    backend = (backend or os.getenv("RESULT_CACHE_BACKEND", "disk")).lower()
+    if backend in ("", "none", "off"):
+        return None
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown result cache backend {backend!r}; expected one of {sorted(STORE_BACKENDS)} or 'none'")
+    default_path = "uploads/.cache/results" if backend == "disk" else "uploads/.cache/results.sqlite3"
+    path = path or os.getenv("RESULT_CACHE_PATH", default_path)
+    max_mb = max_mb if max_mb is not None else float(os.getenv("RESULT_CACHE_MAX_MB", "512"))
+    return STORE_BACKENDS[backend](path, int(max_mb * 1024 * 1024))
+
+
+class ResultCache:
+    """JSON values keyed by content hash, scoped to a namespace and a version.
+
+    The version is part of every key, so bumping it (e.g. a new NLP rule set)
+    simply stops old entries from being found; eviction reclaims their space.
+    """
+
+    def __init__(self, store, namespace: str, version: str = ""):
+        self.store = store
+        self.namespace = namespace
+        self.version = version
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, *parts) -> str:
+        raw = "\x1f".join([self.namespace, self.version, *map(str, parts)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, *parts) -> Optional[Any]:
+        if self.store is None:
+            return None
+        data = self.store.get(self._key(*parts))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(data)
+
+    def set(self, value: Any, *parts) -> None:
+        if self.store is not None:
+            self.store.set(self._key(*parts), json.dumps(value))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "name": self.namespace,
+            "version": self.version,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **(self.store.stats() if self.store is not None else {"backend": "none"}),
+        }
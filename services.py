@@ -0,0 +1,95 @@
+# services.py - Lazy registry for heavy SDK clients and NLP models
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class LazyService:
+    """Builds its value with factory() on first get(); later calls return the same object.
+
+    A factory that raises is retried on the next get(), so a transient failure
+    (network, missing model) doesn't disable the service for the process lifetime.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"[❌] Failed to load {self.name}: {e}")
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.error = None
+                self._loaded = True
+                print(f"[⚡] Loaded {self.name} in {self.load_seconds:.2f}s")
+        return self._value
+
+
+class ServiceRegistry:
+    """Named LazyServices; importing a module that registers one costs nothing until it is used"""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyService:
+        service = self._services[name] = LazyService(name, factory)
+        return service
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._services
+
+    def get(self, name: str) -> Any:
+        return self._services[name].get()
+
+    def loaded(self, name: str) -> bool:
+        """Whether the service is built, without building it"""
+        return name in self._services and self._services[name].loaded
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """Load services ahead of the first request, in registration order unless names are given.
+
+        In the background the process starts serving at once; requests that
+        arrive before a service is ready simply wait on its lock.
+        """
+        names = list(names) if names is not None else list(self._services)
+
+        def run():
+            start = time.perf_counter()
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # already logged; the first real use retries
+            print(f"[🔥] Warm-up of {len(names)} service(s) finished in {time.perf_counter() - start:.2f}s")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="service-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [{"name": s.name, "loaded": s.loaded, "load_seconds": s.load_seconds, "error": s.error}
+                for s in self._services.values()]
+
+
+services = ServiceRegistry()
@@ -34,7 +34,7 @@ document.addEventListener('DOMContentLoaded', function () {
       const formData = new FormData();
       formData.append('report', file);
 
-      fetch('/upload', {
+      fetch('/upload?async=1', {
         method: 'POST',
         body: formData
       })
@@ -47,66 +47,11 @@ document.addEventListener('DOMContentLoaded', function () {
           return res.json();
         })
         .then((data) => {
-          console.log('📤 Upload response received:', data);
-          console.log('📊 Response status:', data.status);
-          console.log('🆔 Report ID:', data.report_id);
-          console.log('📄 Filename:', data.filename);
-          console.log('🔍 Has extracted_text:', !!data.extracted_text);
-          console.log('🧠 Has analysis:', !!data.analysis);
-          console.log('🔬 Has enhanced_analysis:', !!data.enhanced_analysis);
-          console.log('💡 Has recommendations:', !!data.recommendations);
-          console.log('📋 Analysis details:', data.analysis);
-          console.log('🔬 Enhanced analysis:', data.enhanced_analysis);
-          
-          if (data.status !== 'success') {
-            console.error('❌ Upload failed:', data.message || 'Unknown error');
-            alert('Upload failed: ' + (data.message || 'Unknown error'));
-            return;
-          }
-
-          // Step 2: Processing
-          if (progressSteps.length > 0 && progressStatus) {
-            updateStep(1, 'Processing with OCR and NLP...');
-
-            setTimeout(() => {
-              updateStep(2, 'Analyzing medical data...');
-
-              setTimeout(() => {
-                updateStep(3, 'Generating results...');
-                
-                // Store data in sessionStorage BEFORE navigation
-                if (typeof sessionStorage !== 'undefined') {
-                  console.log('Storing data in sessionStorage:', {
-                    report_id: data.report_id,
-                    filename: data.filename,
-                    has_analysis: !!data.analysis,
-                    has_enhanced: !!data.enhanced_analysis
-                  });
-                  
-                  sessionStorage.setItem('reportData', JSON.stringify(data));
-                  sessionStorage.setItem('report_id', data.report_id || '');
-                  
-                  // Verify storage
-                  const stored = sessionStorage.getItem('reportData');
-                  console.log('Data stored successfully:', !!stored);
-                } else {
-                  console.error('sessionStorage not available');
-                }
-                
-                // Call displayResults if function exists (on current page)
-                if (typeof displayResults === 'function') {
-                  displayResults(data);
-                } else if (typeof window.displayResults === 'function') {
-                  window.displayResults(data);
-                }
-                
-                // Navigate to analysis page after ensuring data is stored
-                setTimeout(() => {
-                  console.log('Navigating to /analysis');
-                  window.location.href = '/analysis';
-                }, 1500);
-              }, 1000);
-            }, 1000);
+          if (data.status === 'queued') {
+            console.log('📥 Report queued:', data.report_id);
+            followReport(data.report_id);
+          } else {
+            handleUploadResult(data);
           }
         })
         .catch((err) => {
@@ -116,6 +61,151 @@ document.addEventListener('DOMContentLoaded', function () {
     });
   }
 
+  // Step 3 (queued uploads): follow server-side stages as they complete
+  const STAGE_STEPS = {
+    cached: [3, 'Found previous results for this report...'],
+    ocr: [1, 'Text extracted, running medical NLP...'],
+    nlp: [2, 'Analyzing medical data...'],
+    measurements: [2, 'Checking measurements against normal ranges...'],
+    enhanced: [3, 'Generating results...'],
+    persisted: [3, 'Generating results...']
+  };
+
+  function followReport(reportId) {
+    if (progressSteps.length > 0 && progressStatus) {
+      updateStep(1, 'Processing with OCR and NLP...');
+    }
+    if (typeof EventSource === 'undefined') {
+      pollReport(reportId);
+      return;
+    }
+
+    const events = new EventSource(`/api/report/${reportId}/events`);
+    Object.keys(STAGE_STEPS).forEach((stage) => {
+      events.addEventListener(stage, (e) => {
+        const partial = e.data ? JSON.parse(e.data) : {};
+        console.log(`🛰️ Stage complete: ${stage}`, partial);
+        if (progressSteps.length > 0 && progressStatus) {
+          updateStep(...STAGE_STEPS[stage]);
+        }
+        if (stage === 'ocr' && partial.extracted_text) {
+          sessionStorage.setItem('extractedText', partial.extracted_text);
+        }
+      });
+    });
+    events.addEventListener('done', () => {
+      events.close();
+      fetchReport(reportId);
+    });
+    events.addEventListener('failed', (e) => {
+      events.close();
+      const error = e.data ? JSON.parse(e.data) : {};
+      alert('Upload failed: ' + (error.message || 'Unknown error'));
+    });
+    events.onerror = () => {
+      // Stream dropped for good (proxy, server restart): fall back to polling
+      if (events.readyState === EventSource.CLOSED) {
+        pollReport(reportId);
+      }
+    };
+  }
+
+  function pollReport(reportId) {
+    fetch(`/api/get-report/${reportId}`)
+      .then((res) => res.json().then((data) => ({ code: res.status, data })))
+      .then(({ code, data }) => {
+        if (code === 202) {
+          setTimeout(() => pollReport(reportId), 1500);
+        } else {
+          handleUploadResult(data);
+        }
+      })
+      .catch((err) => alert('Upload failed: ' + err.message));
+  }
+
+  function fetchReport(reportId) {
+    fetch(`/api/get-report/${reportId}`)
+      .then((res) => res.json())
+      .then((data) => {
+        if (data.status !== 'success') {
+          alert('Upload failed: ' + (data.message || 'Unknown error'));
+          return;
+        }
+        showResults(data);
+      })
+      .catch((err) => alert('Upload failed: ' + err.message));
+  }
+
+  function handleUploadResult(data) {
+    console.log('📤 Upload response received:', data);
+    console.log('📊 Response status:', data.status);
+    console.log('🆔 Report ID:', data.report_id);
+    console.log('📄 Filename:', data.filename);
+    console.log('🔍 Has extracted_text:', !!data.extracted_text);
+    console.log('🧠 Has analysis:', !!data.analysis);
+    console.log('🔬 Has enhanced_analysis:', !!data.enhanced_analysis);
+    console.log('💡 Has recommendations:', !!data.recommendations);
+    console.log('📋 Analysis details:', data.analysis);
+    console.log('🔬 Enhanced analysis:', data.enhanced_analysis);
+
+    if (data.status !== 'success') {
+      console.error('❌ Upload failed:', data.message || 'Unknown error');
+      alert('Upload failed: ' + (data.message || 'Unknown error'));
+      return;
+    }
+
+    // Step 2: Processing
+    if (progressSteps.length > 0 && progressStatus) {
+      updateStep(1, 'Processing with OCR and NLP...');
+
+      setTimeout(() => {
+        updateStep(2, 'Analyzing medical data...');
+
+        setTimeout(() => {
+          showResults(data);
+        }, 1000);
+      }, 1000);
+    }
+  }
+
+  function showResults(data) {
+    if (progressSteps.length > 0 && progressStatus) {
+      updateStep(3, 'Generating results...');
+    }
+
+    // Store data in sessionStorage BEFORE navigation
+    if (typeof sessionStorage !== 'undefined') {
+      console.log('Storing data in sessionStorage:', {
+        report_id: data.report_id,
+        filename: data.filename,
+        has_analysis: !!data.analysis,
+        has_enhanced: !!data.enhanced_analysis
+      });
+
+      sessionStorage.setItem('reportData', JSON.stringify(data));
+      sessionStorage.setItem('report_id', data.report_id || '');
+
+      // Verify storage
+      const stored = sessionStorage.getItem('reportData');
+      console.log('Data stored successfully:', !!stored);
+    } else {
+      console.error('sessionStorage not available');
+    }
+
+    // Call displayResults if function exists (on current page)
+    if (typeof displayResults === 'function') {
+      displayResults(data);
+    } else if (typeof window.displayResults === 'function') {
+      window.displayResults(data);
+    }
+
+    // Navigate to analysis page after ensuring data is stored
+    setTimeout(() => {
+      console.log('Navigating to /analysis');
+      window.location.href = '/analysis';
+    }, 1500);
+  }
+
   function updateStep(index, statusText) {
     progressSteps.forEach((step, i) => {
       step.classList.toggle('actived', i <= index);
@@ -0,0 +1,61 @@
+# test_aws_clients.py - The shared Comprehend Medical client, exercised through botocore's Stubber
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from botocore.stub import Stubber
+
+import aws_clients
+from text_analyzer import analyze_medical_text
+
+TEXT = "Patient on metformin 500 mg for type 2 diabetes."
+RESPONSE = {
+    "Entities": [
+        {"Id": 0, "BeginOffset": 11, "EndOffset": 20, "Score": 0.99, "Text": "metformin",
+         "Category": "MEDICATION", "Type": "GENERIC_NAME"},
+        {"Id": 1, "BeginOffset": 33, "EndOffset": 48, "Score": 0.97, "Text": "type 2 diabetes",
+         "Category": "MEDICAL_CONDITION", "Type": "DX_NAME"},
+    ],
+    "ModelVersion": "2.0",
+}
+EXPECTED = [
+    {"Text": "metformin", "Type": "MEDICATION", "BeginOffset": 11, "EndOffset": 20},
+    {"Text": "type 2 diabetes", "Type": "MEDICAL_CONDITION", "BeginOffset": 33, "EndOffset": 48},
+]
+CREDENTIALS = ("AKIDTEST", "secret")
+
+
+@pytest.fixture
+def stubbed_client():
+    # Only the registry's instance is stubbed: a call that built its own client would go to the network
+    aws_clients.reset_clients()
+    client = aws_clients.get_comprehend_medical_client(*CREDENTIALS)
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+    aws_clients.reset_clients()
+
+
+def test_client_is_built_once_per_credentials(stubbed_client):
+    client, _ = stubbed_client
+    assert aws_clients.get_comprehend_medical_client(*CREDENTIALS) is client
+    assert aws_clients.get_client("comprehendmedical", *CREDENTIALS) is client
+    assert aws_clients.get_comprehend_medical_client("AKIDOTHER", "secret") is not client
+    assert aws_clients.get_comprehend_medical_client(*CREDENTIALS, region="eu-west-2") is not client
+
+
+def test_repeated_calls_reuse_client_and_return_identical_entities(stubbed_client):
+    _, stubber = stubbed_client
+    for _ in range(3):
+        stubber.add_response("detect_entities_v2", RESPONSE, {"Text": TEXT})
+    results = [analyze_medical_text(TEXT, *CREDENTIALS) for _ in range(3)]
+    assert results == [EXPECTED] * 3
+
+
+def test_concurrent_calls_share_the_client(stubbed_client):
+    _, stubber = stubbed_client
+    for _ in range(16):
+        stubber.add_response("detect_entities_v2", RESPONSE, {"Text": TEXT})
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: analyze_medical_text(TEXT, *CREDENTIALS), range(16)))
+    assert results == [EXPECTED] * 16
+    assert len(aws_clients._clients) == 1
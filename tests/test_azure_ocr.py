@@ -0,0 +1,194 @@
+# test_azure_ocr.py - AzureOCRService against a local fake of the analyze/poll API
+import json
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+import azure_ocr
+from azure_ocr import AzureOCRService
+
+ANALYZE_PATH = "/formrecognizer/documentModels/prebuilt-read:analyze"
+RESULT_PATH = "/formrecognizer/documentModels/prebuilt-read/analyzeResults/"
+TIMESTAMPS = {"createdDateTime": "2024-01-01T00:00:00Z", "lastUpdatedDateTime": "2024-01-01T00:00:00Z"}
+
+
+class FakeAzure(ThreadingHTTPServer):
+    """Answers analyze with 202 + Operation-Location; an operation succeeds on its polls_to_finish-th poll"""
+
+    daemon_threads = True
+
+    def __init__(self, polls_to_finish=3, failures=0):
+        super().__init__(("127.0.0.1", 0), FakeAzureHandler)
+        self.polls_to_finish = polls_to_finish  # 0: never finishes
+        self.failures = failures  # analyze requests answered 503 before the first 202
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.posts = 0
+        self.poll_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class FakeAzureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=()):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        fake = self.server
+        document = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        with fake.lock:
+            fake.posts += 1
+            if fake.posts <= fake.failures:
+                return self._reply(503, {"error": {"code": "ServiceUnavailable", "message": "busy"}},
+                                   [("Retry-After", "0")])
+            operation = str(len(fake.operations))
+            fake.operations[operation] = {"document": document, "polls": 0}
+            fake.in_flight += 1
+            fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+        location = f"{fake.endpoint}{RESULT_PATH}{operation}?api-version=2023-07-31"
+        self._reply(202, headers=[("Operation-Location", location)])
+
+    def do_GET(self):
+        fake = self.server
+        with fake.lock:
+            operation = fake.operations[self.path.split(RESULT_PATH)[1].split("?")[0]]
+            operation["polls"] += 1
+            fake.poll_times.append(time.monotonic())
+            done = operation["polls"] == fake.polls_to_finish
+            if done:
+                fake.in_flight -= 1
+        if not fake.polls_to_finish or operation["polls"] < fake.polls_to_finish:
+            return self._reply(200, {"status": "running", **TIMESTAMPS})
+        lines = [{"content": line, "polygon": [], "spans": []} for line in operation["document"].splitlines()]
+        page = {"pageNumber": 1, "angle": 0, "width": 8.5, "height": 11, "unit": "inch",
+                "spans": [], "lines": lines, "words": []}
+        self._reply(200, {"status": "succeeded", **TIMESTAMPS, "analyzeResult": {
+            "apiVersion": "2023-07-31", "modelId": "prebuilt-read",
+            "content": operation["document"], "pages": [page]}})
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text("PATIENT REPORT\nDiagnosis: hypertension\n")
+    return str(path)
+
+
+def make_service(fake, **kwargs):
+    kwargs.setdefault("polling_interval", 0.05)
+    return AzureOCRService(fake.endpoint, "fake-key", retry_backoff_factor=0.01, **kwargs)
+
+
+def test_polls_until_succeeded_at_polling_interval(document):
+    fake = FakeAzure(polls_to_finish=3)
+    service = make_service(fake, polling_interval=0.2)
+    try:
+        assert service.extract_text(document) == "PATIENT REPORT\nDiagnosis: hypertension"
+        assert len(fake.poll_times) == 3
+        gaps = [later - earlier for earlier, later in zip(fake.poll_times, fake.poll_times[1:])]
+        assert min(gaps) >= 0.15
+        assert service.stats()["completed"] == 1
+    finally:
+        service.close()
+        fake.stop()
+
+
+def test_max_concurrency_bounds_operations_in_flight(tmp_path):
+    fake = FakeAzure(polls_to_finish=4)
+    service = make_service(fake, max_concurrency=2)
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"page{i}.txt"
+        path.write_text(f"page {i}\n")
+        paths.append(str(path))
+    try:
+        futures = [service.submit(path) for path in paths]
+        assert [future.result(10) for future in futures] == [f"page {i}" for i in range(6)]
+        assert fake.max_in_flight == 2
+        assert service.stats()["in_flight"] == 0
+    finally:
+        service.close()
+        fake.stop()
+
+
+def test_timeout_cancels_the_analysis(document):
+    fake = FakeAzure(polls_to_finish=0)
+    service = make_service(fake)
+    try:
+        with pytest.raises(FutureTimeout):
+            service.extract_text(document, timeout=0.5)
+        time.sleep(0.3)
+        polls = len(fake.poll_times)
+        time.sleep(0.3)
+        assert len(fake.poll_times) == polls  # stopped polling once cancelled
+        assert (service.stats()["cancelled"], service.stats()["in_flight"]) == (1, 0)
+    finally:
+        service.close()
+        fake.stop()
+
+
+def test_transient_errors_are_retried(document):
+    fake = FakeAzure(failures=2)
+    service = make_service(fake)
+    try:
+        assert service.extract_text(document).startswith("PATIENT REPORT")
+        assert fake.posts == 3
+    finally:
+        service.close()
+        fake.stop()
+
+
+def test_retries_exhausted_raise(document):
+    fake = FakeAzure(failures=5)
+    service = make_service(fake, retry_total=1)
+    try:
+        with pytest.raises(HttpResponseError):
+            service.extract_text(document)
+        assert fake.posts == 2
+        assert service.stats()["failed"] == 1
+    finally:
+        service.close()
+        fake.stop()
+
+
+def test_document_is_read_off_the_event_loop(document, monkeypatch):
+    readers = []
+    read_bytes = azure_ocr._read_bytes
+    monkeypatch.setattr(azure_ocr, "_read_bytes",
+                        lambda path: readers.append(threading.current_thread().name) or read_bytes(path))
+    fake = FakeAzure(polls_to_finish=1)
+    service = make_service(fake)
+    try:
+        assert service.extract_text(document).startswith("PATIENT REPORT")
+        assert len(readers) == 1 and readers[0] != "azure-ocr-loop"
+        with pytest.raises(FileNotFoundError):
+            service.extract_text(document + ".missing")
+        assert service.stats()["failed"] == 1
+    finally:
+        service.close()
+        fake.stop()
@@ -0,0 +1,60 @@
+# test_common_fixes.py - Literal-gated COMMON_FIXES against applying the table fix by fix
+import random
+import re
+
+import pytest
+
+import text_analyzer
+from text_analyzer import COMMON_FIXES, _required_literal, clean_ocr_text
+
+SEPARATORS = [" ", "  ", "\n", "\n\n", ", ", ". ", "-", "/", "(", ")", ":", ""]
+EXTRA = list(COMMON_FIXES.values()) + ["Tab", "500", "mg", "report", "the", "Pet", "Scan", "CT", "T", "D3",
+                                       "xx", "Sign", "CA-125", "SpO2%"]
+
+
+def sequential_fixes(text, fixes=COMMON_FIXES):
+    for pattern, replacement in fixes.items():
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+def sequential_clean(text):
+    t = re.sub(r'[ \t]+', ' ', text)
+    t = re.sub(r'\n{2,}', '\n', t)
+    return sequential_fixes(t).strip()
+
+
+def example(pattern, rng):
+    """A random string the fix pattern matches, with spacing, optional characters and case varied"""
+    sample = pattern.replace(r"\b", "").replace(r"\s*", rng.choice(["", " ", "  "])).replace(r"\s+", " ")
+    sample = sample.replace(r"\.", ".")
+    sample = re.sub(r"(.)\?", lambda m: m.group(1) if rng.random() < 0.5 else "", sample)
+    return "".join(c.upper() if rng.random() < 0.3 else c for c in sample)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_clean_ocr_text_matches_sequential_fixes(seed):
+    rng = random.Random(seed)
+    examples = [e for pattern in COMMON_FIXES for e in (example(pattern, rng) for _ in range(3))
+                if re.search(pattern, e, re.IGNORECASE)]
+    for _ in range(1000):
+        parts = [rng.choice(examples if rng.random() < 0.6 else EXTRA) for _ in range(rng.randint(1, 12))]
+        text = "".join(part + rng.choice(SEPARATORS) for part in parts)
+        assert clean_ocr_text(text) == sequential_clean(text), text
+
+
+def test_required_literal_is_the_longest_mandatory_run():
+    assert _required_literal(r"\bTaxoll?\b") == "taxol"
+    assert _required_literal(r"\bT\s*Komin\s*D3\b") == "komin"
+    assert _required_literal(r"\bS\.\s*Ferritin\b") == "ferritin"
+
+
+def test_patterns_without_a_known_literal_are_always_tried():
+    for pattern in [r"\b(?:a|b)\b", r"\b[ab]x\b", r"\bA\d+\b", r"\bA.B\b", r"\bA\s*?B\b"]:
+        assert _required_literal(pattern) is None, pattern
+
+
+def test_letters_regex_folds_to_ascii_pass_the_gate():
+    # Long s and dotless i match s and i under re.IGNORECASE, but str.lower() keeps them
+    text = "Atrova\u017ft and Tpom\u0131n"
+    assert clean_ocr_text(text) == sequential_clean(text) != text
@@ -0,0 +1,87 @@
+# test_comprehend_chunks.py - Chunked Comprehend Medical calls and offsets re-based onto the full report
+import random
+import re
+import threading
+
+import pytest
+
+import text_analyzer
+from text_analyzer import analyze_medical_text, chunk_text
+
+TERMS = {"metformin": "MEDICATION", "type 2 diabetes": "MEDICAL_CONDITION", "HbA1c": "TEST_TREATMENT_PROCEDURE"}
+WORDS = ["patient", "reviewed", "fasting", "glucose", "stable", "on", "follow-up", "in", "weeks", "mg", "500"]
+
+
+class FakeComprehend:
+    """detect_entities_v2 that reports every TERMS occurrence, with offsets into the text it was sent"""
+
+    def __init__(self):
+        self.texts = []
+        self._lock = threading.Lock()
+
+    def detect_entities_v2(self, Text):
+        with self._lock:
+            self.texts.append(Text)
+        entities = [{"Text": m.group(0), "Category": TERMS[m.group(0)], "BeginOffset": m.start(), "EndOffset": m.end()}
+                    for m in re.finditer("|".join(map(re.escape, TERMS)), Text)]
+        return {"Entities": entities}
+
+
+def report(paragraphs, seed=0):
+    rng = random.Random(seed)
+    sentences = lambda: " ".join(
+        " ".join(rng.choice(WORDS + list(TERMS)) for _ in range(rng.randint(4, 12))) + "." for _ in range(5))
+    return "\n\n".join("\n".join(sentences() for _ in range(3)) for _ in range(paragraphs))
+
+
+@pytest.fixture
+def comprehend(monkeypatch):
+    client = FakeComprehend()
+    monkeypatch.setattr(text_analyzer, "get_comprehend_medical_client", lambda *args, **kwargs: client)
+    return client
+
+
+def test_chunks_fit_the_budget_and_map_back_to_the_text():
+    text = report(60)
+    chunks = chunk_text(text, max_bytes=2000)
+    assert len(chunks) > 1
+    for offset, chunk in chunks:
+        assert len(chunk.encode("utf-8")) <= 2000
+        assert text[offset:offset + len(chunk)] == chunk
+    # Nothing but whitespace falls between or around chunks
+    covered = 0
+    for offset, chunk in chunks:
+        assert offset >= covered and not text[covered:offset].strip()
+        covered = offset + len(chunk)
+    assert not text[covered:].strip()
+
+
+def test_chunks_end_at_paragraph_breaks_when_paragraphs_fit():
+    text = report(60)
+    for offset, chunk in chunk_text(text, max_bytes=2000)[:-1]:
+        assert text[offset + len(chunk) - 2:offset + len(chunk)] == "\n\n"
+
+
+def test_overlong_word_is_cut_on_character_edges():
+    text = "é" * 1500  # 3000 bytes in UTF-8
+    chunks = chunk_text(text, max_bytes=1001)
+    assert all(len(chunk.encode("utf-8")) <= 1001 for _, chunk in chunks)
+    assert "".join(chunk for _, chunk in chunks) == text
+
+
+def test_long_report_offsets_point_at_the_entities(comprehend):
+    text = report(120)
+    entities = analyze_medical_text(text, "AKIDTEST", "secret")
+    assert len(comprehend.texts) > 1
+    assert all(len(sent.encode("utf-8")) <= text_analyzer.COMPREHEND_CHUNK_BYTES for sent in comprehend.texts)
+    assert [text[e["BeginOffset"]:e["EndOffset"]] for e in entities] == [e["Text"] for e in entities]
+    expected = [m.start() for m in re.finditer("|".join(map(re.escape, TERMS)), text)]
+    assert [e["BeginOffset"] for e in entities] == expected
+
+
+def test_short_report_is_sent_whole(comprehend):
+    text = "Patient on metformin 500 mg for type 2 diabetes."
+    entities = analyze_medical_text(text, "AKIDTEST", "secret")
+    assert comprehend.texts == [text]
+    assert [(e["Type"], e["BeginOffset"], e["EndOffset"]) for e in entities] == [
+        ("MEDICATION", 11, 20), ("MEDICAL_CONDITION", 32, 47)]
@@ -0,0 +1,47 @@
+# test_job_store.py - Finished jobs are pruned from the memory and SQLite stores
+import time
+
+from jobs import MemoryJobStore, SQLiteJobStore
+
+
+def test_memory_store_prunes_old_finished_jobs():
+    store = MemoryJobStore(ttl=60)
+    store.create("old", {})
+    store.update("old", status="done")
+    store.create("running", {})
+    store.update("running", status="processing")
+    store._jobs["old"]["updated"] = store._jobs["running"]["updated"] = time.time() - 120
+    store.create("new", {})
+    assert store.get("old") is None
+    assert store.get("running") is not None
+    assert store.get("new") is not None
+
+
+def test_memory_store_caps_finished_jobs():
+    store = MemoryJobStore(max_jobs=3)
+    for i in range(5):
+        store.create(f"job{i}", {})
+        store.update(f"job{i}", status="failed" if i % 2 else "done")
+    store.create("queued", {})
+    assert [job_id for job_id in store._jobs] == ["job3", "job4", "queued"]
+
+
+def test_memory_store_keeps_unfinished_jobs_over_cap():
+    store = MemoryJobStore(max_jobs=2)
+    for i in range(4):
+        store.create(f"job{i}", {})
+    assert len(store.unfinished()) == 4
+
+
+def test_sqlite_store_prunes_old_finished_jobs(tmp_path):
+    store = SQLiteJobStore(tmp_path / "jobs.sqlite3", ttl=60)
+    for job_id, status in (("old-done", "done"), ("old-failed", "failed"), ("old-queued", "queued"), ("recent", "done")):
+        store.create(job_id, {"n": 1})
+        store.update(job_id, status=status)
+    store._conn.execute("UPDATE jobs SET updated = ? WHERE id LIKE 'old-%'", (time.time() - 120,))
+    store._conn.commit()
+    store.create("new", {})
+    assert store.get("old-done") is None
+    assert store.get("old-failed") is None
+    assert store.get("old-queued")["payload"] == {"n": 1}
+    assert store.get("recent") is not None
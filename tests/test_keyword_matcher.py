@@ -0,0 +1,76 @@
+# test_keyword_matcher.py - Single-pass KeywordMatcher against the old per-synonym regex scan
+import random
+import re
+
+import pytest
+
+from medical_nlp import (DISEASE_SYNONYM_GROUPS, MEDICINE_SYNONYM_GROUPS, MedicalNLP, VocabularyIndex,
+                         build_keyword_matcher, synonym_matches)
+
+DISEASE_VOCABULARY = MedicalNLP._load_disease_vocabulary(None)
+DISEASE_INDEX = VocabularyIndex.build(DISEASE_VOCABULARY)
+MATCHER = build_keyword_matcher(DISEASE_INDEX.choices)
+
+SEPARATORS = [" ", " ", ", ", ". ", "\n", "-", "'s ", "/", ""]
+FILLERS = ["patient", "noted", "history of", "mg", "500", "type", "disease", "x", "resistance", "level"]
+
+
+def old_scan(text):
+    """Disease and medicine hits as the per-group `\\b(a|b|...)\\b` regexes found them"""
+    text_lower = text.lower()
+    diseases = set()
+    for group in DISEASE_SYNONYM_GROUPS:
+        diseases.update(re.findall(r'\b(' + '|'.join(group) + r')\b', text_lower, re.I))
+    vocab = {word for word in re.findall(r'\b\w{4,}\b', text_lower) if DISEASE_INDEX.lookup(word)}
+    medicines = [(m.group(1), m.start(1)) for group in MEDICINE_SYNONYM_GROUPS
+                 for m in re.finditer(r'\b(' + '|'.join(group) + r')\b', text, re.I)]
+    return diseases, vocab, medicines
+
+
+def new_scan(text):
+    hits = MATCHER.find(text)
+    diseases = {hit.text.lower() for group in synonym_matches(hits, DISEASE_SYNONYM_GROUPS, "DISEASE") for hit in group}
+    vocab = {hit.text.lower() for hit in hits if "DISEASE_VOCAB" in hit.labels}
+    medicines = [(hit.text, hit.start) for group in synonym_matches(hits, MEDICINE_SYNONYM_GROUPS, "MEDICINE")
+                 for hit in group]
+    return diseases, vocab, medicines
+
+
+def random_text(rng):
+    pieces = []
+    for _ in range(rng.randint(1, 25)):
+        kind = rng.random()
+        if kind < 0.35:
+            piece = rng.choice(rng.choice(DISEASE_SYNONYM_GROUPS + MEDICINE_SYNONYM_GROUPS))
+        elif kind < 0.6:
+            piece = rng.choice(DISEASE_INDEX.choices)
+        else:
+            piece = rng.choice(FILLERS)
+        casing = rng.random()
+        piece = piece.upper() if casing < 0.2 else piece.title() if casing < 0.4 else piece
+        pieces.append(piece + rng.choice(SEPARATORS))
+    return "".join(pieces)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_per_synonym_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_text(rng)
+        assert new_scan(text) == old_scan(text), text
+
+
+@pytest.mark.parametrize("text, label, term", [
+    ("Insulin resistance noted", "MEDICINE", "insulin"),
+    ("History of thyroid cancer", "DISEASE", "thyroid"),
+    ("Alzheimer's disease suspected", "DISEASE", "alzheimer"),
+])
+def test_shorter_keywords_are_not_shadowed(text, label, term):
+    hits = MATCHER.find(text)
+    assert any(hit.text.lower() == term and label in hit.labels for hit in hits)
+
+
+def test_first_listed_alternative_wins():
+    # The old regex tried "diabetes" before "diabetes mellitus"
+    groups = synonym_matches(MATCHER.find("Diabetes mellitus"), DISEASE_SYNONYM_GROUPS, "DISEASE")
+    assert [hit.text for group in groups for hit in group] == ["Diabetes"]
@@ -0,0 +1,91 @@
+# test_nlp_pool.py - NLPWorkerPool slot limits, timeouts and broken-pool retry, with a trivial engine
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from nlp_pool import NLPPoolBusy, NLPTimeout, NLPWorkerPool
+
+
+class EchoEngine:
+    """Stands in for MedicalNLP, so workers start without a spaCy model"""
+
+    def set_executor_strategy(self, strategy):
+        pass
+
+    def process_text(self, text):
+        return {"text": text, "pid": os.getpid()}
+
+    def process_texts(self, texts, batch_size=32):
+        return [self.process_text(text) for text in texts]
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _crash():
+    os._exit(1)
+
+
+def _crash_once(marker):
+    """Kill the worker the first time, as an OOM kill would; succeed on the retry"""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return "retried"
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        pools.append(NLPWorkerPool(workers=1, factory=EchoEngine, **kwargs))
+        return pools[-1]
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_texts_round_trip_in_order(make_pool):
+    pool = make_pool()
+    assert pool.analyze("one")["text"] == "one"
+    assert [a["text"] for a in pool.analyze_many(["a", "b", "c"])] == ["a", "b", "c"]
+    assert pool.stats()["completed"] == 2 and pool.stats()["in_flight"] == 0
+
+
+def test_exhausted_slots_raise_busy(make_pool):
+    pool = make_pool(max_pending=1, queue_timeout=0.1)
+    with pytest.raises(NLPPoolBusy):
+        pool._run([(_sleep, 0.5), (_sleep, 0.5)])
+    assert pool.stats()["rejected"] == 1
+
+
+def test_timeout_is_counted_and_slot_held_until_the_task_ends(make_pool):
+    pool = make_pool()
+    pool.analyze("warm")
+    with pytest.raises(NLPTimeout):
+        pool._run([(_sleep, 1.0)], timeout=0.2)
+    stats = pool.stats()
+    assert (stats["timeouts"], stats["in_flight"]) == (1, 1)
+    deadline = time.monotonic() + 10
+    while pool.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.stats()["in_flight"] == 0 and pool.stats()["completed"] == 2
+
+
+def test_broken_pool_is_rebuilt_and_the_call_retried(make_pool, tmp_path):
+    pool = make_pool()
+    assert pool._run([(_crash_once, str(tmp_path / "crashed"))]) == ["retried"]
+    assert pool.stats()["restarts"] == 1
+
+
+def test_pool_that_breaks_again_gives_up_after_one_retry(make_pool):
+    pool = make_pool()
+    with pytest.raises(BrokenProcessPool):
+        pool._run([(_crash,)])
+    assert pool.stats()["restarts"] == 2
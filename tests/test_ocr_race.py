@@ -0,0 +1,89 @@
+# test_ocr_race.py - OCR race mode with stubbed engines: winner, cancellation, fallback and cache fills
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import app
+from app import Config, IncompleteText, OCR_ENGINE_VERSIONS, extract_text_race
+from result_cache import DiskStore, ResultCache
+
+REPORT = ("PATIENT REPORT\nDiagnosis: Type 2 Diabetes, Hypertension.\nGlucose: 182 mg/dl, HbA1c: 8.1 %\n"
+          "Recommendation: Continue metformin and monitor blood sugar daily.\n")
+HASH = "f" * 64
+
+
+def done(value):
+    future = Future()
+    if isinstance(value, Exception):
+        future.set_exception(value)
+    else:
+        future.set_result(value)
+    return future
+
+
+def later(value, delay=0.05):
+    future = Future()
+    threading.Timer(delay, future.set_result, (value,)).start()
+    return future
+
+
+@pytest.fixture
+def ocr_cache(tmp_path, monkeypatch):
+    cache = ResultCache(DiskStore(tmp_path, max_bytes=1 << 20), "ocr")
+    monkeypatch.setattr(Config, "ocr_cache", cache)
+    return lambda engine: cache.get(HASH, engine, OCR_ENGINE_VERSIONS[engine])
+
+
+def race(monkeypatch, **engines):
+    monkeypatch.setattr(app, "_race_engines", lambda file_path: {name: (lambda f=f: f) for name, f in engines.items()})
+    return extract_text_race("report.pdf", HASH)
+
+
+def test_first_acceptable_text_wins_and_losers_are_cancelled(monkeypatch, ocr_cache):
+    azure = Future()
+    assert race(monkeypatch, **{"pypdf2-text": done(REPORT), "azure": azure}) == REPORT
+    assert azure.cancelled()
+    assert ocr_cache("pypdf2-text") == REPORT
+
+
+def test_incomplete_text_never_wins_or_fills_the_cache(monkeypatch, ocr_cache):
+    partial = IncompleteText(REPORT + "page 2 had no text layer\n")
+    assert race(monkeypatch, **{"pypdf2-text": done(partial), "azure": later(REPORT)}) == REPORT
+    assert ocr_cache("pypdf2-text") is None
+    assert ocr_cache("azure") == REPORT
+
+
+def test_failed_engine_is_skipped(monkeypatch, ocr_cache):
+    assert race(monkeypatch, **{"pypdf2-text": done(RuntimeError("corrupt")), "azure": later(REPORT)}) == REPORT
+    assert ocr_cache("pypdf2-text") is None
+
+
+def test_longest_text_is_returned_when_nothing_is_acceptable(monkeypatch, ocr_cache):
+    partial = IncompleteText(REPORT)
+    text = race(monkeypatch, **{"pypdf2-text": done(partial), "azure": done("PATIENT REPORT")})
+    assert text == partial and isinstance(text, IncompleteText)
+    # Finished but unacceptable complete text is still cached; it just lost
+    assert ocr_cache("azure") == "PATIENT REPORT"
+
+
+def test_no_text_at_all_raises(monkeypatch, ocr_cache):
+    with pytest.raises(ValueError, match="PDF text extraction failed"):
+        race(monkeypatch, **{"pypdf2-text": done(""), "azure": done(RuntimeError("quota"))})
+
+
+def test_cached_acceptable_text_skips_the_race(monkeypatch, ocr_cache):
+    Config.ocr_cache.set(REPORT, HASH, "azure", OCR_ENGINE_VERSIONS["azure"])
+    started = []
+    monkeypatch.setattr(app, "_race_engines",
+                        lambda file_path: {name: lambda: started.append(name) for name in ("pypdf2-text", "azure")})
+    assert extract_text_race("report.pdf", HASH) == REPORT
+    assert started == []
+
+
+def test_race_times_out_to_the_best_finished_text(monkeypatch, ocr_cache):
+    monkeypatch.setattr(Config, "OCR_RACE_TIMEOUT", 0.1)
+    azure = Future()
+    text = race(monkeypatch, **{"pypdf2-text": done("PATIENT REPORT, page 1"), "azure": azure})
+    assert text == "PATIENT REPORT, page 1"
+    assert azure.cancelled()
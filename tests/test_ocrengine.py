@@ -0,0 +1,99 @@
+# test_ocrengine.py - OCR.Space client retries and batch ordering against an httpx MockTransport
+import os
+import re
+import threading
+import time
+import types
+
+import httpx
+import pytest
+
+import ocrengine
+
+
+class FakeOCRSpace:
+    """Answers each image with the queued statuses first, then its text; records attempts per image"""
+
+    def __init__(self, statuses=None, delays=None):
+        self.statuses = {name: list(queue) for name, queue in (statuses or {}).items()}
+        self.delays = delays or {}
+        self.attempts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        name = os.path.basename(re.search(rb'filename="([^"]+)"', request.content).group(1).decode())
+        with self._lock:
+            self.attempts[name] = self.attempts.get(name, 0) + 1
+            queue = self.statuses.get(name, [])
+            status = queue.pop(0) if queue else 200
+        time.sleep(self.delays.get(name, 0))
+        if status == "timeout":
+            raise httpx.ReadTimeout("timed out", request=request)
+        if status != 200:
+            return httpx.Response(status, json={"IsErroredOnProcessing": True})
+        return httpx.Response(200, json={"ParsedResults": [{"ParsedText": f"text of {name}\n"}]})
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for name in ("a.jpg", "b.jpg", "c.jpg", "d.jpg"):
+        (tmp_path / name).write_bytes(b"\xff\xd8 fake jpeg")
+        paths.append(str(tmp_path / name))
+    return paths
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(ocrengine, "time", types.SimpleNamespace(sleep=sleeps.append))
+
+    def serve(handler):
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(ocrengine, "_client", client)
+        monkeypatch.setattr(ocrengine, "_client_pid", os.getpid())
+        return sleeps
+
+    yield serve
+    ocrengine._client.close()
+
+
+def test_throttled_and_failing_responses_are_retried(images, serve):
+    server = FakeOCRSpace({"a.jpg": [429, 503]})
+    sleeps = serve(server)
+    assert ocrengine.extract_text(images[0], api_key="k") == "text of a.jpg"
+    assert server.attempts == {"a.jpg": 3}
+    assert sleeps == [0.5, 1.0]
+
+
+def test_timeouts_are_retried(images, serve):
+    server = FakeOCRSpace({"a.jpg": ["timeout"]})
+    serve(server)
+    assert ocrengine.extract_text(images[0], api_key="k") == "text of a.jpg"
+    assert server.attempts == {"a.jpg": 2}
+
+
+def test_retries_stop_at_max_attempts(images, serve):
+    server = FakeOCRSpace({"a.jpg": [502] * 5})
+    serve(server)
+    with pytest.raises(httpx.HTTPStatusError):
+        ocrengine.extract_text(images[0], api_key="k")
+    assert server.attempts == {"a.jpg": ocrengine.OCRSPACE_MAX_ATTEMPTS}
+
+
+def test_client_errors_are_not_retried(images, serve):
+    server = FakeOCRSpace({"a.jpg": [400]})
+    serve(server)
+    with pytest.raises(httpx.HTTPStatusError):
+        ocrengine.extract_text(images[0], api_key="k")
+    assert server.attempts == {"a.jpg": 1}
+
+
+def test_extract_many_keeps_input_order_and_isolates_failures(images, serve):
+    # Earlier images answer last, so completion order is the reverse of input order
+    server = FakeOCRSpace({"c.jpg": [400]}, delays={"a.jpg": 0.15, "b.jpg": 0.1, "c.jpg": 0.05})
+    serve(server)
+    results = ocrengine.extract_many(images, api_key="k", concurrency=4)
+    assert results[:2] == ["text of a.jpg", "text of b.jpg"]
+    assert isinstance(results[2], httpx.HTTPStatusError)
+    assert results[3] == "text of d.jpg"
@@ -0,0 +1,93 @@
+# test_pdf_text.py - Page-level PDF text extraction: scanned pages, page OCR and the parse pool
+import pytest
+
+import pdf_text
+from pdf_text import extract_pdf_text, extract_text_layers
+
+LINE = "Patient report: haemoglobin 11.2 g/dl, glucose 182 mg/dl"
+
+
+def make_pdf(path, pages):
+    """Minimal PDF with one Helvetica text line per entry of pages ("" for a page without a text layer)"""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i, text in enumerate(pages):
+        page, content = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page} 0 R")
+        ops = f"BT /F1 10 Tf 40 750 Td ({text}) Tj ET".encode() if text else b""
+        objects[page] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                         f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>").encode()
+        objects[content] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(ops), ops)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+    out, offsets = b"%PDF-1.4\n", []
+    for number in range(1, len(objects) + 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(out)
+    return str(path)
+
+
+def test_text_pdf_is_complete(tmp_path):
+    path = make_pdf(tmp_path / "text.pdf", [LINE, LINE])
+    text, missing, failed = extract_pdf_text(path, ocr_page=lambda page: pytest.fail("nothing to OCR"))
+    assert text == f"{LINE}\n{LINE}"
+    assert (missing, failed) == ([], [])
+
+
+def test_only_scanned_pages_are_ocred(tmp_path):
+    path = make_pdf(tmp_path / "mixed.pdf", [LINE, "", LINE])
+    ocred = []
+
+    def ocr_page(page_path):
+        ocred.append(page_path)
+        return "scanned page text"
+
+    text, missing, failed = extract_pdf_text(path, ocr_page=ocr_page)
+    assert text == f"{LINE}\nscanned page text\n{LINE}"
+    assert len(ocred) == 1 and ocred[0].endswith("page-2.pdf")
+    assert (missing, failed) == ([], [])
+
+
+def test_near_empty_text_layer_is_missing_without_ocr(tmp_path):
+    path = make_pdf(tmp_path / "stub.pdf", [LINE, "Page 2"])
+    text, missing, failed = extract_pdf_text(path)
+    assert "Page 2" in text
+    assert (missing, failed) == ([2], [])
+
+
+def test_failed_page_ocr_is_reported(tmp_path):
+    path = make_pdf(tmp_path / "mixed.pdf", [LINE, "Page 2", ""])
+
+    def ocr_page(page_path):
+        if page_path.endswith("page-3.pdf"):
+            raise TimeoutError("OCR service timed out")
+        return ""  # really blank
+
+    text, missing, failed = extract_pdf_text(path, ocr_page=ocr_page)
+    assert (missing, failed) == ([3], [3])
+
+
+def test_all_scanned_pages_are_left_to_the_caller(tmp_path):
+    path = make_pdf(tmp_path / "scan.pdf", ["1", "2"])
+    text, missing, failed = extract_pdf_text(path, ocr_page=lambda page: pytest.fail("whole document goes to OCR"))
+    assert (missing, failed) == ([1, 2], [])
+
+
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch):
+    pages = [f"{LINE} page {i}" if i % 3 else "" for i in range(12)]
+    path = make_pdf(tmp_path / "long.pdf", pages)
+    serial = extract_text_layers(path)
+    monkeypatch.setattr(pdf_text, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(pdf_text, "PDF_WORKERS", 3)
+    try:
+        assert extract_text_layers(path) == serial
+        assert pdf_text._get_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        pdf_text._get_pool().shutdown()
+        pdf_text._pool = None
+    assert [text.strip() for text in serial] == pages
@@ -0,0 +1,34 @@
+# test_pipeline_artifact.py - Version check of a prebuilt pipeline artifact before anything is unpickled
+import pickle
+
+import pytest
+
+import medical_nlp
+from medical_nlp import artifact_version, load_pipeline_artifact
+
+
+def write_artifact(path, version):
+    path.mkdir()
+    (path / "tables.pkl").write_bytes(pickle.dumps({"diseases": ["Diabetes"]}))
+    if version is not None:
+        (path / "version.txt").write_text(version + "\n")
+    return path
+
+
+def test_stale_or_unversioned_artifact_is_not_unpickled(tmp_path, monkeypatch):
+    monkeypatch.setattr(pickle, "load", lambda f: pytest.fail("stale tables were unpickled"))
+    assert load_pipeline_artifact(write_artifact(tmp_path / "stale", "000000000000")) is None
+    assert load_pipeline_artifact(write_artifact(tmp_path / "unversioned", None)) is None
+
+
+def test_current_artifact_is_loaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(medical_nlp.spacy, "load", lambda path: "pipeline")
+    tables = load_pipeline_artifact(write_artifact(tmp_path / "current", artifact_version()))
+    assert tables == {"diseases": ["Diabetes"], "nlp": "pipeline"}
+
+
+def test_artifact_version_is_computed_once():
+    artifact_version()
+    hits = artifact_version.cache_info().hits
+    artifact_version()
+    assert artifact_version.cache_info().hits == hits + 1
@@ -0,0 +1,51 @@
+# test_prefork.py - Pre-fork master decisions that don't need forked workers
+import os
+
+import pytest
+
+import prefork
+
+
+def test_several_workers_default_to_the_sqlite_job_store(monkeypatch):
+    monkeypatch.setenv("JOB_BACKEND", "")
+    prefork._use_shared_job_store(4)
+    assert os.environ["JOB_BACKEND"] == "sqlite"
+
+
+def test_several_workers_refuse_the_memory_job_store(monkeypatch):
+    monkeypatch.setenv("JOB_BACKEND", "memory")
+    with pytest.raises(SystemExit):
+        prefork._use_shared_job_store(2)
+
+
+def test_one_worker_keeps_the_configured_job_store(monkeypatch):
+    monkeypatch.setenv("JOB_BACKEND", "memory")
+    prefork._use_shared_job_store(1)
+    assert os.environ["JOB_BACKEND"] == "memory"
+
+
+def test_worker_that_lived_long_enough_respawns_at_once():
+    schedule = prefork.RespawnSchedule()
+    assert schedule.worker_exited(0, lived=60.0, restarts=0, now=100.0) == 0
+    assert schedule.due(100.0) == [(0, 1)]
+    assert schedule.due(100.0) == []
+
+
+def test_quick_deaths_back_off_doubling_up_to_the_cap():
+    schedule = prefork.RespawnSchedule()
+    delays = [schedule.worker_exited(1, lived=0.5, restarts=n, now=0.0) for n in range(7)]
+    assert delays == [1, 3, 7, 15, 30, 30, 30]
+    # A worker that then survives resets the back-off
+    assert schedule.worker_exited(1, lived=prefork.MIN_WORKER_LIFETIME, restarts=7, now=0.0) == 0
+
+
+def test_slots_wait_out_their_own_back_off():
+    schedule = prefork.RespawnSchedule()
+    schedule.worker_exited(0, lived=1.0, restarts=0, now=10.0)  # 1s
+    schedule.worker_exited(0, lived=1.0, restarts=1, now=10.0)  # 3s, replaces the first
+    schedule.worker_exited(2, lived=60.0, restarts=4, now=10.0)  # at once
+    assert schedule.due(10.0) == [(2, 5)]
+    assert schedule.waiting(11.0) == [(0, 2.0)]
+    assert schedule.due(12.9) == []
+    assert schedule.due(13.0) == [(0, 2)]
+    assert schedule.waiting(13.0) == []
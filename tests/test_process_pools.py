@@ -0,0 +1,43 @@
+# test_process_pools.py - Start method of worker pools in the web process and in forked workers
+import multiprocessing
+import os
+
+import pytest
+
+import process_pools
+from process_pools import clean_mp_context
+
+pytestmark = pytest.mark.skipif("forkserver" not in multiprocessing.get_all_start_methods(),
+                                reason="platform without forkserver")
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(process_pools, "_forkserver_owner", None)
+    monkeypatch.setattr(process_pools, "_preload", set())
+
+
+def test_owner_gets_forkserver_with_merged_preload(monkeypatch):
+    preloads = []
+    context = multiprocessing.get_context("forkserver")
+    monkeypatch.setattr(type(context), "set_forkserver_preload", lambda self, names: preloads.append(names))
+
+    assert clean_mp_context(["pdf_text"]).get_start_method() == "forkserver"
+    assert clean_mp_context(["nlp_pool", "medical_nlp"]).get_start_method() == "forkserver"
+    assert preloads[-1] == ["medical_nlp", "nlp_pool", "pdf_text"]
+    assert process_pools._forkserver_owner == os.getpid()
+
+
+def test_forked_child_gets_spawn():
+    clean_mp_context(["pdf_text"])
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.write(write, clean_mp_context(["pdf_text"]).get_start_method().encode())
+        finally:
+            os._exit(0)
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read) as f:
+        assert f.read() == "spawn"
@@ -0,0 +1,50 @@
+# test_result_cache.py - DiskStore size accounting and ResultCache counters
+import threading
+
+from result_cache import DiskStore, ResultCache
+
+
+def test_disk_store_overwrite_keeps_size(tmp_path):
+    store = DiskStore(tmp_path, max_bytes=1 << 20)
+    for _ in range(50):
+        store.set("key", "x" * 100)
+    assert store.stats()["bytes"] == 100
+    store.set("key", "y" * 40)
+    assert store.stats()["bytes"] == 40
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.json")) == 40
+
+
+def test_disk_store_overwrite_does_not_evict(tmp_path):
+    store = DiskStore(tmp_path, max_bytes=1000)
+    store.set("a", "x" * 400)
+    store.set("b", "x" * 400)
+    for _ in range(10):
+        store.set("b", "x" * 400)
+    assert store.get("a") is not None
+
+
+def test_result_cache_counts_concurrent_lookups(tmp_path):
+    cache = ResultCache(DiskStore(tmp_path, max_bytes=1 << 20), "test")
+    cache.set({"ok": True}, "present")
+
+    def lookups():
+        for _ in range(500):
+            cache.get("present")
+            cache.get("absent")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (4000, 4000, 0.5)
+
+
+def test_disk_store_counts_entries_written_by_other_processes(tmp_path):
+    # Two stores on one directory stand in for two pre-fork workers
+    first, second = DiskStore(tmp_path, max_bytes=1000), DiskStore(tmp_path, max_bytes=1000)
+    for i in range(8):
+        first.set(f"a{i}", "x" * 100)
+        second.set(f"b{i}", "x" * 100)
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.json")) <= 1000
@@ -1,7 +1,14 @@
 # text_analyzer.py - Medical text analysis and NLP processing
-import boto3
+import functools
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from collections import defaultdict
 from rapidfuzz import process, fuzz
+from caching import BoundedCache
+from aws_clients import get_comprehend_medical_client
 
 COMMON_FIXES = {
     # --- Medicines (Neurology, Oncology, General) ---
@@ -365,40 +372,167 @@ REFERENCE_TERMS = [
     "ENT Specialist", "Psychiatrist", "Physiotherapist"
 ]
 # --- Step 3: Auto-correction pipeline ---
+class CandidateIndex:
+    """Pruned fuzzy matcher over a fixed vocabulary.
+
+    Indel-based scores (ratio, token_sort_ratio) equal 200 * LCS / (len_a + len_b),
+    and the LCS can be no longer than the characters both strings share. So a
+    term can only reach score_cutoff when its length lies in a band around the
+    token's, and a token needs enough characters that occur in that band at all.
+    Tokens failing either bound are skipped without scoring; the rest are
+    scored only against their band, so results match a full extractOne scan.
+    """
+
+    def __init__(self, terms, scorer=fuzz.ratio, score_cutoff=85, normalize=None):
+        self.terms = tuple(terms)
+        self.scorer = scorer
+        self.score_cutoff = score_cutoff
+        self._normalize = normalize or (lambda s: s)
+        self._by_length = defaultdict(list)
+        for i, term in enumerate(self.terms):
+            self._by_length[len(self._normalize(term))].append(i)
+        self._bands = {}
+
+    def _band(self, n):
+        """(candidate terms in vocabulary order, their charset, shortest length) for length n"""
+        band = self._bands.get(n)
+        if band is None:
+            slack = (100 - self.score_cutoff) / 100
+            lo = int(n * (1 - slack) / (1 + slack))
+            hi = int(n * (1 + slack) / (1 - slack)) + 1
+            idx = sorted(i for size in range(lo, hi + 1) for i in self._by_length.get(size, ()))
+            terms = tuple(self.terms[i] for i in idx)
+            charset = frozenset(ch for t in terms for ch in self._normalize(t))
+            min_len = min((len(self._normalize(t)) for t in terms), default=0)
+            band = self._bands[n] = (terms, charset, min_len)
+        return band
+
+    def candidates(self, token):
+        """Terms that can still reach score_cutoff against token (empty if none can)"""
+        norm = self._normalize(token)
+        terms, charset, min_len = self._band(len(norm))
+        if not terms:
+            return ()
+        shared = sum(ch in charset for ch in norm)
+        if 200 * shared < self.score_cutoff * (len(norm) + min_len):
+            return ()
+        return terms
+
+    def best(self, token):
+        """Best term scoring >= score_cutoff, or None"""
+        choices = self.candidates(token)
+        if not choices:
+            return None
+        result = process.extractOne(token, choices, scorer=self.scorer, score_cutoff=self.score_cutoff)
+        return result[0] if result else None
+
+    def best_many(self, tokens):
+        """Map each distinct matchable token to its best term.
+
+        Tokens sharing a candidate band are scored together in one rapidfuzz
+        cdist call, so the comparison loop runs in C across all cores.
+        Ties resolve to the earliest term, as with process.extractOne.
+        """
+        groups = defaultdict(list)
+        for token in dict.fromkeys(tokens):
+            choices = self.candidates(token)
+            if choices:
+                groups[choices].append(token)
+        corrections = {}
+        for choices, group in groups.items():
+            scores = process.cdist(group, choices, scorer=self.scorer, score_cutoff=self.score_cutoff,
+                                   dtype=np.float64, workers=-1)
+            best = scores.argmax(axis=1)
+            for token, j, row in zip(group, best, scores):
+                if row[j] >= self.score_cutoff:
+                    corrections[token] = choices[j]
+        return corrections
+
+
+def _collapse_tokens(text):
+    """Comparison form used by token_sort_ratio: tokens sorted and single-spaced"""
+    return " ".join(sorted(text.split()))
+
+
+REFERENCE_INDEX = CandidateIndex(REFERENCE_TERMS, scorer=fuzz.ratio, score_cutoff=85)
+
+# re's IGNORECASE also matches these to ASCII letters; str.lower() leaves them as they are
+_ASCII_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+# \b, \s* and other classes end a literal run; escaped punctuation and plain characters extend it
+_FIX_LITERAL_RUN = re.compile(r"\\\w[*+]?|(?:\\(.)|(.))(\?)?")
+
+def _required_literal(pattern):
+    """Longest lowercase literal every match of the fix pattern contains, or None.
+
+    Understands the shapes COMMON_FIXES uses - literals, \\b, \\s*, \\s+,
+    escaped characters and single optional characters; a pattern with
+    classes, groups or repeats gets no literal and is always tried.
+    """
+    if re.search(r"[*+?]\?", pattern) or re.search(r"[|()\[\]{}*+.^$]", re.sub(r"\\s[*+]|\\.", "", pattern)):
+        return None
+    runs, run = [], ""
+    for m in _FIX_LITERAL_RUN.finditer(pattern):
+        char = m.group(1) or m.group(2)
+        if char is None or m.group(3) or not char.isascii():
+            runs.append(run)
+            run = ""
+        else:
+            run += char.lower()
+    runs.append(run)
+    return max(runs, key=len) or None
+
+
+@functools.lru_cache(maxsize=None)
+def common_fixes_table():
+    """COMMON_FIXES as (compiled pattern, replacement, required literal) in table order.
+
+    Compiled on first use rather than at import, so processes that never
+    clean OCR text don't pay for it.
+    """
+    return [(re.compile(pattern, re.IGNORECASE), replacement, _required_literal(pattern))
+            for pattern, replacement in COMMON_FIXES.items()]
+
+def apply_common_fixes(text: str) -> str:
+    """Apply COMMON_FIXES in order, skipping fixes whose literal isn't in the text.
+
+    A substring check on the lowered text is far cheaper than a regex scan,
+    and most of the table's misspellings don't occur in a given report.
+    """
+    folded = text.translate(_ASCII_FOLD).lower()
+    for fix, replacement, literal in common_fixes_table():
+        if literal is not None and literal not in folded:
+            continue
+        text, count = fix.subn(replacement, text)
+        if count:
+            folded = text.translate(_ASCII_FOLD).lower()
+    return text
+
 def auto_correct(text: str) -> str:
     """Apply common fixes + fuzzy matching to clean OCR output."""
     
     # Apply regex-based common fixes
-    clean = text
-    for pattern, replacement in COMMON_FIXES.items():
-        clean = re.sub(pattern, replacement, clean, flags=re.IGNORECASE)
+    clean = apply_common_fixes(text)
 
-    # Fuzzy match against reference terms (if word still looks suspicious)
+    # Fuzzy match against reference terms (score threshold = 85), one batch per document
     words = clean.split()
-    corrected_words = []
-    for w in words:
-        if not w.strip():
-            continue
-        # Fuzzy matching (score threshold = 85)
-        result = process.extractOne(w, REFERENCE_TERMS, scorer=fuzz.ratio)
-        if result and len(result) >= 2:
-            match, score = result[0], result[1]
-            if score >= 85:
-                corrected_words.append(match)
-            else:
-                corrected_words.append(w)
-        else:
-            corrected_words.append(w)
-    
-    return " ".join(corrected_words)
+    corrections = REFERENCE_INDEX.best_many(words)
+    return " ".join(corrections.get(w, w) for w in words)
+
+# Comprehend returns the same entity strings ("BP", "CBC", "Paracetamol 500 mg") report after
+# report, so entity-level corrections are memoized per process, keyed by the raw string
+ENTITY_CORRECTIONS = BoundedCache(int(os.getenv("ENTITY_CORRECTION_CACHE_SIZE", "20000")),
+                                  name="entity_correction")
+
+def correct_entity(text: str) -> str:
+    """auto_correct for short entity strings, memoized across reports."""
+    return ENTITY_CORRECTIONS.get_or_set(text, lambda: auto_correct(text))
 
 def clean_ocr_text(text: str) -> str:
     # normalize spaces
     t = re.sub(r'[ \t]+', ' ', text)
     t = re.sub(r'\n{2,}', '\n', t)
     # common medical OCR fixes
-    for pat, rep in COMMON_FIXES.items():
-        t = re.sub(pat, rep, t, flags=re.IGNORECASE)
+    t = apply_common_fixes(t)
     return t.strip()
 
 # --- extend in text_analyzer.py ---
@@ -1251,12 +1385,13 @@ RECO_RULES = {
     ],
 }
 
-def _fuzzy_pick(name: str, vocab: dict, score_cutoff=85):
-    name_l = name.lower()
-    best = process.extractOne(name_l, list(vocab.keys()), scorer=fuzz.token_sort_ratio, score_cutoff=score_cutoff)
-    if best and len(best) >= 1:
-        return best[0]
-    return None
+MEDICATION_INDEX = CandidateIndex(MEDICATION_CANON.keys(), scorer=fuzz.token_sort_ratio,
+                                  score_cutoff=85, normalize=_collapse_tokens)
+TEST_INDEX = CandidateIndex(sorted({k.lower() for k in TEST_KEYWORDS}), scorer=fuzz.token_sort_ratio,
+                            score_cutoff=80, normalize=_collapse_tokens)
+
+def _fuzzy_pick(name: str, index: CandidateIndex):
+    return index.best(name.lower())
 
 
 def group_entities(entities):
@@ -1275,7 +1410,7 @@ def group_entities(entities):
             continue
 
         # ✅ Apply OCR + fuzzy corrections here
-        clean_txt = auto_correct(txt)
+        clean_txt = correct_entity(txt)
 
         if cat in ("PROTECTED_HEALTH_INFORMATION",):
             grouped["patient_info"].add(clean_txt)
@@ -1294,8 +1429,8 @@ def group_entities(entities):
         dose = re.search(r'(\d+\s*(?:mg|mcg|ml))', m, flags=re.I)
         base = re.sub(r'(\d+\s*(?:mg|mcg|ml))', '', m, flags=re.I).strip()
 
-        base_low = auto_correct(base).lower()
-        key = _fuzzy_pick(base_low, MEDICATION_CANON) or base_low
+        base_low = correct_entity(base).lower()
+        key = _fuzzy_pick(base_low, MEDICATION_INDEX) or base_low
         info = MEDICATION_CANON.get(key, {"generic": "", "purpose": ""})
 
         meds_struct.append({
@@ -1310,8 +1445,8 @@ def group_entities(entities):
     # --- normalize tests by keyword hit + deduplicate ---
     tests_norm = set()
     for t in list(grouped["tests"]):
-        clean_t = auto_correct(t)
-        hit = _fuzzy_pick(clean_t, {k.lower(): None for k in TEST_KEYWORDS}, score_cutoff=80)
+        clean_t = correct_entity(t)
+        hit = _fuzzy_pick(clean_t, TEST_INDEX)
         norm = hit.upper() if hit else clean_t.upper()
         tests_norm.add(norm)
     grouped["tests"] = sorted(tests_norm)
@@ -1319,7 +1454,7 @@ def group_entities(entities):
     # --- normalize conditions ---
     conds_norm = []
     for c in grouped["conditions"]:
-        conds_norm.append(auto_correct(c))
+        conds_norm.append(correct_entity(c))
     grouped["conditions"] = sorted(set(conds_norm))
 
     # final cleanup
@@ -1327,18 +1462,96 @@ def group_entities(entities):
     grouped["timeline"] = sorted(grouped["timeline"])
     return grouped
 
+# DetectEntitiesV2 accepts at most 20,000 bytes of UTF-8 per request
+COMPREHEND_MAX_BYTES = 20000
+COMPREHEND_CHUNK_BYTES = min(int(os.getenv("COMPREHEND_CHUNK_BYTES", "10000")), COMPREHEND_MAX_BYTES)
+COMPREHEND_MAX_WORKERS = int(os.getenv("COMPREHEND_MAX_WORKERS", "8"))
+
+# coarsest first: paragraph, line, sentence, word
+_CHUNK_BOUNDARIES = (
+    re.compile(r'\n[ \t]*\n\s*'),
+    re.compile(r'\n'),
+    re.compile(r'(?<=[.!?;])\s+'),
+    re.compile(r'\s+'),
+)
+
+_comprehend_pool = None
+_comprehend_pool_lock = threading.Lock()
+
+def _get_comprehend_pool():
+    """Shared pool bounding concurrent Comprehend calls across all requests"""
+    global _comprehend_pool
+    with _comprehend_pool_lock:
+        if _comprehend_pool is None:
+            _comprehend_pool = ThreadPoolExecutor(max_workers=COMPREHEND_MAX_WORKERS,
+                                                  thread_name_prefix="comprehend")
+        return _comprehend_pool
+
+def chunk_text(text, max_bytes=COMPREHEND_CHUNK_BYTES):
+    """Split text into (offset, chunk) pieces of at most max_bytes UTF-8 bytes.
+
+    Pieces are packed greedily and cut at the coarsest boundary that fits, so an
+    entity is only split if a single word exceeds the budget. Chunks keep their
+    surrounding whitespace, so offset + position maps back to the original text.
+    """
+    chunks = []
+
+    def _size(start, end):
+        return len(text[start:end].encode('utf-8'))
+
+    def _split(start, end, level):
+        if _size(start, end) <= max_bytes:
+            chunks.append((start, end))
+            return
+        if level == len(_CHUNK_BOUNDARIES):
+            # no boundary left: cut mid-word on character edges
+            cut, size = start, 0
+            for i in range(start, end):
+                char_size = len(text[i].encode('utf-8'))
+                if size + char_size > max_bytes:
+                    chunks.append((cut, i))
+                    cut, size = i, 0
+                size += char_size
+            chunks.append((cut, end))
+            return
+        cuts = [m.end() for m in _CHUNK_BOUNDARIES[level].finditer(text, start, end) if m.end() < end]
+        current = start
+        for seg_start, seg_end in zip([start] + cuts, cuts + [end]):
+            if _size(current, seg_end) <= max_bytes:
+                continue
+            if current < seg_start:
+                chunks.append((current, seg_start))
+            if _size(seg_start, seg_end) > max_bytes:
+                _split(seg_start, seg_end, level + 1)
+                current = seg_end
+            else:
+                current = seg_start
+        if current < end:
+            chunks.append((current, end))
+
+    _split(0, len(text), 0)
+    return [(start, text[start:end]) for start, end in chunks if text[start:end].strip()]
+
+def _detect_entities(client, offset, chunk):
+    entities = client.detect_entities_v2(Text=chunk)['Entities']
+    return [{
+        'Text': ent['Text'],
+        'Type': ent['Category'],
+        'BeginOffset': ent['BeginOffset'] + offset,
+        'EndOffset': ent['EndOffset'] + offset,
+    } for ent in entities]
+
 def analyze_medical_text(text, access_key, secret_key, region='us-east-1'):
-    client = boto3.client(
-        'comprehendmedical',
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        region_name=region
-    )
+    client = get_comprehend_medical_client(access_key, secret_key, region)
+    chunks = chunk_text(text)
+    if len(chunks) <= 1:
+        return _detect_entities(client, 0, text)
 
-    response = client.detect_entities_v2(Text=text)
-    entities = response['Entities']
+    # Long reports: one request per chunk, in parallel, offsets re-based onto `text`
+    pool = _get_comprehend_pool()
+    futures = [pool.submit(_detect_entities, client, offset, chunk) for offset, chunk in chunks]
+    return [ent for future in futures for ent in future.result()]
 
-    return [{'Text': ent['Text'], 'Type': ent['Category']} for ent in entities]
 # --- extend in text_analyzer.py ---
 def _pull_field(pattern, text, flags=re.I):
     m = re.search(pattern, text, flags)